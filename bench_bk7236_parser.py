@@ -0,0 +1,196 @@
+"""bk_loader 输出解析性能测试
+
+回放bk_loader日志，对比旧的逐条正则解析和 bk7236_parser 预编译单次解析的吞吐量(行/秒)。
+
+用法:
+    python bench_bk7236_parser.py                       # 使用合成的4MB烧录日志
+    python bench_bk7236_parser.py --log a.log b.log     # 回放录制的bk_loader日志
+    python bench_bk7236_parser.py --size-kb 8192 --repeat 5
+"""
+import argparse
+import re
+import time
+
+from bk7236_parser import OutputClassifier
+from bk_loader_sim import synthetic_log
+
+
+class LegacyParser:
+    """优化前 CommandExecutor 的解析逻辑(check_for_failure 调用两次)"""
+    def __init__(self):
+        self._current_phase = "idle"
+        self._erase_percent = 0
+        self._write_percent = 0
+
+    @staticmethod
+    def check_for_failure(text):
+        text = text.strip()
+
+        failure_patterns = [
+            (r'connect failed', "串口连接失败"),
+            (r'Connect device fail!', "设备连接失败"),
+            (r'Writing Flash Failed', "Flash写入失败"),
+            (r'EraseFlash ->fail', "Flash擦除失败"),
+            (r'WriteFlash ->fail', "Flash写入失败"),
+            (r'Timeout', "操作超时"),
+            (r'Not found', "未找到设备或文件"),
+            (r'Error:', "错误信息"),
+            (r'error:', "错误信息"),
+            (r'Failed', "失败"),
+            (r'failed', "失败"),
+            (r'无效', "无效操作或参数"),
+            (r'不支持', "不支持的操作"),
+        ]
+
+        for pattern, message in failure_patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                lines = text.split('\n')
+                for line in lines:
+                    if re.search(pattern, line, re.IGNORECASE):
+                        return line.strip()
+
+        return None
+
+    def parse_progress_and_status(self, text):
+        text = text.strip()
+
+        if self.check_for_failure(text):
+            return (0, "检测到失败信息")
+        if "connect success" in text:
+            return (5, "串口连接成功")
+        if "Gotten Bus" in text:
+            return (7, "获取设备总线")
+        if "Current Chip is" in text:
+            chip_match = re.search(r'Current Chip is : (\w+)', text)
+            if chip_match:
+                return (10, f"识别到芯片: {chip_match.group(1)}")
+        if "Current baudrate" in text and "success" in text:
+            return (12, "波特率切换成功")
+        if "Unprotecting Flash" in text:
+            return (15, "解除Flash保护")
+        if "Unprotected Flash ->pass" in text:
+            return (20, "Flash保护已解除")
+        if "file_length" in text:
+            file_match = re.search(r'file_length : 0x[0-9a-f]+ \((\d+) KB\)', text)
+            if file_match:
+                return (25, f"文件大小: {file_match.group(1)} KB")
+        if "Begin EraseFlash" in text:
+            self._current_phase = "erasing"
+            self._erase_percent = 0
+            return (30, "开始擦除Flash...")
+        if "Start 4K Erase" in text:
+            return (35, "4K擦除...")
+        if "End 4K Erase" in text:
+            return (40, "4K擦除完成")
+        if "Start 64K Erase" in text:
+            return (45, "64K擦除...")
+        erase_match = re.search(r'Erasing Flash \.\.\. (\d+)%', text)
+        if erase_match:
+            self._erase_percent = int(erase_match.group(1))
+            progress = 45 + (self._erase_percent * 0.15)
+            return (int(progress), f"擦除Flash: {self._erase_percent}%")
+        if "End 64K Erase" in text:
+            return (60, "64K擦除完成")
+        if "EraseFlash ->pass" in text:
+            self._current_phase = "writing"
+            self._write_percent = 0
+            return (65, "Flash擦除完成")
+        if "Begin write to flash" in text:
+            return (70, "开始写入Flash...")
+        write_match = re.search(r'Writing Flash \.\.\. (\d+)%', text)
+        if write_match:
+            self._write_percent = int(write_match.group(1))
+            progress = 70 + (self._write_percent * 0.20)
+            return (int(progress), f"写入Flash: {self._write_percent}%")
+        if "WriteFlash ->pass" in text:
+            self._current_phase = "protecting"
+            return (90, "Flash写入完成")
+        if "Enprotect pass" in text:
+            self._current_phase = "rebooting"
+            return (95, "Flash保护完成")
+        if "Boot_Reboot" in text:
+            return (97, "设备重启中...")
+        if "Writing Flash OK" in text or "All Finished Successfully" in text:
+            return (100, "烧录完成")
+        time_match = re.search(r'Total Test Time : (\d+\.\d+) s', text)
+        if time_match:
+            return (100, f"烧录完成，耗时: {time_match.group(1)}秒")
+        return None
+
+
+def load_logs(paths):
+    lines = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                # 去掉flasher日志里的 [COMx][内部] 前缀
+                line = re.sub(r'^(\[[^\]]*\])+ ', '', line)
+                lines.append(line)
+    return lines
+
+
+def run_legacy(lines):
+    parser = LegacyParser()
+    results = []
+    for line in lines:
+        failure = parser.check_for_failure(line)
+        results.append((failure, parser.parse_progress_and_status(line)))
+    return results
+
+
+def run_classifier(lines):
+    classifier = OutputClassifier()
+    results = []
+    for line in lines:
+        info = classifier.classify(line)
+        if info.failure:
+            results.append((info.failure, (0, "检测到失败信息")))
+        elif info.progress is not None:
+            results.append((None, (info.progress, info.status)))
+        else:
+            results.append((None, None))
+    return results
+
+
+def bench(func, lines, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(lines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best if best else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bk_loader 输出解析性能测试")
+    parser.add_argument('--log', nargs='*', default=[], help="录制的bk_loader日志文件")
+    parser.add_argument('--size-kb', type=int, default=4096, help="合成日志的文件大小(KB)")
+    parser.add_argument('--repeat', type=int, default=3, help="重复次数(取最快一次)")
+    args = parser.parse_args()
+
+    if args.log:
+        lines = load_logs(args.log)
+        source = ", ".join(args.log)
+    else:
+        lines = synthetic_log(args.size_kb) + synthetic_log(args.size_kb, fail="write", fail_at=50)
+        source = f"合成日志 {args.size_kb} KB x 2"
+
+    legacy = run_legacy(lines)
+    current = run_classifier(lines)
+    mismatches = sum(1 for a, b in zip(legacy, current) if a != b)
+
+    before = bench(run_legacy, lines, args.repeat)
+    after = bench(run_classifier, lines, args.repeat)
+
+    print(f"日志来源: {source}")
+    print(f"行数: {len(lines)}")
+    print(f"优化前: {before:12.0f} 行/秒")
+    print(f"优化后: {after:12.0f} 行/秒")
+    print(f"加速比: {after / before:.1f}x")
+    print(f"结果不一致行数: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+"""烧录流程压测 - 用 bk_loader_sim.py 代替真实烧录程序，测量1/8/32路并发时:
+
+- 端到端解析吞吐量: 所有烧录线程每秒处理的bk_loader输出行数
+- UI队列延迟: 模拟器输出百分比行到UI定时器从 OutputPipe 取走该行的时间
+- 停止延迟: 对所有正在烧录的流水线调用 stop() 到全部结束回调的时间
+- 内存: Python分配峰值(tracemalloc)和进程RSS
+- 启动开销: 创建烧录进程的耗时和收到第一块输出的时间(--pty 时输出接到伪终端)
+
+用法:
+    python bench_flash_pipeline.py
+    python bench_flash_pipeline.py --concurrency 1 8 32 --size-kb 2048 --frame-ms 100
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import psutil
+
+from bk7236_engine import FlashPipeline, OutputPipe
+from bk_loader_sim import synthetic_log
+
+SIM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bk_loader_sim.py")
+_STAMP_RE = re.compile(r'@(\d+\.\d+)')
+_DROPPED_RE = re.compile(r'已丢弃 (\d+) 行')
+
+SERIAL_CONFIG = {
+    'baudrate': "2000000",
+    'uart_type': "CH340",
+    'fast_link': True,
+    'big_endian': True,
+    'update_ver': False,
+}
+
+
+def sim_command(*options):
+    return " ".join([f'"{sys.executable}"', f'"{SIM_PATH}"'] + list(options))
+
+
+class UiConsumer(threading.Thread):
+    """模拟 BKLoaderApp.on_timer: 每帧从OutputPipe取一次输出并记录延迟"""
+    def __init__(self, pipe, frame_ms):
+        super().__init__()
+        self.pipe = pipe
+        self.frame = frame_ms / 1000.0
+        self.latencies = []
+        self.chunks = 0
+        self.dropped = 0
+        self._stop_event = threading.Event()
+        self.daemon = True
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            time.sleep(self.frame)
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        while True:
+            chunks = self.pipe.drain()
+            if not chunks:
+                return
+            now = time.time()
+            for _, text in chunks:
+                self.chunks += 1
+                for stamp in _STAMP_RE.findall(text):
+                    self.latencies.append(now - float(stamp))
+                for dropped in _DROPPED_RE.findall(text):
+                    self.dropped += int(dropped)
+
+
+def make_image():
+    """外部Flash文件会在内部Flash烧录期间预先检查，需要真实存在，由调用者删除"""
+    with tempfile.NamedTemporaryFile(prefix="bench_", suffix=".bin", delete=False) as image:
+        image.write(b"\xff" * 4096)
+    return image.name
+
+
+def make_pipelines(count, pipe, loader, callback, files, use_pty=False):
+    pipelines = []
+    for i in range(count):
+        config = dict(SERIAL_CONFIG)
+        config['port'] = f"COM{i + 1}"
+        pipelines.append(FlashPipeline(config, files, files, pipe, callback=callback,
+                                       loaders={"internal": loader, "external": loader},
+                                       reboot_delay=0, use_pty=use_pty))
+    return pipelines
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def bench_throughput(count, size_kb, frame_ms, files, use_pty=False):
+    pipe = OutputPipe()
+    consumer = UiConsumer(pipe, frame_ms)
+    done = threading.Semaphore(0)
+    results = []
+
+    def on_completed(port, success, user_stopped):
+        results.append(success)
+        done.release()
+
+    loader = sim_command("--sim-stamp", f"--sim-size-kb {size_kb}")
+    pipelines = make_pipelines(count, pipe, loader, on_completed, files, use_pty)
+
+    process = psutil.Process()
+    tracemalloc.start()
+    consumer.start()
+    start = time.perf_counter()
+    for pipeline in pipelines:
+        pipeline.start()
+    for _ in pipelines:
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    consumer.stop()
+    consumer.join()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lines = count * 2 * len(synthetic_log(size_kb))
+    records = [record for pipeline in pipelines for record in pipeline.records]
+    spawn = [record['spawn_ms'] for record in records if 'spawn_ms' in record]
+    first = [record['first_output_ms'] for record in records if 'first_output_ms' in record]
+    return {
+        'spawn_ms': statistics.median(spawn) if spawn else 0,
+        'first_output_ms': statistics.median(first) if first else 0,
+        'lines_per_sec': lines / elapsed,
+        'elapsed': elapsed,
+        'passed': sum(1 for r in results if r),
+        'latency_p50': percentile(consumer.latencies, 50) * 1000,
+        'latency_p95': percentile(consumer.latencies, 95) * 1000,
+        'latency_max': max(consumer.latencies or [0]) * 1000,
+        'ui_chunks': consumer.chunks,
+        'dropped': consumer.dropped,
+        'peak_mb': peak / 1024 / 1024,
+        'rss_mb': process.memory_info().rss / 1024 / 1024,
+    }
+
+
+def bench_stop(count, line_rate, files, size_kb=16384):
+    """模拟器限速输出一个足够大的镜像，保证调用stop()时所有流水线都还在烧录"""
+    pipe = OutputPipe()
+    consumer = UiConsumer(pipe, 100)
+    finished = {}
+    all_done = threading.Event()
+
+    def on_completed(port, success, user_stopped):
+        finished[port] = time.perf_counter()
+        if len(finished) == count:
+            all_done.set()
+
+    loader = sim_command(f"--sim-size-kb {size_kb}", f"--sim-line-rate {line_rate}")
+    pipelines = make_pipelines(count, pipe, loader, on_completed, files)
+    consumer.start()
+    for pipeline in pipelines:
+        pipeline.start()
+    time.sleep(1.0)
+
+    start = time.perf_counter()
+    for pipeline in pipelines:
+        pipeline.stop()
+    call_time = time.perf_counter() - start
+    all_done.wait(30)
+    consumer.stop()
+    consumer.join()
+
+    latencies = [t - start for t in finished.values()]
+    return {
+        'stop_call': call_time * 1000,
+        'stop_mean': statistics.mean(latencies) * 1000 if latencies else 0,
+        'stop_max': max(latencies or [0]) * 1000,
+        'stopped': len(finished),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="烧录流程压测(使用bk_loader模拟器)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help="并发烧录路数")
+    parser.add_argument('--size-kb', type=int, default=1024, help="模拟镜像大小(KB)")
+    parser.add_argument('--frame-ms', type=int, default=100, help="UI定时器周期(毫秒)")
+    parser.add_argument('--stop-line-rate', type=float, default=200, help="停止测试时模拟器每秒输出行数")
+    parser.add_argument('--pty', action='store_true', help="模拟器输出接到伪终端(仅Linux/macOS)")
+    args = parser.parse_args()
+
+    print(f"模拟镜像: {args.size_kb} KB x 内部+外部, 每次烧录 {2 * len(synthetic_log(args.size_kb))} 行输出")
+    print(f"{'并发':>4} {'行/秒':>10} {'耗时s':>7} {'通过':>5} {'UI延迟p50':>10} {'p95':>8} {'max':>8} "
+          f"{'UI块':>6} {'丢弃':>5} {'峰值MB':>7} {'RSS MB':>7} {'启动ms':>7} {'首行ms':>7} "
+          f"{'停止调用ms':>10} {'停止均值ms':>10} {'停止最大ms':>10}")
+    image = make_image()
+    files = [{'path': image, 'address': "0x0", 'enabled': True}]
+    try:
+        for count in args.concurrency:
+            t = bench_throughput(count, args.size_kb, args.frame_ms, files, args.pty)
+            s = bench_stop(count, args.stop_line_rate, files)
+            print(f"{count:>4} {t['lines_per_sec']:>10.0f} {t['elapsed']:>7.2f} {t['passed']:>5} "
+                  f"{t['latency_p50']:>10.1f} {t['latency_p95']:>8.1f} {t['latency_max']:>8.1f} "
+                  f"{t['ui_chunks']:>6} {t['dropped']:>5} {t['peak_mb']:>7.1f} {t['rss_mb']:>7.1f} "
+                  f"{t['spawn_ms']:>7.2f} {t['first_output_ms']:>7.1f} "
+                  f"{s['stop_call']:>10.1f} {s['stop_mean']:>10.1f} {s['stop_max']:>10.1f}")
+    finally:
+        os.remove(image)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""BK7236 自动烧录队列 - 插入匹配的串口后自动执行完整的内部→外部烧录
+
+烧录配置在启动队列时固定下来，之后每插入一个匹配(VID/PID 或 hwid)的新串口就自动烧录，
+烧录结束后记录到单元日志(CSV)并释放串口；同一串口拔出再插入视为新的单元。
+不依赖wx，界面程序和命令行共用。
+
+命令行用法:
+    python bk7236_autoflash.py profile.json --match 1A86:7523 --parallel 4 --log units.csv
+"""
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from bk7236_engine import (FlashPipeline, JsonLineWriter, JsonOutputSink, ProfileError,
+                           load_profile, split_files)
+from bk7236_telemetry import FlashHistory
+from serial_hotplug import get_port_service
+
+UNIT_LOG_FIELDS = ['time', 'port', 'vid_pid', 'serial_number', 'result', 'elapsed', 'stop_ms']
+
+
+def parse_vid_pid(text):
+    """解析 "1A86:7523,0403:6001" 形式的VID:PID列表"""
+    result = []
+    for item in text.replace(' ', '').split(','):
+        if not item:
+            continue
+        vid, sep, pid = item.partition(':')
+        if not sep:
+            raise ValueError(f"VID:PID格式错误: {item}")
+        result.append((int(vid, 16), int(pid, 16)))
+    return result
+
+
+class PortMatcher:
+    """按VID/PID或hwid子串匹配串口，两者都未指定时匹配所有USB串口"""
+    def __init__(self, vid_pids=None, hwid_patterns=None):
+        self.vid_pids = set(vid_pids or [])
+        self.hwid_patterns = [pattern.lower() for pattern in (hwid_patterns or []) if pattern]
+
+    def matches(self, port_info):
+        if self.vid_pids and (port_info.get('vid'), port_info.get('pid')) in self.vid_pids:
+            return True
+        hwid = (port_info.get('hwid') or "").lower()
+        if self.hwid_patterns and any(pattern in hwid for pattern in self.hwid_patterns):
+            return True
+        if not self.vid_pids and not self.hwid_patterns:
+            return port_info.get('vid') is not None
+        return False
+
+    @property
+    def matches_all(self):
+        """没有任何匹配条件，插入的所有USB串口都会被烧录"""
+        return not self.vid_pids and not self.hwid_patterns
+
+
+def format_vid_pid(port_info):
+    if port_info.get('vid') is None:
+        return ""
+    return f"{port_info['vid']:04X}:{port_info['pid']:04X}"
+
+
+class UnitLog:
+    """已完成单元的CSV日志，每个单元一行，追加写入"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, row):
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                new_file = not os.path.exists(self.path)
+                with open(self.path, 'a', newline='', encoding='utf-8-sig') as f:
+                    writer = csv.DictWriter(f, fieldnames=UNIT_LOG_FIELDS)
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerow(row)
+            except OSError as e:
+                print(f"写入单元日志失败: {e}")
+
+
+class AutoFlashQueue:
+    """插入匹配的串口后自动烧录
+
+    on_event(kind, port, data) 在串口服务线程或烧录线程中调用，kind为:
+    "queued"(等待烧录) / "started" / "finished"(data为单元日志行) / "removed"(串口拔出)
+    max_parallel 限制同时烧录的串口数，多出的串口排队；settle_delay为插入后等待驱动就绪的时间(秒)。
+    """
+    def __init__(self, serial_config, internal_files, external_files, output_queue, matcher,
+                 on_event=None, unit_log=None, history=None, max_parallel=8, settle_delay=0.5,
+                 loaders=None, progress_factory=None):
+        self.serial_config = dict(serial_config)
+        self.internal_files = list(internal_files)
+        self.external_files = list(external_files)
+        self.output_queue = output_queue
+        self.matcher = matcher
+        self.on_event = on_event
+        self.unit_log = unit_log
+        self.history = history
+        self.max_parallel = max_parallel
+        self.settle_delay = settle_delay
+        self.loaders = loaders
+        self.progress_factory = progress_factory  # port -> 进度通道，None时使用FlashPipeline默认的ProgressSlot
+        self.pipelines = {}  # 正在烧录的串口 -> FlashPipeline
+        self.pass_count = 0
+        self.fail_count = 0
+        self._pending = deque()  # 等待烧录的串口信息
+        self._done = set()  # 已烧录完成、尚未拔出的串口
+        self._port_info = {}
+        self._armed = False
+        self._lock = threading.Lock()
+
+    # ---------- 对外接口 ----------
+    def arm(self, include_present=False):
+        """开始监听串口插入；include_present为True时已连接的匹配串口也烧录一次"""
+        with self._lock:
+            self._armed = True
+        service = get_port_service()
+        service.subscribe(self.on_ports_changed)
+        if include_present:
+            self.on_ports_changed(service.get_ports(), [], None)
+        else:
+            # 已连接的串口视为已烧录，拔出后再插入才会烧录
+            with self._lock:
+                self._done.update(info['device'] for info in service.get_ports() if self.matcher.matches(info))
+
+    def disarm(self, stop_running=False):
+        """停止监听，stop_running为True时同时停止正在烧录的串口"""
+        get_port_service().unsubscribe(self.on_ports_changed)
+        with self._lock:
+            self._armed = False
+            self._pending.clear()
+            pipelines = list(self.pipelines.values())
+        if stop_running:
+            for pipeline in pipelines:
+                pipeline.stop()
+
+    def is_armed(self):
+        return self._armed
+
+    def is_running(self):
+        with self._lock:
+            return bool(self.pipelines)
+
+    def queued_ports(self):
+        with self._lock:
+            return [info['device'] for info in self._pending]
+
+    # ---------- 内部实现 ----------
+    def _emit(self, kind, port, data=None):
+        if self.on_event:
+            try:
+                self.on_event(kind, port, data)
+            except Exception as e:
+                print(f"自动烧录事件回调错误: {e}")
+
+    def on_ports_changed(self, added, removed, ports):
+        for info in removed:
+            device = info['device']
+            if not self.matcher.matches(info):
+                continue
+            # 烧录中的串口不主动停止: 原生USB的设备内部Flash烧录后重启也会短暂消失，真正拔出时烧录程序自己会失败
+            with self._lock:
+                self._done.discard(device)
+                self._pending = deque(item for item in self._pending if item['device'] != device)
+            self._emit("removed", device)
+
+        for info in added:
+            device = info['device']
+            if not self.matcher.matches(info):
+                continue
+            with self._lock:
+                if (not self._armed or device in self._done or device in self.pipelines
+                        or any(item['device'] == device for item in self._pending)):
+                    continue
+                self._pending.append(info)
+                self._port_info[device] = info
+            self._emit("queued", device, info)
+
+        # 等驱动就绪后再开始烧录
+        timer = threading.Timer(self.settle_delay, self._start_pending)
+        timer.daemon = True
+        timer.start()
+
+    def _start_pending(self):
+        started = []
+        with self._lock:
+            while self._armed and self._pending and len(self.pipelines) < self.max_parallel:
+                info = self._pending.popleft()
+                device = info['device']
+                config = dict(self.serial_config)
+                config['port'] = device
+                progress_queue = self.progress_factory(device) if self.progress_factory else None
+                pipeline = FlashPipeline(config, self.internal_files, self.external_files, self.output_queue,
+                                         callback=self._on_pipeline_completed, progress_queue=progress_queue,
+                                         loaders=self.loaders, history=self.history)
+                self.pipelines[device] = pipeline
+                started.append((device, pipeline))
+        for device, pipeline in started:
+            self._emit("started", device, pipeline)
+            pipeline.start()
+
+    def _on_pipeline_completed(self, port, success, user_stopped):
+        with self._lock:
+            pipeline = self.pipelines.pop(port, None)
+            info = self._port_info.pop(port, {})
+            if not user_stopped:
+                if get_port_service().get_port(port):
+                    self._done.add(port)  # 释放串口，拔出后再插入才会再次烧录
+                if success:
+                    self.pass_count += 1
+                else:
+                    self.fail_count += 1
+
+        elapsed = None
+        if pipeline and pipeline.start_time and pipeline.end_time:
+            elapsed = round(pipeline.end_time - pipeline.start_time, 3)
+        row = {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'port': port,
+            'vid_pid': format_vid_pid(info),
+            'serial_number': info.get('serial_number') or "",
+            'result': "stopped" if user_stopped else ("pass" if success else "fail"),
+            'elapsed': elapsed,
+            'stop_ms': round(pipeline.stop_ms, 2) if pipeline and pipeline.stop_ms is not None else "",
+        }
+        if self.unit_log:
+            self.unit_log.append(row)
+        self._emit("finished", port, row)
+        self._start_pending()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BK7236 插入串口自动烧录（不依赖wx）")
+    parser.add_argument('profile', help="bk7236_flasher 保存的JSON配置文件")
+    parser.add_argument('--profile-name', help="使用配置文件中保存的配置方案")
+    parser.add_argument('--match', default="", help="匹配的VID:PID，多个用逗号分隔，如 1A86:7523")
+    parser.add_argument('--hwid', action='append', default=[], help="匹配hwid中包含的文字，可重复")
+    parser.add_argument('--any-port', action='store_true', help="未指定 --match/--hwid 时烧录插入的所有USB串口")
+    parser.add_argument('--parallel', type=int, default=8, help="最多同时烧录的串口数")
+    parser.add_argument('--log', default="autoflash_units.csv", help="已完成单元的CSV日志")
+    parser.add_argument('--history', help="烧录历史文件")
+    parser.add_argument('--include-present', action='store_true', help="启动时已连接的匹配串口也烧录")
+    parser.add_argument('--no-output', action='store_true', help="不输出烧录程序的原始日志")
+    args = parser.parse_args(argv)
+
+    writer = JsonLineWriter()
+    try:
+        profile = load_profile(args.profile, args.profile_name)
+        internal_files, external_files = split_files(profile['files'])
+        if not internal_files and not external_files:
+            raise ProfileError("没有需要烧录的文件")
+        matcher = PortMatcher(parse_vid_pid(args.match), args.hwid)
+        if matcher.matches_all and not args.any_port:
+            raise ValueError("未指定 --match 或 --hwid，会烧录插入的所有USB串口；确认要这样做请加 --any-port")
+    except ProfileError as e:
+        writer.emit("error", message=str(e), exit_code=e.exit_code)
+        return e.exit_code
+    except ValueError as e:
+        writer.emit("error", message=str(e), exit_code=2)
+        return 2
+
+    def on_event(kind, port, data):
+        if kind == "finished":
+            writer.emit("unit", **data)
+        elif kind != "started":
+            writer.emit(kind, port=port)
+
+    queue = AutoFlashQueue(profile['serial'], internal_files, external_files,
+                           JsonOutputSink(writer, "", enabled=not args.no_output), matcher,
+                           on_event=on_event, unit_log=UnitLog(args.log),
+                           history=FlashHistory(args.history) if args.history else None,
+                           max_parallel=args.parallel)
+    queue.arm(include_present=args.include_present)
+    writer.emit("armed", log=os.path.abspath(args.log))
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        queue.disarm(stop_running=True)
+        deadline = time.time() + 5
+        while queue.is_running() and time.time() < deadline:
+            time.sleep(0.05)
+    writer.emit("summary", passed=queue.pass_count, failed=queue.fail_count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""BK7236 自动波特率 - 从高到低尝试波特率，按 串口适配器+芯片 缓存能用的最高波特率
+
+串口配置的 baudrate 为 "auto" 时启用:
+- 首次使用某个适配器时从最高的候选波特率开始，之后直接使用缓存的波特率
+- 握手成功(识别到芯片)后因连接失败、超时或写入失败结束时，记录该波特率失败并自动降一档重试；
+  握手就失败(没有设备、串口被占用)与波特率无关，不重试
+- 烧录成功后记录该适配器和芯片能用的波特率
+
+不依赖wx，界面程序和命令行共用。
+
+命令行查看缓存:
+    python bk7236_baud.py [缓存文件]
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from bk7236_image import LOG_DIR
+from serial_hotplug import port_identity
+
+AUTO_BAUD = "auto"
+# 候选波特率，从高到低
+BAUD_CANDIDATES = ("6000000", "5000000", "4000000", "3000000", "2000000", "1500000", "1000000", "921600",
+                   "512000", "115200")
+# 可能由波特率过高导致的失败原因(见 bk7236_parser.FAILURE_PATTERNS)
+LINK_FAILURES = ("串口连接失败", "设备连接失败", "操作超时", "Flash写入失败")
+# 每个阶段最多降档重试的次数(默认可以一直降到最低档)
+MAX_RETRIES = len(BAUD_CANDIDATES) - 1
+
+DEFAULT_CACHE_FILE = os.path.join(LOG_DIR, "baud_cache.json")
+
+
+def lower_baudrate(baudrate):
+    """返回比baudrate低一档的候选波特率，没有时返回None"""
+    for candidate in BAUD_CANDIDATES:
+        if int(candidate) < int(baudrate):
+            return candidate
+    return None
+
+
+class BaudCache:
+    """{适配器: {芯片: {"baudrate": 能用的波特率, "failed": [失败过的波特率], "time": 更新时间}}}"""
+    def __init__(self, path=DEFAULT_CACHE_FILE):
+        self.path = path
+        self._data = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._data = data
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"保存波特率缓存失败: {e}")
+
+    def lookup(self, adapter, chip=None):
+        """返回缓存的波特率；芯片未知时使用该适配器最近更新的记录，没有记录时返回None"""
+        with self._lock:
+            self._load()
+            chips = self._data.get(adapter, {})
+            if chip and chip in chips:
+                return chips[chip].get('baudrate')
+            if not chips:
+                return None
+            return max(chips.values(), key=lambda entry: entry.get('time', 0)).get('baudrate')
+
+    def _entry(self, adapter, chip):
+        self._load()
+        return self._data.setdefault(adapter, {}).setdefault(chip or "unknown", {'baudrate': None, 'failed': []})
+
+    def record_success(self, adapter, chip, baudrate):
+        with self._lock:
+            entry = self._entry(adapter, chip)
+            entry['baudrate'] = baudrate
+            entry['failed'] = [rate for rate in entry['failed'] if int(rate) > int(baudrate)]
+            entry['time'] = round(time.time(), 3)
+            self._save()
+
+    def record_failure(self, adapter, chip, baudrate):
+        with self._lock:
+            entry = self._entry(adapter, chip)
+            if baudrate not in entry['failed']:
+                entry['failed'].append(baudrate)
+            # 缓存的波特率失败后降一档，下次直接从低一档开始
+            if entry['baudrate'] is None or int(entry['baudrate']) >= int(baudrate):
+                entry['baudrate'] = lower_baudrate(baudrate)
+            entry['time'] = round(time.time(), 3)
+            self._save()
+
+    def report(self):
+        with self._lock:
+            self._load()
+            lines = [f"{'适配器':<40} {'芯片':<10} {'波特率':>9}  失败过的波特率"]
+            for adapter in sorted(self._data):
+                for chip, entry in sorted(self._data[adapter].items()):
+                    lines.append(f"{adapter:<40} {chip:<10} {entry.get('baudrate') or '--':>9}  "
+                                 f"{', '.join(entry.get('failed', []))}")
+            return "\n".join(lines)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_baud_cache():
+    """进程内共用的波特率缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = BaudCache()
+        return _cache
+
+
+class BaudNegotiator:
+    """一次烧录流程中的波特率选择，内部/外部两个阶段共用
+
+    serial_config 的 baudrate 不是 "auto" 时始终使用配置的波特率，不重试。
+    """
+    def __init__(self, serial_config, cache=None, max_retries=MAX_RETRIES):
+        self.auto = str(serial_config.get('baudrate', '')).lower() == AUTO_BAUD
+        self.cache = cache or get_baud_cache()
+        self.max_retries = max_retries
+        self.chip = None
+        self.retries = 0
+        if self.auto:
+            self.adapter = port_identity(serial_config.get('port', ''))
+            self.baudrate = self.cache.lookup(self.adapter) or BAUD_CANDIDATES[0]
+        else:
+            self.adapter = None
+            self.baudrate = serial_config.get('baudrate')
+
+    def apply(self, serial_config):
+        """返回使用当前波特率的串口配置"""
+        config = dict(serial_config)
+        config['baudrate'] = self.baudrate
+        return config
+
+    def on_result(self, success, executor):
+        """一个阶段结束后调用，返回需要重试的更低波特率，不需要重试时返回None"""
+        if executor is not None and executor.classifier.chip:
+            self.chip = executor.classifier.chip
+        if not self.auto:
+            return None
+        if success:
+            self.cache.record_success(self.adapter, self.chip, self.baudrate)
+            self.retries = 0
+            return None
+        if executor is None or executor.failure_reason not in LINK_FAILURES or not executor.classifier.chip:
+            return None
+        self.cache.record_failure(self.adapter, self.chip, self.baudrate)
+        lower = lower_baudrate(self.baudrate)
+        if lower is None or self.retries >= self.max_retries:
+            return None
+        self.retries += 1
+        self.baudrate = lower
+        return lower
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else DEFAULT_CACHE_FILE
+    if not os.path.exists(path):
+        print(f"波特率缓存文件不存在: {path}")
+        return 1
+    print(BaudCache(path).report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
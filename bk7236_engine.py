@@ -0,0 +1,1339 @@
+"""BK7236 烧录引擎 - 不依赖wx的烧录核心和命令行入口
+
+界面程序 bk7236_flasher.py 和产线控制脚本共用这里的命令构建、进程管理和烧录流水线。
+
+命令行用法:
+    python bk7236_engine.py profile.json [--port COM3] [--baudrate 2000000]
+
+profile.json 为 bk7236_flasher 保存的配置文件（含 last_config 的配置文件也可以），
+进度以JSON行输出到标准输出，退出码见 EXIT_* 常量。
+"""
+import argparse
+import codecs
+import json
+import os
+import queue
+import re
+import select
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import pty
+except ImportError:  # Windows没有pty
+    pty = None
+
+import psutil
+import serial
+
+from bk7236_parser import OutputClassifier, classify_failure, classify_color
+from bk7236_telemetry import FlashHistory, PhaseTimer, make_record, files_kb
+from bk7236_image import prepare_files, SECTOR_SIZE
+from bk7236_manifest import plan_diff
+from bk7236_baud import BaudNegotiator
+
+# 命令行退出码
+EXIT_OK = 0  # 烧录成功
+EXIT_FLASH_FAILED = 1  # 烧录失败
+EXIT_BAD_PROFILE = 2  # 参数或配置文件错误
+EXIT_MISSING_FILE = 3  # 烧录文件不存在
+EXIT_STOPPED = 130  # 被用户中断
+
+
+def resource_path(relative_path):
+    """获取资源文件的路径"""
+    if getattr(sys, 'frozen', False): # 是否为打包后的环境
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+def split_command(cmd):
+    """把命令行字符串拆成参数列表；已经是列表或是一个存在的程序路径(可含空格)时原样使用"""
+    if isinstance(cmd, (list, tuple)):
+        return list(cmd)
+    if os.path.exists(cmd):
+        return [cmd]
+    if os.name == 'nt':
+        # Windows路径中的反斜杠不能按posix规则转义
+        return [part[1:-1] if len(part) >= 2 and part[0] == part[-1] == '"' else part
+                for part in shlex.split(cmd, posix=False)]
+    return shlex.split(cmd)
+
+def format_command(argv):
+    """把参数列表格式化成可以复制到终端执行的命令行，用于日志显示"""
+    if isinstance(argv, str):
+        return argv
+    if os.name == 'nt':
+        return subprocess.list2cmdline(argv)
+    return shlex.join(argv)
+
+def build_internal_command(serial_config, internal_files, loader=None):
+    """根据串口配置和内部Flash文件列表构建bk_loader参数列表，loader可替换默认的bk_loader.exe"""
+    if not serial_config.get('port') or not internal_files:
+        return None
+    
+    cmd_parts = []
+    if loader:
+        cmd_parts.extend(split_command(loader))
+    else:
+        cmd_parts.append(resource_path(os.path.join("res", "bk_loader.exe")))
+    cmd_parts.append("download")
+    
+    port_num = serial_config['port'].replace("COM", "")
+    cmd_parts.extend(["-p", port_num])
+    
+    cmd_parts.extend(["-b", serial_config['baudrate']])
+    
+    cmd_parts.extend(["--uart-type", serial_config['uart_type']])
+    
+    cmd_parts.append("--mainBin-multi")
+    
+    # 构建文件地址列表
+    file_parts = []
+    for file_info in internal_files:
+        file_parts.append(f"{file_info['path']}@{file_info['address']}")
+    
+    cmd_parts.append(",".join(file_parts))
+    
+    if serial_config['big_endian']:
+        cmd_parts.append("--big-endian")
+    
+    if serial_config['fast_link']:
+        cmd_parts.extend(["--fast-link", "1"])
+    
+    return cmd_parts
+
+def build_external_command(serial_config, external_files, loader=None):
+    """根据串口配置和外部SPI Flash文件列表构建bk_loader_nor_ver参数列表，loader可替换默认的bk_loader_nor_ver.exe"""
+    if not serial_config.get('port') or not external_files:
+        return None
+    
+    cmd_parts = []
+    if loader:
+        cmd_parts.extend(split_command(loader))
+    else:
+        cmd_parts.append(resource_path(os.path.join("res", "bk_loader_nor_ver.exe")))
+    cmd_parts.append("download")
+    
+    port_num = serial_config['port'].replace("COM", "")
+    cmd_parts.extend(["-p", port_num])
+    
+    cmd_parts.extend(["-b", serial_config['baudrate']])
+    
+    cmd_parts.extend(["--uart-type", serial_config['uart_type']])
+    
+    cmd_parts.append("--mainBin-multi")
+    
+    # 构建文件地址列表
+    for file_info in external_files:
+        cmd_parts.append(f"{file_info['path']}@{file_info['address']}")
+    
+    if serial_config['fast_link']:
+        cmd_parts.extend(["--fast-link", "1"])
+        
+    if serial_config.get('update_ver', False):
+        cmd_parts.extend(["--update-ver", "1"])
+    
+    return cmd_parts
+
+
+# 停止烧录程序的期限(秒)：先发终止信号，超过宽限时间仍未退出则强制结束整个进程组
+STOP_DEADLINE = 0.5
+STOP_GRACE = 0.2
+
+class ProcessSupervisor:
+    """跟踪本程序启动的所有烧录进程，按进程组整体停止
+    
+    每个烧录程序在独立的会话/进程组中启动(Windows为独立进程组)，停止时直接向进程组发信号，
+    不再遍历系统中的所有进程；停止在 STOP_DEADLINE 内完成，每次停止的耗时记录在 stop_times 中。
+    """
+    def __init__(self):
+        self._processes = {}  # pid -> (Popen, 标签)
+        self._stopping = {}  # pid -> 开始停止的时间
+        self._lock = threading.Lock()
+        self.stop_times = deque(maxlen=200)  # (标签, pid, 耗时ms, 是否强制结束)
+    
+    @staticmethod
+    def popen_kwargs():
+        """启动烧录程序时使用的参数，让每个烧录程序处于独立的进程组"""
+        if os.name == 'nt':
+            return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        return {'start_new_session': True}
+    
+    def register(self, process, tag=None):
+        with self._lock:
+            self._processes[process.pid] = (process, tag)
+    
+    def unregister(self, process):
+        with self._lock:
+            self._processes.pop(process.pid, None)
+            self._stopping.pop(process.pid, None)
+    
+    def running(self):
+        with self._lock:
+            return [process for process, _ in self._processes.values() if process.poll() is None]
+    
+    def _signal_group(self, process, force):
+        if os.name == 'nt':
+            # Windows没有进程组信号，结束烧录程序及其子进程(只查询该进程的子进程)
+            try:
+                children = psutil.Process(process.pid).children(recursive=True)
+            except psutil.Error:
+                children = []
+            for child in children:
+                try:
+                    child.kill()
+                except psutil.Error:
+                    pass
+            try:
+                process.kill()
+            except OSError:
+                pass
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    def terminate(self, process):
+        """向烧录程序所在进程组发送终止信号，立即返回"""
+        if process is None:
+            return
+        with self._lock:
+            if process.pid in self._stopping:
+                return
+            self._stopping[process.pid] = time.perf_counter()
+        self._signal_group(process, force=False)
+    
+    def wait_stopped(self, process, deadline=STOP_DEADLINE):
+        """等待进程组退出，超过宽限时间强制结束，返回从开始停止到退出的耗时(ms)"""
+        if process is None:
+            return 0.0
+        with self._lock:
+            started = self._stopping.get(process.pid)
+            tag = self._processes.get(process.pid, (None, None))[1]
+        if started is None:
+            self.terminate(process)
+            started = time.perf_counter()
+        
+        forced = False
+        try:
+            process.wait(timeout=max(0, started + min(STOP_GRACE, deadline) - time.perf_counter()))
+        except subprocess.TimeoutExpired:
+            forced = True
+            self._signal_group(process, force=True)
+            try:
+                process.wait(timeout=max(0.01, started + deadline - time.perf_counter()))
+            except subprocess.TimeoutExpired:
+                pass
+        if forced or os.name != 'nt':
+            # 烧录程序已退出，清理进程组中可能残留的子进程
+            self._signal_group(process, force=True)
+        
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stop_times.append((tag, process.pid, elapsed, forced))
+        return elapsed
+    
+    def stop(self, process, deadline=STOP_DEADLINE):
+        self.terminate(process)
+        return self.wait_stopped(process, deadline)
+    
+    def stop_all(self, deadline=STOP_DEADLINE):
+        """同时停止所有正在运行的烧录程序，返回 (停止的进程数, 总耗时ms)"""
+        start = time.perf_counter()
+        processes = self.running()
+        for process in processes:
+            self.terminate(process)
+        for process in processes:
+            self.wait_stopped(process, deadline)
+        return len(processes), (time.perf_counter() - start) * 1000
+
+
+_supervisor = ProcessSupervisor()
+
+
+def get_supervisor():
+    """进程内共享的烧录进程监管器"""
+    return _supervisor
+
+class OutputPipe:
+    """烧录线程→UI的有界日志通道
+    
+    - 队列满时烧录线程阻塞等待(背压)，超时仍满则丢弃该行并计数，内存不会无限增长
+    - 同一来源连续的百分比行只保留最新一行
+    - 颜色类别在烧录线程中计算好，UI每帧一次取走按颜色合并后的文本块
+    """
+    def __init__(self, maxsize=2000, put_timeout=0.5):
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.dropped = 0
+        self._items = deque()
+        self._pending = {}  # 来源 -> 尚未被UI取走的百分比条目
+        self._cond = threading.Condition()
+    
+    def put(self, text, source=None, coalesce=False):
+        color = classify_color(text)
+        with self._cond:
+            if coalesce:
+                entry = self._pending.get(source)
+                if entry is not None:
+                    entry[0] = text
+                    entry[1] = color
+                    return
+            else:
+                self._pending.pop(source, None)
+            
+            if len(self._items) >= self.maxsize:
+                self._cond.wait_for(lambda: len(self._items) < self.maxsize, self.put_timeout)
+                if len(self._items) >= self.maxsize:
+                    self.dropped += 1
+                    return
+            
+            entry = [text, color, source]
+            self._items.append(entry)
+            if coalesce:
+                self._pending[source] = entry
+    
+    def drain(self, max_items=500):
+        """取出最多max_items行，返回按颜色合并后的[(颜色类别, 文本), ...]"""
+        with self._cond:
+            count = min(max_items, len(self._items))
+            if not count:
+                return []
+            entries = [self._items.popleft() for _ in range(count)]
+            for entry in entries:
+                if self._pending.get(entry[2]) is entry:
+                    del self._pending[entry[2]]
+            dropped, self.dropped = self.dropped, 0
+            self._cond.notify_all()
+        
+        chunks = []
+        for text, color, _ in entries:
+            if chunks and chunks[-1][0] == color:
+                chunks[-1][1].append(text)
+            else:
+                chunks.append((color, [text]))
+        if dropped:
+            chunks.append(("warning", [f"[日志] 输出过快，已丢弃 {dropped} 行\n"]))
+        return [(color, "".join(texts)) for color, texts in chunks]
+    
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+            self._pending.clear()
+            self._cond.notify_all()
+
+class ProgressSlot:
+    """只保留最新一次进度的通道，接口与queue.Queue的put/get_nowait兼容"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+    
+    def put(self, item, block=True, timeout=None):
+        with self._lock:
+            self._item = item
+    
+    def put_nowait(self, item):
+        self.put(item)
+    
+    def get_nowait(self):
+        with self._lock:
+            if self._item is None:
+                raise queue.Empty
+            item, self._item = self._item, None
+            return item
+    
+    def empty(self):
+        return self._item is None
+
+# 行结束符: \r\n、\n，以及进度刷新常用的单独\r
+_LINE_END_RE = re.compile(r'\r\n|\r|\n')
+
+class LoaderProcess:
+    """直接执行烧录程序（不经过shell），按大块非阻塞读取输出并切分成行
+    
+    use_pty为True且系统支持pty时，烧录程序的输出接到伪终端上，
+    按行缓冲输出，不会因为输出到管道而攒成一大块；不支持时使用管道。
+    spawn_ms为创建进程的耗时，first_output_ms为启动到收到第一块输出的时间。
+    进程在独立的进程组中启动并登记到 ProcessSupervisor，由监管器负责停止。
+    """
+    CHUNK_SIZE = 65536
+    
+    def __init__(self, argv, use_pty=False, tag=None, supervisor=None):
+        self.argv = list(argv)
+        self.tag = tag
+        self.supervisor = supervisor or get_supervisor()
+        self.use_pty = bool(use_pty and pty is not None)
+        self.process = None
+        self.pid = None
+        self.spawn_ms = None
+        self.first_output_ms = None
+        self._fd = None
+        self._start = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ""
+        self._after_cr = False  # 上一块以\r结尾，下一块开头的\n属于同一个行尾
+        self._eof = False
+    
+    def start(self):
+        self._start = time.perf_counter()
+        group_kwargs = ProcessSupervisor.popen_kwargs()
+        if self.use_pty:
+            master, slave = pty.openpty()
+            try:
+                self.process = subprocess.Popen(self.argv, stdin=subprocess.PIPE, stdout=slave, stderr=slave,
+                                                close_fds=True, **group_kwargs)
+            except Exception:
+                os.close(master)
+                raise
+            finally:
+                os.close(slave)
+            self._fd = master
+        else:
+            # 不经过cmd.exe时，GUI程序启动控制台程序会弹出窗口，需要CREATE_NO_WINDOW
+            if os.name == 'nt':
+                group_kwargs['creationflags'] |= subprocess.CREATE_NO_WINDOW
+            self.process = subprocess.Popen(self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=subprocess.STDOUT, bufsize=0, **group_kwargs)
+            self._fd = self.process.stdout.fileno()
+        self.spawn_ms = (time.perf_counter() - self._start) * 1000
+        self.pid = self.process.pid
+        self.supervisor.register(self.process, self.tag)
+        return self.process
+    
+    def read_lines(self, timeout=0.1):
+        """读取已到达的输出，返回完整的行列表(不含换行符)；没有新输出返回[]，输出结束返回None"""
+        if self._eof:
+            return None
+        
+        if os.name != 'nt':
+            # Windows的select不支持管道，直接阻塞读取，停止时由结束进程唤醒
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if not ready:
+                return []
+        
+        try:
+            data = os.read(self._fd, self.CHUNK_SIZE)
+        except OSError:
+            data = b""  # pty在子进程退出后读取返回EIO
+        
+        if data and self.first_output_ms is None:
+            self.first_output_ms = (time.perf_counter() - self._start) * 1000
+        
+        text = self._decoder.decode(data, final=not data)
+        if self._after_cr and text:
+            if text.startswith("\n"):
+                text = text[1:]  # \r\n 被分在两块里，\r处的行已经输出
+            self._after_cr = False
+        text = self._pending + text
+        if not data:
+            self._eof = True
+            self._pending = ""
+            return [line for line in _LINE_END_RE.split(text) if line] or None
+        
+        lines = _LINE_END_RE.split(text)
+        self._pending = lines.pop()
+        # 以\r结尾的行(进度刷新或被分开的\r\n)立即输出，下一块开头的\n丢弃
+        self._after_cr = text.endswith("\r")
+        return [line for line in lines if line]
+    
+    def terminate(self):
+        """请求停止(立即返回)，由读取线程调用 wait_stopped 等待退出"""
+        self.supervisor.terminate(self.process)
+    
+    def wait_stopped(self, deadline=STOP_DEADLINE):
+        """在期限内等待烧录程序退出，返回停止耗时(ms)"""
+        return self.supervisor.wait_stopped(self.process, deadline)
+    
+    def close(self):
+        if self.process is not None and self.process.poll() is not None:
+            self.supervisor.unregister(self.process)
+        if self.use_pty and self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+class CommandExecutor(threading.Thread):
+    """执行命令的线程类
+    
+    cmd为参数列表(字符串会按命令行规则拆分)，由 LoaderProcess 直接执行，不经过shell。
+    callback(success, user_stopped) 在烧录线程中调用，界面程序需要自行切换到UI线程。
+    传入history(FlashHistory)时，结束后把各阶段耗时记录追加到烧录历史，记录保存在 self.record。
+    """
+    def __init__(self, cmd, output_queue, progress_queue, tool_type="internal", progress_offset=0, callback=None, tag=None,
+                 history=None, port=None, image_kb=None, use_pty=False):
+        super().__init__()
+        self.cmd = split_command(cmd)
+        self.use_pty = use_pty  # 用伪终端接收输出(不支持时自动使用管道)
+        self.output_queue = output_queue
+        self.progress_queue = progress_queue
+        self.tool_type = tool_type  # "internal" 或 "external"
+        self.progress_offset = progress_offset  # 进度偏移量，用于多个烧录过程的进度合并
+        self.callback = callback  # 回调函数
+        self.tag = tag  # 日志标签（多口烧录时为串口号）
+        self.history = history  # 烧录历史，None表示不记录
+        self.port = port or tag
+        self.image_kb = image_kb  # 烧录文件总大小(KB)，用于按大小预测耗时
+        self.timer = None  # 各阶段计时
+        self.record = None  # 本次烧录的统计记录
+        self._stop_event = threading.Event()
+        self._user_stopped = False
+        self._current_progress = 0
+        self._has_failure = False
+        self._failure_message = ""
+        self.failure_reason = None  # 第一条失败信息的原因，用于判断是否降低波特率重试
+        self.process = None
+        self.process_pid = None
+        self.launcher = None
+        self.stop_ms = None  # 用户停止时结束烧录进程的耗时(ms)
+        self.daemon = True
+        
+        # 输出解析和阶段跟踪
+        self.classifier = OutputClassifier()
+    
+    def _complete(self, success, user_stopped):
+        """生成统计记录并调用回调函数"""
+        if self.timer:
+            self.record = make_record(self.port, self.tool_type, self.timer, self.classifier,
+                                      success, user_stopped, self.image_kb)
+            if self.stop_ms is not None:
+                self.record['stop_ms'] = round(self.stop_ms, 2)
+            if self.launcher and self.launcher.spawn_ms is not None:
+                self.record['spawn_ms'] = round(self.launcher.spawn_ms, 2)
+                if self.launcher.first_output_ms is not None:
+                    self.record['first_output_ms'] = round(self.launcher.first_output_ms, 2)
+            if self.history is not None:
+                self.history.append(self.record)
+        if self.callback:
+            self.callback(success, user_stopped)
+        
+    def stop(self):
+        """请求停止烧录，立即返回；烧录线程在 STOP_DEADLINE 内结束进程组后调用回调"""
+        self._stop_event.set()
+        self._user_stopped = True
+        
+        if self.launcher and self.process and self.process.poll() is None:
+            self.launcher.terminate()
+        
+    def run(self):
+        # 根据工具类型添加前缀
+        tool_prefix = "[内部]" if self.tool_type == "internal" else "[外部]"
+        if self.tag:
+            tool_prefix = f"[{self.tag}]{tool_prefix}"
+        
+        try:
+
+            self.timer = PhaseTimer()
+            self.launcher = LoaderProcess(self.cmd, use_pty=self.use_pty, tag=tool_prefix)
+            self.process = self.launcher.start()
+            self.process_pid = self.launcher.pid
+            
+            # 发送初始状态
+            try:
+                tool_name = "内部Flash" if self.tool_type == "internal" else "外部SPI Flash"
+                self.progress_queue.put((self.progress_offset, f"准备{tool_name}烧录..."))
+                self.output_queue.put(f"{tool_prefix} 执行命令: {format_command(self.cmd)}\n")
+            except:
+                pass
+            
+            while not self._stop_event.is_set():
+                lines = self.launcher.read_lines(0.1)
+                if lines is None:
+                    break
+                for line in lines:
+                    self._handle_line(tool_prefix, line)
+            
+            if self._stop_event.is_set():
+                self.stop_ms = self.launcher.wait_stopped()
+                self.launcher.close()
+                
+                try:
+                    tool_name = "内部Flash" if self.tool_type == "internal" else "外部SPI Flash"
+                    self.progress_queue.put((self.progress_offset, f"用户停止{tool_name}烧录"))
+                except:
+                    pass
+                
+                # 调用回调函数，表示烧录被停止
+                self._complete(False, True)  # False表示失败，True表示用户停止
+                return
+            
+            # 等待进程完全结束
+            return_code = self.process.wait()
+            self.timer.stop()
+            self.launcher.close()
+            
+            # 根据烧录进度、返回码和失败信息判断结果
+            tool_name = "内部Flash" if self.tool_type == "internal" else "外部SPI Flash"
+            if self._has_failure:
+                try:
+                    self.output_queue.put(f"{tool_prefix} 烧录失败: {self._failure_message}，退出码: {return_code}\n")
+                    self.progress_queue.put((self.progress_offset, f"{tool_name}烧录失败: {self._failure_message}"))
+                except:
+                    pass
+                # 调用回调函数，表示烧录失败
+                self._complete(False, False)  # False表示失败，False表示不是用户停止
+            elif self._current_progress >= self.progress_offset + 95:  # 接近完成
+                try:
+                    self.output_queue.put(f"{tool_prefix} 烧录成功完成，退出码: {return_code}\n")
+                    self.progress_queue.put((self.progress_offset + 100, f"{tool_name}烧录成功完成!"))
+                except:
+                    pass
+                # 调用回调函数，表示烧录成功
+                self._complete(True, False)  # True表示成功，False表示不是用户停止
+            elif self._current_progress > self.progress_offset:
+                try:
+                    self.output_queue.put(f"{tool_prefix} 烧录未完成，进度: {int(self._current_progress - self.progress_offset)}%，退出码: {return_code}\n")
+                    self.progress_queue.put((self.progress_offset, f"{tool_name}烧录未完成，进度: {int(self._current_progress - self.progress_offset)}%"))
+                except:
+                    pass
+                # 调用回调函数，表示烧录部分完成
+                self._complete(False, False)  # False表示失败，False表示不是用户停止
+            else:
+                try:
+                    self.output_queue.put(f"{tool_prefix} 烧录失败，退出码: {return_code}\n")
+                    self.progress_queue.put((self.progress_offset, f"{tool_name}烧录失败，退出码: {return_code}"))
+                except:
+                    pass
+                # 调用回调函数，表示烧录失败
+                self._complete(False, False)  # False表示失败，False表示不是用户停止
+            
+        except Exception as e:
+            try:
+                self.output_queue.put(f"{tool_prefix} 执行烧录程序出错: {e}\n")
+            except:
+                pass
+            if self.launcher:
+                self.launcher.close()
+            # 异常情况下也调用回调函数
+            self._complete(False, False)  # False表示失败，False表示不是用户停止
+    
+    def _handle_line(self, tool_prefix, line):
+        """处理烧录程序输出的一行"""
+        # 一次解析得到失败信息、阶段和进度
+        info = self.classifier.classify(line)
+        if info.phase:
+            self.timer.mark(info.phase)
+        
+        # 添加工具类型前缀，连续的百分比行在通道中合并为最新一行
+        prefixed_line = f"{tool_prefix} {line}\n"
+        try:
+            self.output_queue.put(prefixed_line, source=tool_prefix, coalesce=info.percent is not None)
+        except:
+            return
+        
+        if info.failure:
+            self._has_failure = True
+            self._failure_message = info.failure
+            if self.failure_reason is None:
+                self.failure_reason = info.reason
+            try:
+                self.output_queue.put(f"{tool_prefix} 检测到失败信息: {info.failure}\n")
+            except:
+                pass
+        elif info.progress is not None:
+            # 调整进度，考虑偏移量
+            adjusted_progress = self.progress_offset + info.progress * (100 - self.progress_offset) / 100.0
+            if adjusted_progress > self._current_progress:
+                self._current_progress = adjusted_progress
+                try:
+                    self.progress_queue.put((adjusted_progress, info.status))
+                except:
+                    pass
+    
+    @staticmethod
+    def check_for_failure(text):
+        """检查失败信息，返回失败行，未失败返回None"""
+        failure = classify_failure(text)
+        return failure[0] if failure else None
+    
+    def parse_progress_and_status(self, text):
+        """解析进度和状态信息"""
+        info = self.classifier.classify(text)
+        if info.failure:
+            return (0, "检测到失败信息")
+        if info.progress is None:
+            return None
+        return (info.progress, info.status)
+
+def validate_flash_files(files):
+    """检查烧录文件是否存在、非空以及地址格式，返回错误信息列表"""
+    errors = []
+    for file_info in files:
+        path = file_info.get('path', '')
+        if not os.path.isfile(path):
+            errors.append(f"文件不存在: {path}")
+        elif os.path.getsize(path) == 0:
+            errors.append(f"文件为空: {path}")
+        try:
+            int(str(file_info.get('address', '')), 16)
+        except ValueError:
+            errors.append(f"地址格式错误: {file_info.get('address')} ({path})")
+    return errors
+
+def prepare_stage_files(serial_config, files, stage):
+    """按串口配置中的合并选项预检(并合并)一个阶段的烧录文件，返回 (文件列表, 错误信息列表, 提示信息列表)"""
+    align = int(serial_config.get('merge_align', SECTOR_SIZE // 1024)) * 1024
+    return prepare_files(files, stage, merge=bool(serial_config.get('merge_images')), align=align,
+                         pad=bool(serial_config.get('merge_pad')))
+
+class ExternalPreparer(threading.Thread):
+    """在内部Flash烧录期间提前预检外部Flash文件并构建烧录命令，不依赖设备"""
+    def __init__(self, serial_config, external_files, loader=None):
+        super().__init__()
+        self.serial_config = dict(serial_config)
+        self.external_files = external_files
+        self.loader = loader
+        self.cmd = None
+        self.errors = []
+        self.messages = []  # 预检提示
+        self.plan = None  # 差分烧录计划(DiffPlan)
+        self.files = None  # 预检(合并、差分)后实际烧录的文件
+        self.daemon = True
+    
+    def run(self):
+        try:
+            files, self.errors, self.messages = prepare_stage_files(self.serial_config, self.external_files, "external")
+            if not self.errors:
+                self.files, self.plan, messages = plan_diff(self.serial_config, files, "external")
+                self.messages += messages
+                self.cmd = build_external_command(self.serial_config, self.files, self.loader)
+        except Exception as e:
+            self.errors = [f"准备外部Flash烧录失败: {e}"]
+    
+    def result(self, timeout=None):
+        """等待准备完成，返回 (命令, 错误信息列表)"""
+        self.join(timeout)
+        return self.cmd, self.errors
+
+# 设备就绪检测方式
+READY_MODES = ("banner", "probe", "delay")  # 启动信息 / 握手探测 / 固定延时
+DEFAULT_READY_MODE = "delay"  # 界面、命令行和配置文件未指定时都使用固定延时，启动信息检测需要明确选择
+# BK芯片bootrom的LinkCheck命令及其应答
+LINK_CHECK = bytes.fromhex("01e0fc0100")
+LINK_CHECK_ACK = bytes.fromhex("040e0501e0fc0100")
+
+class DeviceReadyWaiter(threading.Thread):
+    """内部Flash烧录完成后等待设备重启就绪
+    
+    - banner: 串口上出现启动信息；未指定启动标志时，收到启动输出并静默quiet秒即认为就绪
+    - probe: 周期发送LinkCheck握手命令，收到应答即就绪
+    - delay: 固定等待delay秒（旧的行为）
+    串口在重启过程中消失(USB重新枚举)时会不断重试打开。
+    callback(ready, reason) 在检测线程中调用，超时ready为False。
+    """
+    def __init__(self, port, mode=DEFAULT_READY_MODE, banner="", timeout=5.0, delay=1.0, baudrate=115200,
+                 quiet=0.3, callback=None):
+        super().__init__()
+        self.port = port
+        self.mode = mode if mode in READY_MODES else DEFAULT_READY_MODE
+        self.banner = banner.encode('utf-8') if banner else b""
+        self.timeout = timeout
+        self.delay = delay
+        self.baudrate = baudrate
+        self.quiet = quiet
+        self.callback = callback
+        self.ready = False
+        self.reason = ""
+        self.elapsed = None
+        self._stop_event = threading.Event()
+        self.daemon = True
+    
+    @classmethod
+    def from_config(cls, serial_config, callback=None, delay=1.0):
+        """根据串口配置(ready_mode/ready_banner/ready_timeout)创建"""
+        return cls(serial_config.get('port', ''),
+                   mode=serial_config.get('ready_mode', DEFAULT_READY_MODE),
+                   banner=serial_config.get('ready_banner', ""),
+                   timeout=float(serial_config.get('ready_timeout', 5.0)),
+                   delay=delay,
+                   callback=callback)
+    
+    def stop(self):
+        self._stop_event.set()
+    
+    def run(self):
+        start = time.time()
+        try:
+            if self.mode == "delay":
+                self.ready = not self._stop_event.wait(self.delay)
+                self.reason = f"固定等待{self.delay:g}秒"
+            else:
+                self.ready, self.reason = self._wait_serial()
+        except Exception as e:
+            self.ready, self.reason = False, f"检测出错: {e}"
+        self.elapsed = time.time() - start
+        if self.callback:
+            self.callback(self.ready, self.reason)
+    
+    def _wait_serial(self):
+        deadline = time.time() + self.timeout
+        ser = None
+        buffer = bytearray()
+        last_data = None
+        last_probe = 0
+        try:
+            while not self._stop_event.is_set():
+                now = time.time()
+                if now >= deadline:
+                    if last_data is not None:
+                        return False, "等待超时(有串口输出但未检测到就绪标志)"
+                    return False, "等待超时"
+                
+                if ser is None:
+                    try:
+                        ser = serial.Serial(self.port, self.baudrate, timeout=0.05)
+                    except (serial.SerialException, OSError, ValueError):
+                        self._stop_event.wait(0.1)  # 设备重启中，串口暂时不可用
+                        continue
+                
+                try:
+                    if self.mode == "probe" and now - last_probe >= 0.1:
+                        last_probe = now
+                        ser.write(LINK_CHECK)
+                    data = ser.read(ser.in_waiting or 1)
+                except (serial.SerialException, OSError):
+                    ser.close()
+                    ser = None
+                    continue
+                
+                if data:
+                    last_data = now
+                    buffer += data
+                    if len(buffer) > 4096:
+                        del buffer[:-4096]
+                    if self.mode == "probe" and LINK_CHECK_ACK in buffer:
+                        return True, "握手成功"
+                    if self.mode == "banner" and self.banner and self.banner in buffer:
+                        return True, "检测到启动信息"
+                elif (self.mode == "banner" and not self.banner and last_data is not None
+                      and now - last_data >= self.quiet):
+                    return True, "启动输出结束"
+            return False, "已停止"
+        finally:
+            if ser is not None:
+                ser.close()
+
+class FlashPipeline:
+    """单个串口的内部Flash→外部SPI Flash烧录流水线
+    
+    callback(port, success, user_stopped) 在烧录线程或就绪检测线程中调用。
+    history(FlashHistory)用于记录每个阶段的耗时和预测整个流程的耗时。
+    内部→外部的切换按 serial_config 的 ready_mode 等待设备就绪(见 DeviceReadyWaiter)，
+    未配置时固定等待 reboot_delay 秒；外部Flash的文件检查和命令构建在内部Flash烧录期间并行完成。
+    start() 立即返回，预检(CRC、合并、差分哈希)和波特率选择在后台线程中进行，不占用调用者(界面)线程。
+    stage/executor/_stopped 的修改都在 _lock 内进行，stop() 与阶段切换(含降档重试)同时发生时不会丢失。
+    """
+    def __init__(self, serial_config, internal_files, external_files, output_queue, callback=None,
+                 progress_queue=None, loaders=None, reboot_delay=1.0, history=None, use_pty=False):
+        self.serial_config = dict(serial_config)
+        self.port = self.serial_config.get('port', '')
+        self.internal_files = internal_files
+        self.external_files = external_files
+        self.output_queue = output_queue
+        self.progress_queue = progress_queue if progress_queue is not None else ProgressSlot()  # 每个串口独立的进度通道
+        self.callback = callback
+        self.loaders = loaders or {}  # {"internal": 命令, "external": 命令}，用于替换默认的烧录程序
+        self.reboot_delay = reboot_delay  # 内部Flash完成后等待设备重启的时间(秒)
+        self.history = history
+        self.use_pty = use_pty  # 烧录程序输出接到伪终端(仅支持pty的系统)
+        self.records = []  # 本次流程各阶段的统计记录
+        self.stop_ms = None  # 用户停止时结束烧录进程的耗时(ms)
+        self.executor = None
+        self.stage = None  # None, "internal", "waiting", "external"
+        self.result = None  # None: 未完成, True: 成功, False: 失败
+        self.start_time = None
+        self.end_time = None
+        self._ready_waiter = None
+        self._preparer = None
+        self._plans = {}  # 阶段 -> 差分烧录计划
+        self.baud = None  # 波特率选择(BaudNegotiator)，baudrate为auto时失败自动降档重试
+        self.ready_elapsed = None  # 内部→外部切换时等待设备就绪的时间(秒)
+        self._stopped = False
+        self._finished = True
+        self._lock = threading.RLock()
+    
+    def is_running(self):
+        return not self._finished
+    
+    def estimate(self):
+        """根据烧录历史预测整个流程的耗时(秒)，没有历史时返回None"""
+        if self.history is None:
+            return None
+        total = 0
+        for stage, files in (("internal", self.internal_files), ("external", self.external_files)):
+            if not files:
+                continue
+            seconds = self.history.estimate(self.port, stage, files_kb(files))
+            if seconds is None:
+                return None
+            total += seconds
+        if self.internal_files and self.external_files:
+            total += self.reboot_delay
+        return total
+    
+    def slow_warnings(self):
+        """本次流程中写入速度变慢的提示"""
+        if self.history is None:
+            return []
+        return [warning for warning in map(self.history.slow_warning, self.records) if warning]
+    
+    def start(self):
+        """开始（或重新开始）烧录"""
+        with self._lock:
+            if not self._finished:
+                return
+            self._stopped = False
+            self._finished = False
+        self.result = None
+        self.records = []
+        self._plans = {}
+        self.stop_ms = None
+        self.ready_elapsed = None
+        self.start_time = time.time()
+        self.end_time = None
+        
+        # 清空上一次残留的进度
+        try:
+            while True:
+                self.progress_queue.get_nowait()
+        except (queue.Empty, AttributeError):
+            pass
+        
+        threading.Thread(target=self._run, name=f"flash-{self.port}", daemon=True).start()
+    
+    def _run(self):
+        """后台线程: 选择波特率并开始第一个阶段，之后的阶段由烧录线程和就绪检测线程的回调推进"""
+        try:
+            # 自动波特率时查询串口适配器标识和缓存，可能等待串口首次枚举
+            self.baud = BaudNegotiator(self.serial_config)
+            if self.internal_files:
+                if self.external_files:
+                    # 外部Flash的准备工作不依赖设备，与内部Flash烧录并行
+                    self._preparer = ExternalPreparer(self.serial_config, self.external_files,
+                                                      self.loaders.get("external"))
+                    self._preparer.start()
+                self._start_stage("internal")
+            elif self.external_files:
+                self._start_stage("external")
+            else:
+                self._finish(False, False)
+        except Exception as e:
+            self.output_queue.put(f"[{self.port}] 准备烧录失败: {e}\n")
+            self._finish(False, False)
+    
+    def stop(self):
+        """停止当前串口的烧录，立即返回，烧录进程结束后调用回调
+        
+        阶段切换期间调用时，下一阶段在启动前检查 _stopped，不再启动烧录程序。
+        """
+        with self._lock:
+            self._stopped = True
+            stage, executor, waiter = self.stage, self.executor, self._ready_waiter
+        if stage == "waiting":
+            if waiter:
+                waiter.stop()
+            self.stop_ms = 0.0
+            self._finish(False, True)
+        elif executor and executor.is_alive():
+            executor.stop()
+    
+    def wait(self, timeout=None):
+        """等待烧录结束，返回是否已结束"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.is_running():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+    
+    def _start_stage(self, stage):
+        prefix = f"[{self.port}][内部]" if stage == "internal" else f"[{self.port}][外部]"
+        plan = None
+        stage_config = self.baud.apply(self.serial_config)
+        if stage == "internal":
+            files = self.internal_files
+            flash_files, errors, messages = prepare_stage_files(self.serial_config, files, "internal")
+            if not errors:
+                flash_files, plan, diff_messages = plan_diff(self.serial_config, flash_files, "internal")
+                messages += diff_messages
+            cmd = None if errors else build_internal_command(stage_config, flash_files, self.loaders.get("internal"))
+            callback = self._on_internal_completed
+        else:
+            files = self.external_files
+            if self._preparer:
+                cmd, errors = self._preparer.result()
+                messages = self._preparer.messages
+                plan = self._preparer.plan
+                if self.baud.auto and not errors:
+                    # 准备时波特率还未确定，按内部Flash阶段确定的波特率重新构建
+                    cmd = build_external_command(stage_config, self._preparer.files, self.loaders.get("external"))
+                self._preparer = None
+            else:
+                flash_files, errors, messages = prepare_stage_files(self.serial_config, files, "external")
+                if not errors:
+                    flash_files, plan, diff_messages = plan_diff(self.serial_config, flash_files, "external")
+                    messages += diff_messages
+                cmd = None if errors else build_external_command(stage_config, flash_files, self.loaders.get("external"))
+            callback = self._on_external_completed
+        if self.baud.auto:
+            messages.append(f"自动波特率: {self.baud.baudrate}")
+        
+        for message in messages:
+            self.output_queue.put(f"{prefix} {message}\n")
+        if errors:
+            for error in errors:
+                self.output_queue.put(f"{prefix} {error}\n")
+            self._finish(False, False)
+            return
+        
+        if plan:
+            self._plans[stage] = plan
+            if plan.is_empty():
+                # 内容与上次烧录相同，不启动烧录程序
+                with self._lock:
+                    self.stage = stage
+                    self.executor = None
+                callback(True, False)
+                return
+        
+        if not cmd:
+            self._finish(False, False)
+            return
+        
+        with self._lock:
+            if not self._stopped:
+                self.stage = stage
+                self.executor = CommandExecutor(
+                    cmd,
+                    self.output_queue,
+                    self.progress_queue,
+                    tool_type=stage,
+                    progress_offset=0,
+                    callback=callback,
+                    tag=self.port,
+                    history=self.history,
+                    image_kb=files_kb(files),
+                    use_pty=self.use_pty
+                )
+                self.executor.start()
+                return
+        # 准备期间(或阶段切换、降档重试时)已被停止
+        self._finish_plan(stage, False)
+        self._finish(False, True)
+    
+    def _collect_record(self):
+        if self.executor and self.executor.record:
+            self.records.append(self.executor.record)
+        if self.executor and self.executor.stop_ms is not None:
+            self.stop_ms = self.executor.stop_ms
+    
+    def _finish_plan(self, stage, success):
+        plan = self._plans.pop(stage, None)
+        if plan:
+            plan.finish(success)
+    
+    def _retry_lower_baud(self, stage, success):
+        """自动波特率时按本阶段结果更新缓存，连接类失败时降一档重新烧录该阶段，返回是否已重试"""
+        executor = self.executor
+        failed_baud = self.baud.baudrate
+        lower = self.baud.on_result(success, executor)
+        if lower is None:
+            return False
+        prefix = f"[{self.port}][内部]" if stage == "internal" else f"[{self.port}][外部]"
+        self.output_queue.put(f"{prefix} 波特率 {failed_baud} 烧录失败({executor.failure_reason})，降为 {lower} 重试\n")
+        self._start_stage(stage)
+        return True
+    
+    def _on_internal_completed(self, success=True, user_stopped=False):
+        self._collect_record()
+        skipped = "internal" in self._plans and self._plans["internal"].is_empty()
+        self._finish_plan("internal", success and not (user_stopped or self._stopped))
+        if user_stopped or self._stopped:
+            self._finish(False, True)
+            return
+        
+        if not skipped and self._retry_lower_baud("internal", success):
+            return
+        
+        if not success:
+            self._finish(False, False)
+            return
+        
+        if self.external_files and skipped:
+            # 内部Flash没有烧录，设备不会重启
+            self._start_stage("external")
+        elif self.external_files:
+            # 等待设备重启就绪后再烧录外部Flash
+            self.progress_queue.put((0, "内部Flash完成，等待设备就绪..."))
+            with self._lock:
+                if not self._stopped:
+                    self.stage = "waiting"
+                    self._ready_waiter = DeviceReadyWaiter.from_config(self.serial_config,
+                                                                       callback=self._on_device_ready,
+                                                                       delay=self.reboot_delay)
+                    self._ready_waiter.start()
+                    return
+            self._finish(False, True)
+        else:
+            self._finish(True, False)
+    
+    def _on_device_ready(self, ready, reason):
+        with self._lock:
+            waiter, self._ready_waiter = self._ready_waiter, None
+            stopped = self._stopped
+        if stopped:
+            self._finish(False, True)
+            return
+        self.ready_elapsed = waiter.elapsed if waiter else None
+        elapsed = f"{self.ready_elapsed:.2f}s" if self.ready_elapsed is not None else "--"
+        if ready:
+            self.output_queue.put(f"[{self.port}] 设备就绪({reason})，用时 {elapsed}\n")
+        else:
+            # 超时仍尝试烧录，外部烧录程序自身也会重试握手
+            self.output_queue.put(f"[{self.port}] 未检测到设备就绪({reason})，用时 {elapsed}，继续烧录外部Flash\n")
+        self._start_stage("external")
+    
+    def _on_external_completed(self, success=True, user_stopped=False):
+        self._collect_record()
+        skipped = "external" in self._plans and self._plans["external"].is_empty()
+        self._finish_plan("external", success and not (user_stopped or self._stopped))
+        if not (user_stopped or self._stopped or skipped) and self._retry_lower_baud("external", success):
+            return
+        self._finish(success, user_stopped or self._stopped)
+    
+    def _finish(self, success, user_stopped):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            self.stage = None
+            self.executor = None
+        self.result = bool(success) and not user_stopped
+        self.end_time = time.time()
+        if self.callback:
+            self.callback(self.port, self.result, user_stopped)
+
+class ProfileError(Exception):
+    """配置文件错误"""
+    def __init__(self, message, exit_code=EXIT_BAD_PROFILE):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+def load_profile(path, name=None):
+    """读取烧录配置，支持 on_save_config 保存的配置和 save_last_config 写入的 last_config
+    
+    name 为配置方案名时从配置文件的 profiles 中读取该方案(不区分大小写)。
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ProfileError(f"读取配置文件失败: {e}")
+    
+    if name:
+        profiles = data.get('profiles', {}) if isinstance(data, dict) else {}
+        matched = [key for key in profiles if key.lower() == name.strip().lower()]
+        if not matched:
+            raise ProfileError(f"配置方案不存在: {name}")
+        data = profiles[matched[0]]
+    elif isinstance(data, dict) and 'last_config' in data:
+        data = data['last_config']
+    if not isinstance(data, dict) or 'serial' not in data or 'files' not in data:
+        raise ProfileError("配置文件缺少 serial 或 files 字段")
+    return data
+
+def split_files(files):
+    """把已启用的文件分为内部Flash和外部SPI Flash两组"""
+    internal_files = []
+    external_files = []
+    for file_info in files:
+        if not file_info.get('enabled', True):
+            continue
+        if not file_info.get('path') or not file_info.get('address'):
+            continue
+        if file_info.get('internal', True):
+            internal_files.append(file_info)
+        else:
+            external_files.append(file_info)
+    return internal_files, external_files
+
+class JsonLineWriter:
+    """把烧录事件以JSON行写到输出流，多个烧录线程共用时加锁"""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+    
+    def emit(self, event, **fields):
+        record = {'event': event, 'time': round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+class JsonOutputSink:
+    """CommandExecutor的输出通道，每行输出转成一条 output 事件"""
+    def __init__(self, writer, port, enabled=True):
+        self.writer = writer
+        self.port = port
+        self.enabled = enabled
+    
+    def put(self, text, source=None, coalesce=False):
+        if self.enabled:
+            self.writer.emit("output", port=self.port, text=text.rstrip("\r\n"))
+
+class JsonProgressSink:
+    """CommandExecutor的进度通道，进度变化时输出一条 progress 事件"""
+    def __init__(self, writer, port):
+        self.writer = writer
+        self.port = port
+        self._last = None
+    
+    def put(self, item, block=True, timeout=None):
+        if item == self._last:
+            return
+        self._last = item
+        value, status = item
+        self.writer.emit("progress", port=self.port, value=round(value, 1), status=status)
+    
+    def get_nowait(self):
+        raise queue.Empty
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BK7236 命令行烧录（不依赖wx）")
+    parser.add_argument('profile', help="bk7236_flasher 保存的JSON配置文件")
+    parser.add_argument('--profile-name', help="使用配置文件中保存的配置方案")
+    parser.add_argument('--port', help="覆盖配置中的串口")
+    parser.add_argument('--baudrate', help="覆盖配置中的波特率，auto为自动选择")
+    parser.add_argument('--skip-internal', action='store_true', help="不烧录内部Flash")
+    parser.add_argument('--skip-external', action='store_true', help="不烧录外部SPI Flash")
+    parser.add_argument('--internal-loader', help="替换内部Flash烧录程序")
+    parser.add_argument('--external-loader', help="替换外部SPI Flash烧录程序")
+    parser.add_argument('--reboot-delay', type=float, default=1.0, help="内部→外部之间固定等待设备重启的秒数(ready-mode为delay时)")
+    parser.add_argument('--ready-mode', choices=READY_MODES, help="内部→外部之间检测设备就绪的方式")
+    parser.add_argument('--ready-banner', help="设备启动信息中的就绪标志")
+    parser.add_argument('--ready-timeout', type=float, help="等待设备就绪的超时时间(秒)")
+    parser.add_argument('--no-output', action='store_true', help="不输出烧录程序的原始日志，只输出进度和结果")
+    parser.add_argument('--history', help="烧录历史文件，记录各阶段耗时并预测烧录时间")
+    parser.add_argument('--merge', action='store_true', help="预检后把地址相邻的镜像合并为一个再烧录")
+    parser.add_argument('--merge-align', type=int, choices=[4, 64], help="合并镜像的对齐大小(KB)，默认4")
+    parser.add_argument('--merge-pad', action='store_true',
+                        help="合并镜像末尾补0xFF到对齐边界，会擦除镜像之后不在烧录列表中的数据(如NV、校准区)")
+    parser.add_argument('--diff', action='store_true', help="差分烧录: 只烧录与该设备上次烧录相比内容变化的64K块")
+    parser.add_argument('--full', action='store_true', help="差分烧录时本次仍完整烧录(烧录后更新清单)")
+    parser.add_argument('--device-id', help="差分烧录清单中的设备标识，默认使用串口适配器的序列号或hwid")
+    parser.add_argument('--pty', action='store_true', help="烧录程序输出接到伪终端，避免输出被攒成大块(仅Linux/macOS)")
+    args = parser.parse_args(argv)
+    
+    writer = JsonLineWriter()
+    try:
+        profile = load_profile(args.profile, args.profile_name)
+        serial_config = dict(profile['serial'])
+        if args.port:
+            serial_config['port'] = args.port
+        if args.baudrate:
+            serial_config['baudrate'] = args.baudrate
+        if args.ready_mode:
+            serial_config['ready_mode'] = args.ready_mode
+        if args.ready_banner is not None:
+            serial_config['ready_banner'] = args.ready_banner
+        if args.ready_timeout is not None:
+            serial_config['ready_timeout'] = args.ready_timeout
+        if args.merge:
+            serial_config['merge_images'] = True
+        if args.merge_align:
+            serial_config['merge_align'] = args.merge_align
+        if args.merge_pad:
+            serial_config['merge_pad'] = True
+        if args.diff:
+            serial_config['diff_flash'] = True
+        if args.full:
+            serial_config['full_flash'] = True
+        if args.device_id:
+            serial_config['device_id'] = args.device_id
+        if not serial_config.get('port'):
+            raise ProfileError("未指定串口")
+        serial_config.setdefault('baudrate', "2000000")
+        serial_config.setdefault('uart_type', "CH340")
+        serial_config.setdefault('fast_link', True)
+        serial_config.setdefault('big_endian', True)
+        
+        internal_files, external_files = split_files(profile['files'])
+        if args.skip_internal:
+            internal_files = []
+        if args.skip_external:
+            external_files = []
+        if not internal_files and not external_files:
+            raise ProfileError("没有需要烧录的文件")
+        
+        missing = [f['path'] for f in internal_files + external_files if not os.path.exists(f['path'])]
+        if missing:
+            raise ProfileError("烧录文件不存在: " + ", ".join(missing), EXIT_MISSING_FILE)
+    except ProfileError as e:
+        writer.emit("error", message=str(e), exit_code=e.exit_code)
+        return e.exit_code
+    
+    port = serial_config['port']
+    done = threading.Event()
+    outcome = {}
+    
+    def on_completed(port, success, user_stopped):
+        outcome['success'] = success
+        outcome['user_stopped'] = user_stopped
+        done.set()
+    
+    loaders = {}
+    if args.internal_loader:
+        loaders['internal'] = args.internal_loader
+    if args.external_loader:
+        loaders['external'] = args.external_loader
+    
+    pipeline = FlashPipeline(
+        serial_config, internal_files, external_files,
+        JsonOutputSink(writer, port, enabled=not args.no_output),
+        callback=on_completed,
+        progress_queue=JsonProgressSink(writer, port),
+        loaders=loaders,
+        reboot_delay=args.reboot_delay,
+        history=FlashHistory(args.history) if args.history else None,
+        use_pty=args.pty
+    )
+    
+    eta = pipeline.estimate()
+    writer.emit("start", port=port, internal=len(internal_files), external=len(external_files),
+                eta=round(eta, 1) if eta is not None else None)
+    pipeline.start()
+    try:
+        while not done.wait(0.2):
+            pass
+    except KeyboardInterrupt:
+        pipeline.stop()
+        done.wait(5)
+    
+    elapsed = (pipeline.end_time or time.time()) - pipeline.start_time
+    if outcome.get('user_stopped') or not done.is_set():
+        exit_code = EXIT_STOPPED
+    elif outcome.get('success'):
+        exit_code = EXIT_OK
+    else:
+        exit_code = EXIT_FLASH_FAILED
+    for record in pipeline.records:
+        writer.emit("stage", port=port, record=record)
+    for warning in pipeline.slow_warnings():
+        writer.emit("warning", port=port, message=warning)
+    writer.emit("result", port=port, success=bool(outcome.get('success')), stopped=exit_code == EXIT_STOPPED,
+                elapsed=round(elapsed, 3), exit_code=exit_code,
+                stop_ms=round(pipeline.stop_ms, 2) if pipeline.stop_ms is not None else None)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
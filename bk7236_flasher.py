@@ -1,127 +1,109 @@
 import wx
 import wx.lib.newevent
 import wx.adv
-import subprocess
 import threading
 import queue
-import re
 import os
 import sys
-import serial
-import serial.tools.list_ports
 import time
-import signal
-import psutil
 import json
+from collections import deque
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
+from bk7236_engine import (resource_path, FlashPipeline, OutputPipe, ProgressSlot, READY_MODES, DEFAULT_READY_MODE,
+                           get_supervisor, load_profile, split_files, ProfileError, prepare_stage_files)
+from bk7236_manifest import get_manifest_store
+from bk7236_baud import AUTO_BAUD
+from bk7236_autoflash import AutoFlashQueue, PortMatcher, UnitLog, parse_vid_pid, format_vid_pid
+from bk7236_telemetry import FlashHistory
+from bk7236_profiles import get_profile_store, FileChecker, write_json_atomic
+from serial_hotplug import get_port_service
 
 # 定义自定义事件
 (ProgressUpdateEvent, EVT_PROGRESS_UPDATE) = wx.lib.newevent.NewEvent()
 (OutputUpdateEvent, EVT_OUTPUT_UPDATE) = wx.lib.newevent.NewEvent()
-(ProcessCompletedEvent, EVT_PROCESS_COMPLETED) = wx.lib.newevent.NewEvent()
 (SerialPortsUpdateEvent, EVT_SERIAL_PORTS_UPDATE) = wx.lib.newevent.NewEvent()
 (FlashFileAddedEvent, EVT_FLASH_FILE_ADDED) = wx.lib.newevent.NewEvent()
 (FlashFileRemovedEvent, EVT_FLASH_FILE_REMOVED) = wx.lib.newevent.NewEvent()
 
-def resource_path(relative_path):
-    """获取资源文件的路径"""
-    if getattr(sys, 'frozen', False): # 是否为打包后的环境
-        base_path = sys._MEIPASS
-    else:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+def call_after(func):
+    """把烧录线程中的回调包装成在UI线程中执行"""
+    return lambda *args: wx.CallAfter(func, *args)
 
-
-class ProcessManager:
-    """进程管理类，用于快速停止进程"""
-    @staticmethod
-    def kill_process_tree(pid):
-        """终止进程及其所有子进程"""
-        try:
-            parent = psutil.Process(pid)
-            children = parent.children(recursive=True)
-            
-            for child in children:
-                try:
-                    child.terminate()
-                except psutil.NoSuchProcess:
-                    pass
-            
-            try:
-                parent.terminate()
-            except psutil.NoSuchProcess:
-                pass
-            
-            gone, alive = psutil.wait_procs([parent] + children, timeout=3)
-            
-            for p in alive:
-                try:
-                    p.kill()
-                except psutil.NoSuchProcess:
-                    pass
-                    
-        except (psutil.NoSuchProcess, ProcessLookupError):
-            pass
-    
-    @staticmethod
-    def find_processes_by_name(name):
-        """根据进程名查找进程"""
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                if proc.info['name'] and name in proc.info['name']:
-                    processes.append(proc.info['pid'])
-                elif proc.info['cmdline']:
-                    cmdline = ' '.join(proc.info['cmdline'])
-                    if name in cmdline:
-                        processes.append(proc.info['pid'])
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        return processes
-
-class SerialPortMonitor(threading.Thread):
-    """串口监控线程，检测热插拔"""
-    def __init__(self, update_callback, interval=2):
+class LogSpillWriter(threading.Thread):
+    """后台日志落盘线程，把完整日志写入文件，不阻塞UI线程"""
+    def __init__(self, file_path, flush_interval=0.5):
         super().__init__()
-        self.update_callback = update_callback
-        self.interval = interval
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
         self._stop_event = threading.Event()
-        self.last_ports = []
         self.daemon = True
     
+    def write(self, text):
+        self._queue.put(text)
+    
     def stop(self):
         self._stop_event.set()
+        self._queue.put(None)
     
     def run(self):
-        while not self._stop_event.is_set():
-            try:
-                ports = []
-                for port in serial.tools.list_ports.comports():
-                    port_info = {
-                        'device': port.device,
-                        'description': port.description if port.description else '未知设备',
-                        'hwid': port.hwid if port.hwid else '未知ID',
-                        'manufacturer': port.manufacturer if port.manufacturer else '未知厂商',
-                        'product': port.product if port.product else '未知产品'
-                    }
-                    ports.append(port_info)
-                
-                # 按设备名排序
-                ports.sort(key=lambda x: x['device'])
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, 'a', encoding='utf-8') as f:
+            while True:
+                try:
+                    text = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
                 
-                if ports != self.last_ports:
-                    self.last_ports = ports
+                # 一次取走积压的所有日志，合并写入
+                batch = []
+                while text is not None:
+                    batch.append(text)
                     try:
-                        wx.CallAfter(self.update_callback, ports)
-                    except wx.PyDeadObjectError:
+                        text = self._queue.get_nowait()
+                    except queue.Empty:
                         break
-                
-                time.sleep(self.interval)
-            except Exception as e:
-                if not self._stop_event.is_set():
-                    print(f"串口监控错误: {e}")
-                time.sleep(self.interval)
+                if batch:
+                    f.write("".join(batch))
+                    f.flush()
+                if text is None or self._stop_event.is_set():
+                    # 写完停止前已经入队的日志
+                    while True:
+                        try:
+                            text = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if text is not None:
+                            f.write(text)
+                    f.flush()
+                    break
+
+class SerialPortMonitor:
+    """串口监控，检测热插拔
+    
+    基于共享的 SerialHotplugService：Linux下由netlink事件驱动，其他平台定时轮询。
+    串口有增删时把完整的串口表通过 wx.CallAfter 交给 update_callback。
+    """
+    def __init__(self, update_callback, interval=2, backend="auto"):
+        self.update_callback = update_callback
+        self.interval = interval
+        self.backend = backend
+        self.service = None
+    
+    def start(self):
+        self.service = get_port_service(backend=self.backend, poll_interval=self.interval)
+        self.service.subscribe(self.on_ports_changed)
+    
+    def stop(self):
+        if self.service:
+            self.service.unsubscribe(self.on_ports_changed)
+    
+    def on_ports_changed(self, added, removed, ports):
+        try:
+            wx.CallAfter(self.update_callback, ports)
+        except Exception:
+            pass
 
 class FlashFileItem(wx.Panel):
     """烧录文件条目 - 增加勾选和内部/外部Flash选项"""
@@ -223,323 +205,6 @@ class FlashFileItem(wx.Panel):
         self.internal_check.Enable(enabled)
         self.remove_btn.Enable(enabled)
 
-class CommandExecutor(threading.Thread):
-    """执行命令的线程类"""
-    def __init__(self, cmd, output_queue, progress_queue, tool_type="internal", progress_offset=0, callback=None):
-        super().__init__()
-        self.cmd = cmd
-        self.output_queue = output_queue
-        self.progress_queue = progress_queue
-        self.tool_type = tool_type  # "internal" 或 "external"
-        self.progress_offset = progress_offset  # 进度偏移量，用于多个烧录过程的进度合并
-        self.callback = callback  # 回调函数
-        self._stop_event = threading.Event()
-        self._user_stopped = False
-        self._current_progress = 0
-        self._has_failure = False
-        self._failure_message = ""
-        self.process = None
-        self.process_pid = None
-        self.daemon = True
-        
-        # 阶段跟踪
-        self._current_phase = "idle"
-        self._erase_percent = 0
-        self._write_percent = 0
-        
-    def stop(self):
-        self._stop_event.set()
-        self._user_stopped = True
-        
-        if self.process and self.process.poll() is None:
-            try:
-                if self.process_pid:
-                    ProcessManager.kill_process_tree(self.process_pid)
-                else:
-                    self.process.terminate()
-                    
-                try:
-                    self.process.wait(timeout=1)
-                except subprocess.TimeoutExpired:
-                    self.process.kill()
-                    self.process.wait()
-                    
-            except Exception:
-                pass
-        
-    def run(self):
-        try:
-            # 根据工具类型添加前缀
-            tool_prefix = "[内部]" if self.tool_type == "internal" else "[外部]"
-            
-            self.process = subprocess.Popen(
-                self.cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                stdin=subprocess.PIPE,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1,
-                universal_newlines=True,
-                shell=True
-            )
-            
-            self.process_pid = self.process.pid
-            
-            # 发送初始状态
-            try:
-                tool_name = "内部Flash" if self.tool_type == "internal" else "外部SPI Flash"
-                self.progress_queue.put((self.progress_offset, f"准备{tool_name}烧录..."))
-                self.output_queue.put(f"{tool_prefix} 执行命令: {self.cmd}\n")
-            except:
-                pass
-            
-            while True:
-                if self._stop_event.is_set():
-                    if self.process and self.process.poll() is None:
-                        try:
-                            self.process.terminate()
-                            try:
-                                self.process.wait(timeout=0.5)
-                            except subprocess.TimeoutExpired:
-                                self.process.kill()
-                                self.process.wait()
-                        except Exception:
-                            pass
-                    
-                    try:
-                        tool_name = "内部Flash" if self.tool_type == "internal" else "外部SPI Flash"
-                        self.progress_queue.put((self.progress_offset, f"用户停止{tool_name}烧录"))
-                    except:
-                        pass
-                    
-                    # 调用回调函数，表示烧录被停止
-                    if self.callback:
-                        wx.CallAfter(self.callback, False, True)  # False表示失败，True表示用户停止
-                    break
-                    
-                line = self.process.stdout.readline()
-                if not line and self.process.poll() is not None:
-                    break
-                    
-                if line:
-                    # 添加工具类型前缀
-                    prefixed_line = f"{tool_prefix} {line}"
-                    try:
-                        self.output_queue.put(prefixed_line)
-                    except:
-                        break
-                    
-                    # 检查失败信息
-                    failure_detected = self.check_for_failure(line)
-                    if failure_detected:
-                        self._has_failure = True
-                        self._failure_message = failure_detected
-                        try:
-                            self.output_queue.put(f"{tool_prefix} 检测到失败信息: {failure_detected}\n")
-                        except:
-                            pass
-                    
-                    # 解析进度和状态
-                    progress_info = self.parse_progress_and_status(line)
-                    if progress_info:
-                        progress, status = progress_info
-                        # 调整进度，考虑偏移量
-                        adjusted_progress = self.progress_offset + progress * (100 - self.progress_offset) / 100.0
-                        if adjusted_progress > self._current_progress:
-                            self._current_progress = adjusted_progress
-                            try:
-                                self.progress_queue.put((adjusted_progress, status))
-                            except:
-                                pass
-                        
-            # 等待进程完全结束
-            return_code = self.process.wait()
-            
-            if self._user_stopped:
-                return
-            
-            # 根据烧录进度、返回码和失败信息判断结果
-            tool_name = "内部Flash" if self.tool_type == "internal" else "外部SPI Flash"
-            if self._has_failure:
-                try:
-                    self.output_queue.put(f"{tool_prefix} 烧录失败: {self._failure_message}，退出码: {return_code}\n")
-                    self.progress_queue.put((self.progress_offset, f"{tool_name}烧录失败: {self._failure_message}"))
-                except:
-                    pass
-                # 调用回调函数，表示烧录失败
-                if self.callback:
-                    wx.CallAfter(self.callback, False, False)  # False表示失败，False表示不是用户停止
-            elif self._current_progress >= self.progress_offset + 95:  # 接近完成
-                try:
-                    self.output_queue.put(f"{tool_prefix} 烧录成功完成，退出码: {return_code}\n")
-                    self.progress_queue.put((self.progress_offset + 100, f"{tool_name}烧录成功完成!"))
-                except:
-                    pass
-                # 调用回调函数，表示烧录成功
-                if self.callback:
-                    wx.CallAfter(self.callback, True, False)  # True表示成功，False表示不是用户停止
-            elif self._current_progress > self.progress_offset:
-                try:
-                    self.output_queue.put(f"{tool_prefix} 烧录未完成，进度: {int(self._current_progress - self.progress_offset)}%，退出码: {return_code}\n")
-                    self.progress_queue.put((self.progress_offset, f"{tool_name}烧录未完成，进度: {int(self._current_progress - self.progress_offset)}%"))
-                except:
-                    pass
-                # 调用回调函数，表示烧录部分完成
-                if self.callback:
-                    wx.CallAfter(self.callback, False, False)  # False表示失败，False表示不是用户停止
-            else:
-                try:
-                    self.output_queue.put(f"{tool_prefix} 烧录失败，退出码: {return_code}\n")
-                    self.progress_queue.put((self.progress_offset, f"{tool_name}烧录失败，退出码: {return_code}"))
-                except:
-                    pass
-                # 调用回调函数，表示烧录失败
-                if self.callback:
-                    wx.CallAfter(self.callback, False, False)  # False表示失败，False表示不是用户停止
-            
-        except Exception:
-            # 异常情况下也调用回调函数
-            if self.callback:
-                wx.CallAfter(self.callback, False, False)  # False表示失败，False表示不是用户停止
-    
-    @staticmethod
-    def check_for_failure(text):
-        text = text.strip()
-        
-        failure_patterns = [
-            (r'connect failed', "串口连接失败"),
-            (r'Connect device fail!', "设备连接失败"),
-            (r'Writing Flash Failed', "Flash写入失败"),
-            (r'EraseFlash ->fail', "Flash擦除失败"),
-            (r'WriteFlash ->fail', "Flash写入失败"),
-            (r'Timeout', "操作超时"),
-            (r'Not found', "未找到设备或文件"),
-            (r'Error:', "错误信息"),
-            (r'error:', "错误信息"),
-            (r'Failed', "失败"),
-            (r'failed', "失败"),
-            (r'无效', "无效操作或参数"),
-            (r'不支持', "不支持的操作"),
-        ]
-        
-        for pattern, message in failure_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                lines = text.split('\n')
-                for line in lines:
-                    if re.search(pattern, line, re.IGNORECASE):
-                        return line.strip()
-        
-        return None
-    
-    def parse_progress_and_status(self, text):
-        """解析进度和状态信息"""
-        text = text.strip()
-        
-        # 如果包含失败信息，返回失败状态
-        if self.check_for_failure(text):
-            return (0, "检测到失败信息")
-        
-        # 连接成功
-        if "connect success" in text:
-            return (5, "串口连接成功")
-        
-        # 获取总线
-        if "Gotten Bus" in text:
-            return (7, "获取设备总线")
-        
-        # 识别芯片
-        if "Current Chip is" in text:
-            chip_match = re.search(r'Current Chip is : (\w+)', text)
-            if chip_match:
-                chip = chip_match.group(1)
-                return (10, f"识别到芯片: {chip}")
-        
-        # 波特率切换成功
-        if "Current baudrate" in text and "success" in text:
-            return (12, "波特率切换成功")
-        
-        # Flash解除保护
-        if "Unprotecting Flash" in text:
-            return (15, "解除Flash保护")
-        if "Unprotected Flash ->pass" in text:
-            return (20, "Flash保护已解除")
-        
-        # 文件信息
-        if "file_length" in text:
-            file_match = re.search(r'file_length : 0x[0-9a-f]+ \((\d+) KB\)', text)
-            if file_match:
-                size_kb = file_match.group(1)
-                return (25, f"文件大小: {size_kb} KB")
-        
-        # 开始擦除Flash
-        if "Begin EraseFlash" in text:
-            self._current_phase = "erasing"
-            self._erase_percent = 0
-            return (30, "开始擦除Flash...")
-        
-        # 4K擦除
-        if "Start 4K Erase" in text:
-            return (35, "4K擦除...")
-        if "End 4K Erase" in text:
-            return (40, "4K擦除完成")
-        
-        # 64K擦除
-        if "Start 64K Erase" in text:
-            return (45, "64K擦除...")
-        
-        # 擦除百分比
-        erase_match = re.search(r'Erasing Flash \.\.\. (\d+)%', text)
-        if erase_match:
-            self._erase_percent = int(erase_match.group(1))
-            progress = 45 + (self._erase_percent * 0.15)
-            return (int(progress), f"擦除Flash: {self._erase_percent}%")
-        
-        if "End 64K Erase" in text:
-            return (60, "64K擦除完成")
-        if "EraseFlash ->pass" in text:
-            self._current_phase = "writing"
-            self._write_percent = 0
-            return (65, "Flash擦除完成")
-        
-        # 开始写入
-        if "Begin write to flash" in text:
-            return (70, "开始写入Flash...")
-        
-        # 写入百分比
-        write_match = re.search(r'Writing Flash \.\.\. (\d+)%', text)
-        if write_match:
-            self._write_percent = int(write_match.group(1))
-            progress = 70 + (self._write_percent * 0.20)
-            return (int(progress), f"写入Flash: {self._write_percent}%")
-        
-        # 写入完成
-        if "WriteFlash ->pass" in text:
-            self._current_phase = "protecting"
-            return (90, "Flash写入完成")
-        
-        # 保护Flash
-        if "Enprotect pass" in text:
-            self._current_phase = "rebooting"
-            return (95, "Flash保护完成")
-        
-        # 重启
-        if "Boot_Reboot" in text:
-            return (97, "设备重启中...")
-        
-        # 烧录完成
-        if "Writing Flash OK" in text or "All Finished Successfully" in text:
-            return (100, "烧录完成")
-        
-        # 总耗时
-        time_match = re.search(r'Total Test Time : (\d+\.\d+) s', text)
-        if time_match:
-            time_sec = time_match.group(1)
-            return (100, f"烧录完成，耗时: {time_sec}秒")
-        
-        return None
-
 class ProgressPanel(wx.Panel):
     """进度条面板"""
     def __init__(self, parent):
@@ -575,6 +240,10 @@ class ProgressPanel(wx.Panel):
         
         self.SetSizer(vbox)
         self.start_time = None
+        self.estimate = None  # 根据烧录历史预测的总耗时(秒)
+    
+    def set_estimate(self, seconds):
+        self.estimate = seconds
     
     def update_progress(self, value, status=None):
         try:
@@ -583,7 +252,10 @@ class ProgressPanel(wx.Panel):
             # 更新耗时显示
             if self.start_time:
                 elapsed = time.time() - self.start_time
-                self.time_label.SetLabel(f"耗时: {elapsed:.3f}s")
+                if self.estimate:
+                    self.time_label.SetLabel(f"耗时: {elapsed:.3f}s  预计剩余: {max(0, self.estimate - elapsed):.0f}s")
+                else:
+                    self.time_label.SetLabel(f"耗时: {elapsed:.3f}s")
             
             # 更新状态显示
             if status:
@@ -604,6 +276,7 @@ class ProgressPanel(wx.Panel):
             self.progress_bar.SetValue(0)
             self.status_label.SetLabel("准备就绪")
             self.time_label.SetLabel("耗时: --")
+            self.estimate = None
         except wx.PyDeadObjectError:
             pass
         
@@ -644,7 +317,8 @@ class SerialPortPanel(wx.Panel):
         hbox2.Add(wx.StaticText(self, label="波特率:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
         
         self.baudrate_combo = wx.ComboBox(self, value="2000000", 
-                                         choices=["115200", "512000", "921600", "1000000", "1500000", "2000000", "3000000", "4000000", "5000000", "6000000"])
+                                         choices=["自动", "115200", "512000", "921600", "1000000", "1500000", "2000000", "3000000", "4000000", "5000000", "6000000"])
+        self.baudrate_combo.SetToolTip("自动: 从高到低尝试，按串口适配器和芯片记住能用的最高波特率")
         hbox2.Add(self.baudrate_combo, 0, wx.RIGHT, 5)
         
         vbox.Add(hbox2, 0, wx.EXPAND | wx.ALL, 5)
@@ -676,53 +350,63 @@ class SerialPortPanel(wx.Panel):
         self.update_ver_check.SetValue(False)  # 默认勾选
         vbox.Add(self.update_ver_check, 0, wx.ALL, 5)
         
+        # 内部→外部切换时检测设备就绪的方式
+        hbox_ready = wx.BoxSizer(wx.HORIZONTAL)
+        hbox_ready.Add(wx.StaticText(self, label="重启检测:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        self.ready_mode_choice = wx.Choice(self, choices=["启动信息", "握手探测", "固定延时"])
+        self.ready_mode_choice.SetSelection(READY_MODES.index(DEFAULT_READY_MODE))
+        self.ready_mode_choice.SetToolTip("启动信息: 串口出现启动标志(为空时启动输出结束)即就绪\n"
+                                          "握手探测: 发送LinkCheck收到应答即就绪\n固定延时: 等待1秒")
+        hbox_ready.Add(self.ready_mode_choice, 0, wx.RIGHT, 5)
+        self.ready_banner_text = wx.TextCtrl(self, size=(100, -1))
+        self.ready_banner_text.SetHint("启动标志")
+        hbox_ready.Add(self.ready_banner_text, 1, wx.RIGHT, 5)
+        hbox_ready.Add(wx.StaticText(self, label="超时:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        self.ready_timeout_spin = wx.SpinCtrl(self, value="5", min=1, max=60, size=(50, -1))
+        hbox_ready.Add(self.ready_timeout_spin, 0)
+        vbox.Add(hbox_ready, 0, wx.EXPAND | wx.ALL, 5)
+        
+        # 预检后把地址相邻的镜像合并为一个，减少擦除+写入的次数
+        hbox_merge = wx.BoxSizer(wx.HORIZONTAL)
+        self.merge_check = wx.CheckBox(self, label="合并相邻镜像")
+        self.merge_check.SetToolTip("烧录前把地址相邻的文件合并为一个，空隙填0xFF")
+        hbox_merge.Add(self.merge_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        self.merge_align_choice = wx.Choice(self, choices=["4K对齐", "64K对齐"])
+        self.merge_align_choice.SetSelection(0)
+        self.merge_align_choice.SetToolTip("4K对齐只覆盖各镜像自己的扇区\n"
+                                           "64K对齐时合并镜像末尾补0xFF到64K边界，该区域原有数据会被擦除")
+        self.merge_align_choice.Bind(wx.EVT_CHOICE, self.on_merge_align_changed)
+        hbox_merge.Add(self.merge_align_choice, 0, wx.RIGHT, 10)
+        # 只烧录与该设备上次烧录相比内容变化的64K块
+        self.diff_check = wx.CheckBox(self, label="差分烧录")
+        self.diff_check.SetToolTip("按设备记录上次烧录的内容，只烧录变化的64K块\n"
+                                   "完整烧录: 工具 → 清除差分烧录记录")
+        hbox_merge.Add(self.diff_check, 0, wx.ALIGN_CENTER_VERTICAL)
+        vbox.Add(hbox_merge, 0, wx.EXPAND | wx.ALL, 5)
+        
         self.SetSizer(vbox)
         self.refresh_ports()
     
     def on_refresh_ports(self, event):
+        # 请求热插拔服务完整重新枚举，结果通过串口更新事件回到界面
+        get_port_service().refresh()
         self.refresh_ports()
     
     def refresh_ports(self):
+        """从热插拔服务缓存的串口表刷新下拉框，不再重新枚举串口"""
         try:
-            current_selection = self.port_combo.GetValue()
-            self.port_combo.Clear()
-            self.port_info_dict.clear()
-            
-            try:
-                ports = serial.tools.list_ports.comports()
-                port_info_list = []
-                
-                for port in ports:
-                    # 构建显示文本
-                    description = port.description if port.description else "未知设备"
-                    display_text = f"{port.device} - {description}"
-                    
-                    # 存储端口信息
-                    self.port_info_dict[display_text] = {
-                        'device': port.device,
-                        'description': port.description if port.description else '未知设备',
-                        'hwid': port.hwid if port.hwid else '未知ID',
-                        'manufacturer': port.manufacturer if port.manufacturer else '未知厂商',
-                        'product': port.product if port.product else '未知产品'
-                    }
-                    
-                    port_info_list.append(display_text)
-                
-                # 按设备名排序
-                port_info_list.sort()
-                
-                for display_text in port_info_list:
-                    self.port_combo.Append(display_text)
-                
-                # 尝试恢复之前的选择
-                if current_selection in port_info_list:
-                    self.port_combo.SetValue(current_selection)
-                elif port_info_list:
-                    self.port_combo.SetSelection(0)
-            except Exception as e:
-                print(f"获取串口列表失败: {e}")
-        except wx.PyDeadObjectError:
-            pass
+            self.set_port_list(get_port_service().get_ports())
+        except Exception as e:
+            print(f"获取串口列表失败: {e}")
+    
+    def on_merge_align_changed(self, event):
+        """64K对齐会擦除镜像之后的数据，需要确认"""
+        if self.merge_align_choice.GetSelection() != 1:
+            return
+        result = wx.MessageBox("64K对齐时合并镜像末尾补0xFF到64K边界，镜像之后不在烧录列表中的数据(如NV、校准区)会被擦除。\n"
+                               "确定使用64K对齐吗？", "警告", wx.YES_NO | wx.NO_DEFAULT | wx.ICON_WARNING)
+        if result != wx.YES:
+            self.merge_align_choice.SetSelection(0)
     
     def get_config(self):
         try:
@@ -741,11 +425,18 @@ class SerialPortPanel(wx.Panel):
             
             return {
                 'port': port_device,
-                'baudrate': self.baudrate_combo.GetValue(),
+                'baudrate': AUTO_BAUD if self.baudrate_combo.GetValue() == "自动" else self.baudrate_combo.GetValue(),
                 'uart_type': self.uart_combo.GetValue(),
                 'fast_link': self.fast_link_check.GetValue(),
                 'big_endian': self.big_endian_check.GetValue(),
-                'update_ver': self.update_ver_check.GetValue()
+                'update_ver': self.update_ver_check.GetValue(),
+                'ready_mode': READY_MODES[self.ready_mode_choice.GetSelection()],
+                'ready_banner': self.ready_banner_text.GetValue(),
+                'ready_timeout': self.ready_timeout_spin.GetValue(),
+                'merge_images': self.merge_check.GetValue(),
+                'merge_align': 64 if self.merge_align_choice.GetSelection() == 1 else 4,
+                'merge_pad': self.merge_align_choice.GetSelection() == 1,
+                'diff_flash': self.diff_check.GetValue()
             }
         except wx.PyDeadObjectError:
             return {}
@@ -769,7 +460,7 @@ class SerialPortPanel(wx.Panel):
                     self.port_combo.SetValue(port_device)
             
             if 'baudrate' in config:
-                self.baudrate_combo.SetValue(config['baudrate'])
+                self.baudrate_combo.SetValue("自动" if config['baudrate'] == AUTO_BAUD else config['baudrate'])
             if 'uart_type' in config:
                 self.uart_combo.SetValue(config['uart_type'])
             if 'fast_link' in config:
@@ -778,6 +469,20 @@ class SerialPortPanel(wx.Panel):
                 self.big_endian_check.SetValue(config['big_endian'])
             if 'update_ver' in config:
                 self.update_ver_check.SetValue(config['update_ver'])
+            if config.get('ready_mode') in READY_MODES:
+                self.ready_mode_choice.SetSelection(READY_MODES.index(config['ready_mode']))
+            if 'ready_banner' in config:
+                self.ready_banner_text.SetValue(config['ready_banner'])
+            if 'ready_timeout' in config:
+                self.ready_timeout_spin.SetValue(int(config['ready_timeout']))
+            if 'merge_images' in config:
+                self.merge_check.SetValue(config['merge_images'])
+            if 'merge_align' in config:
+                # 末尾补齐必须是保存配置时确认过的，旧配置中只有64K对齐时按4K合并
+                pad = int(config['merge_align']) == 64 and config.get('merge_pad')
+                self.merge_align_choice.SetSelection(1 if pad else 0)
+            if 'diff_flash' in config:
+                self.diff_check.SetValue(config['diff_flash'])
         except wx.PyDeadObjectError:
             pass
     
@@ -831,6 +536,12 @@ class SerialPortPanel(wx.Panel):
         self.fast_link_check.Enable(enabled)
         self.big_endian_check.Enable(enabled)
         self.update_ver_check.Enable(enabled)
+        self.ready_mode_choice.Enable(enabled)
+        self.ready_banner_text.Enable(enabled)
+        self.ready_timeout_spin.Enable(enabled)
+        self.merge_check.Enable(enabled)
+        self.merge_align_choice.Enable(enabled)
+        self.diff_check.Enable(enabled)
 
 class FlashFilesPanel(wx.Panel):
     """烧录文件配置面板 - 支持滚动显示"""
@@ -1029,10 +740,122 @@ class ControlPanel(wx.Panel):
         
         self.SetSizer(hbox)
 
+# 日志颜色类别 -> 颜色，首次使用时创建（wx.Colour需要在wx.App创建之后）
+_OUTPUT_COLOURS = {}
+
+def get_output_colour(color_key):
+    if not color_key:
+        return None
+    if not _OUTPUT_COLOURS:
+        _OUTPUT_COLOURS.update({
+            "error": wx.RED,
+            "success": wx.Colour(0, 128, 0),
+            "warning": wx.Colour(255, 140, 0),
+            "internal": wx.Colour(0, 0, 180),  # 蓝色
+            "external": wx.Colour(180, 0, 180),  # 紫色
+        })
+    return _OUTPUT_COLOURS.get(color_key)
+
+class LogListCtrl(wx.ListCtrl):
+    """虚拟列表日志视图 - 环形缓冲区只保留最近max_lines行，只绘制可见行"""
+    def __init__(self, parent, max_lines=20000):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_NO_HEADER | wx.HSCROLL)
+        self.lines = deque(maxlen=max_lines)  # 每行为 (文本, 显示属性)，颜色在追加时计算一次
+        self._line_open = False  # 最后一行是否还没有换行
+        self._attrs = {}  # 颜色RGB -> wx.ItemAttr
+        self.InsertColumn(0, "", width=2000)
+        self.SetItemCount(0)
+        self.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
+    
+    def get_attr(self, color):
+        if not color:
+            return None
+        key = color.GetRGB()
+        attr = self._attrs.get(key)
+        if attr is None:
+            attr = wx.ItemAttr()
+            attr.SetTextColour(color)
+            self._attrs[key] = attr
+        return attr
+    
+    def append(self, text, color=None):
+        if not text:
+            return
+        attr = self.get_attr(color)
+        parts = text.split("\n")
+        line_open = parts[-1] != ""
+        if not line_open:
+            parts.pop()
+        
+        # 上一次没有换行的文本接到最后一行
+        if self._line_open and self.lines and parts:
+            last_text, last_attr = self.lines[-1]
+            self.lines[-1] = (last_text + parts[0].rstrip("\r"), last_attr or attr)
+            parts = parts[1:]
+        
+        for part in parts:
+            self.lines.append((part.rstrip("\r"), attr))
+        self._line_open = line_open
+    
+    def update_view(self):
+        """同步行数并在底部时自动滚动，只刷新可见区域"""
+        count = len(self.lines)
+        old_count = self.GetItemCount()
+        at_bottom = old_count == 0 or self.GetTopItem() + self.GetCountPerPage() >= old_count - 1
+        
+        if count != old_count:
+            self.SetItemCount(count)
+        
+        if not count:
+            return
+        top = self.GetTopItem()
+        self.RefreshItems(top, min(count - 1, top + self.GetCountPerPage()))
+        if at_bottom:
+            self.EnsureVisible(count - 1)
+    
+    def clear(self):
+        self.lines.clear()
+        self._line_open = False
+        self.SetItemCount(0)
+        self.Refresh()
+    
+    def OnGetItemText(self, item, column):
+        try:
+            return self.lines[item][0]
+        except IndexError:
+            return ""
+    
+    def OnGetItemAttr(self, item):
+        try:
+            return self.lines[item][1]
+        except IndexError:
+            return None
+    
+    def on_key_down(self, event):
+        if event.ControlDown() and event.GetKeyCode() == ord('A'):
+            for i in range(self.GetItemCount()):
+                self.Select(i)
+        elif event.ControlDown() and event.GetKeyCode() == ord('C'):
+            self.copy_selected()
+        else:
+            event.Skip()
+    
+    def copy_selected(self):
+        selected = []
+        item = self.GetFirstSelected()
+        while item != -1:
+            selected.append(self.OnGetItemText(item, 0))
+            item = self.GetNextSelected(item)
+        if selected and wx.TheClipboard.Open():
+            wx.TheClipboard.SetData(wx.TextDataObject("\n".join(selected)))
+            wx.TheClipboard.Close()
+
 class OutputPanel(wx.Panel):
     """输出显示面板"""
-    def __init__(self, parent):
+    def __init__(self, parent, max_lines=20000):
         super().__init__(parent)
+        self.max_lines = max_lines
+        self.spill_writer = None  # 可选的完整日志落盘线程
         self.init_ui()
     
     def init_ui(self):
@@ -1043,11 +866,8 @@ class OutputPanel(wx.Panel):
         title.SetFont(wx.Font(11, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
         vbox.Add(title, 0, wx.ALL, 5)
         
-        # 输出文本框
-        self.output_text = wx.TextCtrl(
-            self, 
-            style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_RICH | wx.TE_DONTWRAP | wx.HSCROLL
-        )
+        # 输出日志列表（虚拟列表，只保留最近max_lines行）
+        self.output_text = LogListCtrl(self, max_lines=self.max_lines)
         font = wx.Font(9, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
         self.output_text.SetFont(font)
         vbox.Add(self.output_text, 1, wx.EXPAND | wx.ALL, 5)
@@ -1055,14 +875,622 @@ class OutputPanel(wx.Panel):
         self.SetSizer(vbox)
     
     def append_text(self, text, color=None):
-        if color:
-            self.output_text.SetDefaultStyle(wx.TextAttr(color))
-        self.output_text.AppendText(text)
-        if color:
-            self.output_text.SetDefaultStyle(wx.TextAttr(wx.NullColour))
+        self.output_text.append(text, color)
+        if self.spill_writer:
+            self.spill_writer.write(text)
+        self.output_text.update_view()
+    
+    def append_chunks(self, chunks):
+        """一次追加多个已按颜色合并的文本块 [(颜色类别, 文本), ...]"""
+        for color_key, text in chunks:
+            self.output_text.append(text, get_output_colour(color_key))
+            if self.spill_writer:
+                self.spill_writer.write(text)
+        self.output_text.update_view()
     
     def clear(self):
-        self.output_text.Clear()
+        self.output_text.clear()
+    
+    def start_spill(self, file_path):
+        """开始把完整日志写入文件"""
+        self.stop_spill()
+        self.spill_writer = LogSpillWriter(file_path)
+        self.spill_writer.start()
+    
+    def stop_spill(self):
+        if self.spill_writer:
+            self.spill_writer.stop()
+            self.spill_writer.join(timeout=1)
+            self.spill_writer = None
+
+class FarmPortRow(wx.Panel):
+    """多口烧录中单个串口的进度/结果行"""
+    def __init__(self, parent, port, on_stop_callback, on_retry_callback):
+        super().__init__(parent)
+        self.port = port
+        self.on_stop_callback = on_stop_callback
+        self.on_retry_callback = on_retry_callback
+        self.estimate = None
+        self.init_ui()
+    
+    def init_ui(self):
+        hbox = wx.BoxSizer(wx.HORIZONTAL)
+        
+        self.port_label = wx.StaticText(self, label=self.port, size=(80, -1))
+        self.port_label.SetFont(wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        hbox.Add(self.port_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        
+        self.progress_bar = wx.Gauge(self, range=100, size=(160, 20))
+        hbox.Add(self.progress_bar, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        
+        self.status_label = wx.StaticText(self, label="等待开始", size=(220, -1), style=wx.ST_ELLIPSIZE_END)
+        hbox.Add(self.status_label, 1, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        
+        self.time_label = wx.StaticText(self, label="--", size=(60, -1))
+        self.time_label.SetForegroundColour(wx.Colour(100, 100, 100))
+        hbox.Add(self.time_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        
+        self.result_label = wx.StaticText(self, label="", size=(50, -1))
+        self.result_label.SetFont(wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        hbox.Add(self.result_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        
+        self.stop_btn = wx.Button(self, label="停止")
+        self.stop_btn.SetMinSize((50, 25))
+        self.stop_btn.Disable()
+        self.stop_btn.Bind(wx.EVT_BUTTON, lambda evt: self.on_stop_callback(self.port))
+        hbox.Add(self.stop_btn, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 2)
+        
+        self.retry_btn = wx.Button(self, label="重试")
+        self.retry_btn.SetMinSize((50, 25))
+        self.retry_btn.Disable()
+        self.retry_btn.Bind(wx.EVT_BUTTON, lambda evt: self.on_retry_callback(self.port))
+        hbox.Add(self.retry_btn, 0, wx.ALIGN_CENTER_VERTICAL)
+        
+        self.SetSizer(hbox)
+    
+    def set_running(self, estimate=None):
+        self.estimate = estimate
+        self.progress_bar.SetValue(0)
+        self.status_label.SetLabel("烧录中...")
+        self.time_label.SetLabel("--")
+        self.result_label.SetLabel("")
+        self.stop_btn.Enable()
+        self.retry_btn.Disable()
+    
+    def update_progress(self, value, status=None):
+        self.progress_bar.SetValue(max(0, min(100, int(value))))
+        if status:
+            self.status_label.SetLabel(status)
+    
+    def update_elapsed(self, elapsed):
+        if self.estimate and self.stop_btn.IsEnabled():
+            self.time_label.SetLabel(f"{elapsed:.0f}/{self.estimate:.0f}s")
+        else:
+            self.time_label.SetLabel(f"{elapsed:.1f}s")
+    
+    def set_result(self, success, user_stopped, elapsed=None):
+        if user_stopped:
+            self.result_label.SetLabel("停止")
+            self.result_label.SetForegroundColour(wx.Colour(255, 140, 0))
+        elif success:
+            self.progress_bar.SetValue(100)
+            self.result_label.SetLabel("PASS")
+            self.result_label.SetForegroundColour(wx.Colour(0, 128, 0))
+        else:
+            self.result_label.SetLabel("FAIL")
+            self.result_label.SetForegroundColour(wx.RED)
+        if elapsed is not None:
+            self.update_elapsed(elapsed)
+        self.stop_btn.Disable()
+        self.retry_btn.Enable()
+
+class FarmFrame(wx.Frame):
+    """多口并行烧录窗口 - 每个串口独立运行内部→外部烧录流程"""
+    def __init__(self, app):
+        super().__init__(app, title="多口并行烧录", size=(820, 520))
+        self.app = app
+        self.pipelines = {}  # 串口号 -> FlashPipeline
+        self.rows = {}  # 串口号 -> FarmPortRow
+        self.pass_count = 0
+        self.fail_count = 0
+        self.init_ui()
+        self.update_start_button()
+        
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.timer.Start(100)
+        
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+    
+    def init_ui(self):
+        panel = wx.Panel(self)
+        vbox = wx.BoxSizer(wx.VERTICAL)
+        
+        # 串口选择
+        hbox_ports = wx.BoxSizer(wx.HORIZONTAL)
+        hbox_ports.Add(wx.StaticText(panel, label="烧录串口:"), 0, wx.ALIGN_TOP | wx.RIGHT, 5)
+        self.port_list = wx.CheckListBox(panel, size=(-1, 100))
+        hbox_ports.Add(self.port_list, 1, wx.EXPAND | wx.RIGHT, 5)
+        
+        vbox_select = wx.BoxSizer(wx.VERTICAL)
+        self.select_all_btn = wx.Button(panel, label="全选")
+        self.select_all_btn.Bind(wx.EVT_BUTTON, self.on_select_all)
+        vbox_select.Add(self.select_all_btn, 0, wx.BOTTOM, 5)
+        self.select_none_btn = wx.Button(panel, label="全不选")
+        self.select_none_btn.Bind(wx.EVT_BUTTON, self.on_select_none)
+        vbox_select.Add(self.select_none_btn, 0)
+        hbox_ports.Add(vbox_select, 0)
+        
+        vbox.Add(hbox_ports, 0, wx.EXPAND | wx.ALL, 5)
+        
+        # 控制按钮和统计
+        hbox_ctrl = wx.BoxSizer(wx.HORIZONTAL)
+        self.start_btn = wx.Button(panel, label="全部开始")
+        self.start_btn.SetMinSize((100, 35))
+        self.start_btn.SetBackgroundColour(wx.Colour(76, 175, 80))
+        self.start_btn.SetForegroundColour(wx.WHITE)
+        self.start_btn.Bind(wx.EVT_BUTTON, self.on_start_all)
+        hbox_ctrl.Add(self.start_btn, 0, wx.RIGHT, 10)
+        
+        self.stop_btn = wx.Button(panel, label="全部停止")
+        self.stop_btn.SetMinSize((100, 35))
+        self.stop_btn.Disable()
+        self.stop_btn.Bind(wx.EVT_BUTTON, self.on_stop_all)
+        hbox_ctrl.Add(self.stop_btn, 0, wx.RIGHT, 10)
+        
+        hbox_ctrl.AddStretchSpacer(1)
+        
+        self.summary_label = wx.StaticText(panel, label="通过: 0  失败: 0")
+        self.summary_label.SetFont(wx.Font(11, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        hbox_ctrl.Add(self.summary_label, 0, wx.ALIGN_CENTER_VERTICAL)
+        
+        vbox.Add(hbox_ctrl, 0, wx.EXPAND | wx.ALL, 5)
+        
+        # 每个串口一行
+        self.scrolled_window = wx.ScrolledWindow(panel)
+        self.scrolled_window.SetScrollRate(10, 10)
+        self.rows_container = wx.BoxSizer(wx.VERTICAL)
+        self.scrolled_window.SetSizer(self.rows_container)
+        vbox.Add(self.scrolled_window, 1, wx.EXPAND | wx.ALL, 5)
+        
+        panel.SetSizer(vbox)
+        
+        self.set_port_list(list(self.app.serial_panel.port_info_dict.values()))
+    
+    def set_port_list(self, port_info_list):
+        """刷新可选串口列表，保留已勾选的串口"""
+        checked = set(self.port_list.GetCheckedStrings())
+        devices = sorted(port_info['device'] for port_info in port_info_list)
+        self.port_list.Set(devices)
+        self.port_list.SetCheckedStrings([device for device in devices if device in checked])
+    
+    def on_select_all(self, event):
+        self.port_list.SetCheckedItems(list(range(self.port_list.GetCount())))
+    
+    def on_select_none(self, event):
+        self.port_list.SetCheckedItems([])
+    
+    def is_running(self):
+        return any(pipeline.is_running() for pipeline in self.pipelines.values())
+    
+    def other_busy(self):
+        """单口烧录或自动烧录进行中时它们可能占用任意串口，不能再启动多口烧录"""
+        return self.app.is_flashing() or bool(self.app.auto_flash_frame and self.app.auto_flash_frame.is_active())
+    
+    def on_start_all(self, event):
+        if self.other_busy():
+            wx.MessageBox("单口烧录或插入自动烧录正在进行，请先停止", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        ports = list(self.port_list.GetCheckedStrings())
+        if not ports:
+            wx.MessageBox("请至少勾选一个串口", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        
+        internal_files = self.app.files_panel.get_internal_files()
+        external_files = self.app.files_panel.get_external_files()
+        if not internal_files and not external_files:
+            wx.MessageBox("请至少勾选一个文件进行烧录", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        
+        serial_config = self.app.serial_panel.get_config()
+        
+        # 重新创建所有行
+        for pipeline in self.pipelines.values():
+            if pipeline.is_running():
+                pipeline.stop()
+        self.rows_container.Clear(True)
+        self.pipelines.clear()
+        self.rows.clear()
+        
+        for port in ports:
+            config = dict(serial_config)
+            config['port'] = port
+            self.pipelines[port] = FlashPipeline(config, internal_files, external_files,
+                                                 self.app.output_queue, callback=call_after(self.on_pipeline_completed),
+                                                 history=self.app.history)
+            row = FarmPortRow(self.scrolled_window, port, self.on_stop_port, self.on_retry_port)
+            self.rows[port] = row
+            self.rows_container.Add(row, 0, wx.EXPAND | wx.BOTTOM, 5)
+        
+        self.scrolled_window.SetVirtualSize(self.scrolled_window.GetBestVirtualSize())
+        self.scrolled_window.Layout()
+        
+        self.app.output_panel.append_text("="*80 + "\n")
+        self.app.output_panel.append_text(f"多口并行烧录开始: {', '.join(ports)}\n", wx.Colour(0, 0, 255))
+        self.app.output_panel.append_text("="*80 + "\n")
+        
+        for port in ports:
+            self.start_port(port)
+    
+    def start_port(self, port):
+        pipeline = self.pipelines.get(port)
+        row = self.rows.get(port)
+        if not pipeline or not row or pipeline.is_running():
+            return
+        if self.other_busy():
+            wx.MessageBox("单口烧录或插入自动烧录正在进行，请先停止", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        row.set_running(pipeline.estimate())
+        pipeline.start()
+        self.update_controls()
+    
+    def on_stop_port(self, port):
+        pipeline = self.pipelines.get(port)
+        if pipeline and pipeline.is_running():
+            self.rows[port].update_progress(self.rows[port].progress_bar.GetValue(), "停止中...")
+            pipeline.stop()
+    
+    def on_retry_port(self, port):
+        self.start_port(port)
+    
+    def on_stop_all(self, event):
+        for port in list(self.pipelines):
+            self.on_stop_port(port)
+    
+    def on_pipeline_completed(self, port, success, user_stopped):
+        row = self.rows.get(port)
+        pipeline = self.pipelines.get(port)
+        if not row or not pipeline:
+            return
+        
+        self.drain_progress(port)
+        elapsed = None
+        if pipeline.start_time and pipeline.end_time:
+            elapsed = pipeline.end_time - pipeline.start_time
+        row.set_result(success, user_stopped, elapsed)
+        
+        if not user_stopped:
+            if success:
+                self.pass_count += 1
+                self.app.output_panel.append_text(f"\n✓ [{port}] 烧录成功!\n", wx.Colour(0, 128, 0))
+            else:
+                self.fail_count += 1
+                self.app.output_panel.append_text(f"\n✗ [{port}] 烧录失败\n", wx.RED)
+            self.summary_label.SetLabel(f"通过: {self.pass_count}  失败: {self.fail_count}")
+        else:
+            stop_time = f"（用时 {pipeline.stop_ms:.0f} ms）" if pipeline.stop_ms is not None else ""
+            self.app.output_panel.append_text(f"\n⚠ [{port}] 烧录已停止{stop_time}\n", wx.Colour(255, 140, 0))
+        
+        for warning in pipeline.slow_warnings():
+            self.app.output_panel.append_text(f"⚠ {warning}\n", wx.Colour(255, 140, 0))
+        
+        self.update_controls()
+    
+    def update_controls(self):
+        running = self.is_running()
+        self.update_start_button()
+        self.stop_btn.Enable(running)
+        self.port_list.Enable(not running)
+        self.select_all_btn.Enable(not running)
+        self.select_none_btn.Enable(not running)
+        self.app.enable_config_areas(not running and not self.app.is_flashing())
+        self.app.update_flash_button()
+    
+    def update_start_button(self):
+        self.start_btn.Enable(not self.is_running() and not self.other_busy())
+    
+    def drain_progress(self, port):
+        pipeline = self.pipelines[port]
+        row = self.rows[port]
+        latest = None
+        try:
+            while True:
+                item = pipeline.progress_queue.get_nowait()
+                if isinstance(item, tuple) and len(item) == 2:
+                    latest = item
+        except queue.Empty:
+            pass
+        if latest:
+            row.update_progress(*latest)
+    
+    def on_timer(self, event):
+        now = time.time()
+        for port, pipeline in self.pipelines.items():
+            if not pipeline.is_running():
+                continue
+            self.drain_progress(port)
+            if pipeline.start_time:
+                self.rows[port].update_elapsed(now - pipeline.start_time)
+    
+    def on_close(self, event):
+        if self.is_running():
+            result = wx.MessageBox("仍有串口正在烧录，确定停止并关闭吗？", "确认",
+                                   wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
+            if result != wx.YES:
+                event.Veto()
+                return
+        self.shutdown()
+        self.Destroy()
+    
+    def shutdown(self):
+        """停止所有串口烧录并释放定时器"""
+        if self.timer:
+            self.timer.Stop()
+            self.timer = None
+        for pipeline in self.pipelines.values():
+            pipeline.callback = None
+            if pipeline.is_running():
+                pipeline.stop()
+        self.app.farm_frame = None
+        if not self.app._closing:
+            self.app.enable_config_areas(not self.app.is_flashing())
+            self.app.update_flash_button()
+
+class AutoFlashFrame(wx.Frame):
+    """自动烧录窗口 - 固定一份烧录配置，插入匹配的串口后自动烧录"""
+    def __init__(self, app):
+        super().__init__(app, title="插入自动烧录", size=(760, 520))
+        self.app = app
+        self.queue = None  # AutoFlashQueue
+        self.slots = {}  # 串口号 -> ProgressSlot
+        self.unit_log_path = os.path.join(self.app.log_dir, time.strftime("autoflash_%Y%m%d.csv"))
+        self._next_item_id = 0
+        self._item_ids = {}  # 串口号 -> 列表中当前单元的行ID
+        self.init_ui()
+        
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.timer.Start(200)
+        
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+    
+    def init_ui(self):
+        panel = wx.Panel(self)
+        vbox = wx.BoxSizer(wx.VERTICAL)
+        
+        grid = wx.FlexGridSizer(cols=2, vgap=5, hgap=5)
+        grid.AddGrowableCol(1)
+        
+        grid.Add(wx.StaticText(panel, label="烧录配置:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        self.profile_picker = wx.FilePickerCtrl(panel, message="选择保存的烧录配置", wildcard="配置文件 (*.json)|*.json",
+                                                style=wx.FLP_OPEN | wx.FLP_FILE_MUST_EXIST | wx.FLP_USE_TEXTCTRL)
+        self.profile_picker.SetToolTip("留空时使用主窗口当前的配置")
+        grid.Add(self.profile_picker, 1, wx.EXPAND)
+        
+        grid.Add(wx.StaticText(panel, label="匹配VID:PID:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        self.vid_pid_text = wx.TextCtrl(panel, value=self.default_vid_pid())
+        self.vid_pid_text.SetToolTip("多个用逗号分隔，如 1A86:7523,0403:6001；与hwid都留空时匹配所有USB串口")
+        grid.Add(self.vid_pid_text, 1, wx.EXPAND)
+        
+        grid.Add(wx.StaticText(panel, label="hwid包含:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        self.hwid_text = wx.TextCtrl(panel)
+        self.hwid_text.SetToolTip("按hwid中的文字匹配，多个用逗号分隔，如 SER=A1")
+        grid.Add(self.hwid_text, 1, wx.EXPAND)
+        
+        grid.Add(wx.StaticText(panel, label="同时烧录:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        self.parallel_spin = wx.SpinCtrl(panel, value="8", min=1, max=32, size=(80, -1))
+        grid.Add(self.parallel_spin, 0)
+        
+        vbox.Add(grid, 0, wx.EXPAND | wx.ALL, 5)
+        
+        # 控制按钮和统计
+        hbox_ctrl = wx.BoxSizer(wx.HORIZONTAL)
+        self.arm_btn = wx.Button(panel, label="开始自动烧录")
+        self.arm_btn.SetMinSize((120, 35))
+        self.arm_btn.SetBackgroundColour(wx.Colour(76, 175, 80))
+        self.arm_btn.SetForegroundColour(wx.WHITE)
+        self.arm_btn.Bind(wx.EVT_BUTTON, self.on_toggle_arm)
+        hbox_ctrl.Add(self.arm_btn, 0, wx.RIGHT, 10)
+        
+        hbox_ctrl.AddStretchSpacer(1)
+        
+        self.summary_label = wx.StaticText(panel, label="通过: 0  失败: 0  烧录中: 0  排队: 0")
+        self.summary_label.SetFont(wx.Font(11, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        hbox_ctrl.Add(self.summary_label, 0, wx.ALIGN_CENTER_VERTICAL)
+        
+        vbox.Add(hbox_ctrl, 0, wx.EXPAND | wx.ALL, 5)
+        
+        # 每个单元一行，最新的在最上面
+        self.unit_list = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for col, (title, width) in enumerate([("时间", 140), ("串口", 100), ("序列号", 120), ("状态", 260), ("耗时", 70)]):
+            self.unit_list.InsertColumn(col, title, width=width)
+        vbox.Add(self.unit_list, 1, wx.EXPAND | wx.ALL, 5)
+        
+        self.log_label = wx.StaticText(panel, label=f"单元日志: {self.unit_log_path}")
+        self.log_label.SetForegroundColour(wx.Colour(100, 100, 100))
+        vbox.Add(self.log_label, 0, wx.ALL, 5)
+        
+        panel.SetSizer(vbox)
+    
+    def default_vid_pid(self):
+        """默认使用主窗口当前所选串口的VID:PID"""
+        device = self.app.serial_panel.get_config().get('port')
+        for port_info in self.app.serial_panel.port_info_dict.values():
+            if port_info['device'] == device:
+                return format_vid_pid(port_info)
+        return ""
+    
+    def is_active(self):
+        return bool(self.queue and (self.queue.is_armed() or self.queue.is_running()))
+    
+    def load_profile(self):
+        """读取要固定下来的烧录配置，返回 (serial_config, internal_files, external_files)"""
+        path = self.profile_picker.GetPath()
+        if path:
+            profile = load_profile(path)
+            internal_files, external_files = split_files(profile['files'])
+            return profile['serial'], internal_files, external_files
+        return (self.app.serial_panel.get_config(), self.app.files_panel.get_internal_files(),
+                self.app.files_panel.get_external_files())
+    
+    def on_toggle_arm(self, event):
+        if self.queue and self.queue.is_armed():
+            self.disarm()
+        else:
+            self.arm()
+    
+    def arm(self):
+        try:
+            serial_config, internal_files, external_files = self.load_profile()
+            matcher = PortMatcher(parse_vid_pid(self.vid_pid_text.GetValue()),
+                                  [item.strip() for item in self.hwid_text.GetValue().split(',')])
+        except (ProfileError, ValueError) as e:
+            wx.MessageBox(str(e), "错误", wx.OK | wx.ICON_ERROR)
+            return
+        
+        if not internal_files and not external_files:
+            wx.MessageBox("请至少勾选一个文件进行烧录", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        if matcher.matches_all:
+            result = wx.MessageBox("VID:PID和hwid都为空，插入的任何USB串口都会被自动烧录。\n确定继续吗？", "确认",
+                                   wx.YES_NO | wx.NO_DEFAULT | wx.ICON_WARNING)
+            if result != wx.YES:
+                return
+        # 烧录配置固定后先预检一次，校验和缓存后每个单元烧录时不再重复读文件
+        errors = []
+        for stage, files in (("internal", internal_files), ("external", external_files)):
+            if files:
+                errors += prepare_stage_files(serial_config, files, stage)[1]
+        if errors:
+            wx.MessageBox("\n".join(errors), "错误", wx.OK | wx.ICON_ERROR)
+            return
+        
+        self.queue = AutoFlashQueue(serial_config, internal_files, external_files, self.app.output_queue, matcher,
+                                    on_event=call_after(self.on_queue_event), unit_log=UnitLog(self.unit_log_path),
+                                    history=self.app.history, max_parallel=self.parallel_spin.GetValue(),
+                                    progress_factory=self.make_slot)
+        self.queue.arm()
+        
+        profile = self.profile_picker.GetPath() or "当前配置"
+        self.app.output_panel.append_text("="*80 + "\n")
+        self.app.output_panel.append_text(f"自动烧录已启动({profile})，插入匹配的串口即开始烧录\n", wx.Colour(0, 0, 255))
+        self.app.output_panel.append_text("="*80 + "\n")
+        self.update_controls()
+    
+    def disarm(self):
+        """停止接收新串口，正在烧录的串口继续完成"""
+        self.queue.disarm()
+        self.app.output_panel.append_text("自动烧录已停止接收新串口\n", wx.Colour(0, 0, 255))
+        self.update_controls()
+    
+    def make_slot(self, port):
+        slot = ProgressSlot()
+        self.slots[port] = slot
+        return slot
+    
+    def on_queue_event(self, kind, port, data):
+        if not self.queue:
+            return
+        if kind == "queued":
+            item_id = self._next_item_id
+            self._next_item_id += 1
+            self._item_ids[port] = item_id
+            index = self.unit_list.InsertItem(0, time.strftime("%H:%M:%S"))
+            self.unit_list.SetItemData(index, item_id)
+            self.unit_list.SetItem(index, 1, port)
+            self.unit_list.SetItem(index, 2, data.get('serial_number') or "")
+            self.unit_list.SetItem(index, 3, "排队中")
+        elif kind == "started":
+            self.set_unit_status(port, "烧录中...")
+        elif kind == "finished":
+            result = {"pass": "PASS", "fail": "FAIL", "stopped": "停止"}[data['result']]
+            colour = {"pass": wx.Colour(0, 128, 0), "fail": wx.RED, "stopped": wx.Colour(255, 140, 0)}[data['result']]
+            elapsed = f"{data['elapsed']:.1f}s" if data['elapsed'] is not None else "--"
+            self.set_unit_status(port, result, elapsed, colour)
+            self._item_ids.pop(port, None)
+            self.slots.pop(port, None)
+            
+            if data['result'] == "pass":
+                self.app.output_panel.append_text(f"\n✓ [{port}] 自动烧录成功，可以拔出\n", wx.Colour(0, 128, 0))
+            elif data['result'] == "fail":
+                self.app.output_panel.append_text(f"\n✗ [{port}] 自动烧录失败\n", wx.RED)
+            else:
+                self.app.output_panel.append_text(f"\n⚠ [{port}] 自动烧录已停止\n", wx.Colour(255, 140, 0))
+        elif kind == "removed":
+            if port in self._item_ids and port not in self.queue.pipelines:
+                self.set_unit_status(port, "已拔出")
+                self._item_ids.pop(port, None)
+        self.update_controls()
+    
+    def find_unit(self, port):
+        item_id = self._item_ids.get(port)
+        if item_id is None:
+            return -1
+        return self.unit_list.FindItem(-1, item_id)
+    
+    def set_unit_status(self, port, status, elapsed=None, colour=None):
+        index = self.find_unit(port)
+        if index < 0:
+            return
+        self.unit_list.SetItem(index, 3, status)
+        if elapsed is not None:
+            self.unit_list.SetItem(index, 4, elapsed)
+        if colour is not None:
+            self.unit_list.SetItemTextColour(index, colour)
+    
+    def update_controls(self):
+        armed = bool(self.queue and self.queue.is_armed())
+        self.arm_btn.SetLabel("停止自动烧录" if armed else "开始自动烧录")
+        self.arm_btn.SetBackgroundColour(wx.Colour(244, 67, 54) if armed else wx.Colour(76, 175, 80))
+        for ctrl in (self.profile_picker, self.vid_pid_text, self.hwid_text, self.parallel_spin):
+            ctrl.Enable(not armed)
+        if self.queue:
+            self.summary_label.SetLabel(f"通过: {self.queue.pass_count}  失败: {self.queue.fail_count}  "
+                                        f"烧录中: {len(self.queue.pipelines)}  排队: {len(self.queue.queued_ports())}")
+        self.app.update_flash_button()
+    
+    def on_timer(self, event):
+        if not self.queue:
+            return
+        now = time.time()
+        for port, pipeline in list(self.queue.pipelines.items()):
+            slot = self.slots.get(port)
+            latest = None
+            try:
+                while slot:
+                    item = slot.get_nowait()
+                    if isinstance(item, tuple) and len(item) == 2:
+                        latest = item
+            except queue.Empty:
+                pass
+            if latest:
+                self.set_unit_status(port, f"{int(latest[0])}% {latest[1]}")
+            if pipeline.start_time:
+                index = self.find_unit(port)
+                if index >= 0:
+                    self.unit_list.SetItem(index, 4, f"{now - pipeline.start_time:.0f}s")
+    
+    def on_close(self, event):
+        if self.queue and self.queue.is_running():
+            result = wx.MessageBox("仍有串口正在烧录，确定停止并关闭吗？", "确认",
+                                   wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
+            if result != wx.YES:
+                event.Veto()
+                return
+        self.shutdown()
+        self.Destroy()
+    
+    def shutdown(self):
+        """停止自动烧录和所有正在烧录的串口"""
+        if self.timer:
+            self.timer.Stop()
+            self.timer = None
+        if self.queue:
+            self.queue.on_event = None
+            self.queue.disarm(stop_running=True)
+        self.app.auto_flash_frame = None
+        if not self.app._closing:
+            self.app.update_flash_button()
 
 class BKLoaderApp(wx.Frame):
     """BK7236烧录工具主窗口"""
@@ -1074,17 +1502,23 @@ class BKLoaderApp(wx.Frame):
         icon.CopyFromBitmap(wx.Bitmap(icon_path, wx.BITMAP_TYPE_ANY))
         self.SetIcon(icon)
         
-        self.internal_executor = None
-        self.external_executor = None
-        self.output_queue = queue.Queue()
-        self.progress_queue = queue.Queue()
+        self.pipeline = None  # 单口烧录流水线(FlashPipeline)
+        self.output_queue = OutputPipe()
+        self.progress_queue = ProgressSlot()
         self.serial_monitor = None
         self._closing = False
-        self.current_flash_stage = None  # 当前烧录阶段: None, "internal", "external"
-        self.waiting_for_reboot = False  # 是否正在等待重启
-        
-        # 配置文件路径, 当前用户目录下
-        self.config_file = os.path.join(os.path.expanduser("~"), ".bk7236_flasher_config.json")
+        self.farm_frame = None  # 多口并行烧录窗口
+        self.auto_flash_frame = None  # 插入自动烧录窗口
+        
+        # 配置文件(上次配置和各配置方案), 当前用户目录下; 读取和保存都在后台线程
+        self.profile_store = get_profile_store()
+        self.config_file = self.profile_store.path
+        self.file_checker = FileChecker()
+        self.config_generation = 0  # 每次应用配置加1，丢弃过期的文件检查结果
+        # 完整日志目录
+        self.log_dir = os.path.join(os.path.expanduser("~"), "bk7236_flasher_logs")
+        # 烧录历史（各阶段耗时、写入速度），用于预测耗时和发现变慢的串口
+        self.history = FlashHistory(os.path.join(self.log_dir, "flash_history.jsonl"))
         
         self.init_ui()
         self.setup_timer()
@@ -1092,7 +1526,6 @@ class BKLoaderApp(wx.Frame):
         
         self.Bind(EVT_OUTPUT_UPDATE, self.on_output_update)
         self.Bind(EVT_PROGRESS_UPDATE, self.on_progress_update)
-        self.Bind(EVT_PROCESS_COMPLETED, self.on_process_completed)
         self.Bind(EVT_SERIAL_PORTS_UPDATE, self.on_serial_ports_update)
         
         self.Bind(wx.EVT_CLOSE, self.on_close)
@@ -1162,6 +1595,9 @@ class BKLoaderApp(wx.Frame):
         load_config_item = file_menu.Append(wx.ID_OPEN, '加载配置\tCtrl+O', '加载配置文件')
         save_config_item = file_menu.Append(wx.ID_SAVE, '保存配置\tCtrl+S', '保存配置文件')
         file_menu.AppendSeparator()
+        self.spill_log_item = file_menu.AppendCheckItem(wx.ID_ANY, '完整日志保存到文件', '在后台把全部输出日志写入日志目录')
+        self.Bind(wx.EVT_MENU, self.on_toggle_spill_log, self.spill_log_item)
+        file_menu.AppendSeparator()
         exit_item = file_menu.Append(wx.ID_EXIT, '退出\tCtrl+Q', '退出程序')
         self.Bind(wx.EVT_MENU, self.on_load_config, load_config_item)
         self.Bind(wx.EVT_MENU, self.on_save_config, save_config_item)
@@ -1170,6 +1606,23 @@ class BKLoaderApp(wx.Frame):
         
         # 工具菜单
         tool_menu = wx.Menu()
+        farm_item = tool_menu.Append(wx.ID_ANY, '多口并行烧录\tCtrl+M', '同时烧录多个串口')
+        self.Bind(wx.EVT_MENU, self.on_open_farm, farm_item)
+        auto_item = tool_menu.Append(wx.ID_ANY, '插入自动烧录\tCtrl+U', '插入匹配的串口后自动烧录')
+        self.Bind(wx.EVT_MENU, self.on_open_auto_flash, auto_item)
+        history_item = tool_menu.Append(wx.ID_ANY, '烧录统计', '查看各串口的烧录耗时和写入速度')
+        self.Bind(wx.EVT_MENU, self.on_show_history, history_item)
+        tool_menu.AppendSeparator()
+        switch_profile_item = tool_menu.Append(wx.ID_ANY, '切换配置方案\tCtrl+P', '切换到保存的配置方案')
+        self.Bind(wx.EVT_MENU, self.on_switch_profile, switch_profile_item)
+        save_profile_item = tool_menu.Append(wx.ID_ANY, '保存为配置方案...', '把当前配置保存为命名的配置方案')
+        self.Bind(wx.EVT_MENU, self.on_save_profile, save_profile_item)
+        delete_profile_item = tool_menu.Append(wx.ID_ANY, '删除配置方案...', '删除保存的配置方案')
+        self.Bind(wx.EVT_MENU, self.on_delete_profile, delete_profile_item)
+        tool_menu.AppendSeparator()
+        clear_diff_item = tool_menu.Append(wx.ID_ANY, '清除差分烧录记录', '清除所有设备的差分烧录记录，下次完整烧录')
+        self.Bind(wx.EVT_MENU, self.on_clear_diff_manifest, clear_diff_item)
+        tool_menu.AppendSeparator()
         about_item = tool_menu.Append(wx.ID_ABOUT, '关于', '关于此工具')
         self.Bind(wx.EVT_MENU, self.on_about, about_item)
         menubar.Append(tool_menu, '工具')
@@ -1177,49 +1630,42 @@ class BKLoaderApp(wx.Frame):
         self.SetMenuBar(menubar)
     
     def load_last_config(self):
-        """加载上次的配置"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-                
-                # 加载上次的配置
-                if 'last_config' in config_data:
-                    config = config_data['last_config']
-                    self.apply_config(config)
-                    
-                    # 检查文件是否存在
-                    files = config.get('files', [])
-                    valid_files = []
-                    for file_info in files:
-                        if 'path' in file_info and os.path.exists(file_info['path']):
-                            valid_files.append(file_info)
-                    
-                    if len(valid_files) < len(files):
-                        wx.MessageBox("部分文件不存在，已从配置中移除", "提示", wx.OK | wx.ICON_INFORMATION)
-                        config['files'] = valid_files
-                    
-        except Exception as e:
-            print(f"加载上次配置失败: {e}")
+        """加载上次的配置（在后台线程读取配置文件）"""
+        self.profile_store.load_async(call_after(self.on_last_config_loaded))
+    
+    def on_last_config_loaded(self, config):
+        if self._closing:
+            return
+        if self.profile_store.load_error:
+            self.output_panel.append_text(f"{self.profile_store.load_error}，已备份损坏的配置文件\n", wx.RED)
+        if config:
+            self.apply_config(config)
+        self.update_title()
     
     def save_last_config(self):
-        """保存当前配置到上次配置"""
+        """保存当前配置到上次配置（延迟在后台写入）"""
         try:
-            config = self.get_current_config()
-            
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-            else:
-                config_data = {}
-            
-            config_data['last_config'] = config
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
+            self.profile_store.set_last(self.get_current_config())
         except Exception as e:
             print(f"保存上次配置失败: {e}")
     
+    def check_config_files(self, files):
+        """在后台检查配置中的文件是否存在，不存在时在输出窗口提示"""
+        generation = self.config_generation
+        
+        def on_checked(missing):
+            # 检查期间又切换了配置时结果已过期
+            if self._closing or not missing or generation != self.config_generation:
+                return
+            self.output_panel.append_text("以下文件不存在，请检查配置:\n" + "".join(f"  {path}\n" for path in missing),
+                                          wx.Colour(255, 140, 0))
+        
+        self.file_checker.check_async(files, call_after(on_checked))
+    
+    def update_title(self):
+        name = self.profile_store.active()
+        self.SetTitle(f"BK7236 Flash烧录工具 - {name}" if name else "BK7236 Flash烧录工具")
+    
     def get_current_config(self):
         """获取当前配置"""
         return {
@@ -1235,9 +1681,70 @@ class BKLoaderApp(wx.Frame):
             
             if 'files' in config:
                 self.files_panel.set_files(config['files'])
+                self.config_generation += 1
+                self.check_config_files(config['files'])
         except Exception as e:
             wx.MessageBox(f"应用配置失败: {e}", "错误", wx.OK | wx.ICON_ERROR)
     
+    def on_switch_profile(self, event):
+        if self._closing:
+            return
+        names = self.profile_store.names()
+        if not names:
+            wx.MessageBox("还没有保存的配置方案，请先用\"保存为配置方案\"保存", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        if self.is_flashing():
+            wx.MessageBox("烧录过程中不能切换配置方案", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        dialog = wx.SingleChoiceDialog(self, "选择配置方案:", "切换配置方案", names)
+        active = self.profile_store.active()
+        if active in names:
+            dialog.SetSelection(names.index(active))
+        if dialog.ShowModal() == wx.ID_OK:
+            name = dialog.GetStringSelection()
+            config = self.profile_store.get(name)
+            if config:
+                self.apply_config(config)
+                self.profile_store.set_active(name)
+                self.save_last_config()
+                self.update_title()
+                self.output_panel.append_text(f"已切换到配置方案: {name}\n", wx.Colour(0, 0, 255))
+        dialog.Destroy()
+    
+    def on_save_profile(self, event):
+        if self._closing:
+            return
+        dialog = wx.TextEntryDialog(self, "配置方案名称:", "保存为配置方案", self.profile_store.active() or "")
+        if dialog.ShowModal() == wx.ID_OK:
+            name = dialog.GetValue().strip()
+            existing = self.profile_store.find(name) if name else None
+            overwrite = True
+            if existing and existing != self.profile_store.active():
+                overwrite = wx.MessageBox(f"配置方案 {existing} 已存在，是否覆盖？", "确认",
+                                          wx.YES_NO | wx.ICON_QUESTION) == wx.YES
+            if not name:
+                wx.MessageBox("方案名不能为空", "错误", wx.OK | wx.ICON_ERROR)
+            elif overwrite:
+                self.profile_store.put(name, self.get_current_config())
+                self.update_title()
+                self.output_panel.append_text(f"已保存配置方案: {name}\n", wx.Colour(0, 0, 255))
+        dialog.Destroy()
+    
+    def on_delete_profile(self, event):
+        if self._closing:
+            return
+        names = self.profile_store.names()
+        if not names:
+            wx.MessageBox("还没有保存的配置方案", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        dialog = wx.SingleChoiceDialog(self, "选择要删除的配置方案:", "删除配置方案", names)
+        if dialog.ShowModal() == wx.ID_OK:
+            name = dialog.GetStringSelection()
+            if wx.MessageBox(f"确定删除配置方案 {name}？", "确认", wx.YES_NO | wx.ICON_QUESTION) == wx.YES:
+                self.profile_store.delete(name)
+                self.update_title()
+        dialog.Destroy()
+    
     def on_close(self, event):
         if self._closing:
             event.Skip()
@@ -1245,44 +1752,43 @@ class BKLoaderApp(wx.Frame):
             
         self._closing = True
         
-        # 保存当前配置
+        # 保存当前配置，立即写入未保存的修改
         self.save_last_config()
+        self.profile_store.flush()
         
         # 停止定时器
         if hasattr(self, 'timer') and self.timer:
             self.timer.Stop()
             self.timer = None
         
+        # 停止日志落盘
+        self.output_panel.stop_spill()
+        
+        # 停止多口烧录
+        if self.farm_frame:
+            self.farm_frame.shutdown()
+        
+        # 停止自动烧录
+        if self.auto_flash_frame:
+            self.auto_flash_frame.shutdown()
+        
         # 停止串口监控线程
         if self.serial_monitor:
             self.serial_monitor.stop()
-            self.serial_monitor.join(timeout=0.5)
             self.serial_monitor = None
         
-        # 停止烧录线程
-        for executor in [self.internal_executor, self.external_executor]:
-            if executor and executor.is_alive():
-                executor.stop()
-                executor.join(timeout=0.5)
-                
-                if executor.is_alive():
-                    try:
-                        bk_pids = ProcessManager.find_processes_by_name("bk_loader")
-                        for pid in bk_pids:
-                            try:
-                                ProcessManager.kill_process_tree(pid)
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
+        # 停止单口烧录，并在期限内结束本程序启动的所有烧录进程
+        if self.pipeline:
+            self.pipeline.callback = None
+            if self.pipeline.is_running():
+                self.pipeline.stop()
+        get_supervisor().stop_all()
         
         # 清空队列
         try:
-            while not self.output_queue.empty():
-                self.output_queue.get_nowait()
-            while not self.progress_queue.empty():
-                self.progress_queue.get_nowait()
-        except:
+            self.output_queue.clear()
+            self.progress_queue.get_nowait()
+        except queue.Empty:
             pass
         
         self.Destroy()
@@ -1304,6 +1810,8 @@ class BKLoaderApp(wx.Frame):
     def on_serial_ports_update(self, event):
         if not self._closing:
             self.serial_panel.set_port_list(event.ports)
+            if self.farm_frame:
+                self.farm_frame.set_port_list(event.ports)
     
     def setup_timer(self):
         self.timer = wx.Timer(self)
@@ -1315,32 +1823,21 @@ class BKLoaderApp(wx.Frame):
             return
         
         try:
-            # 检查输出队列
-            while not self.output_queue.empty():
-                try:
-                    output = self.output_queue.get_nowait()
-                    wx.PostEvent(self, OutputUpdateEvent(text=output))
-                except queue.Empty:
-                    break
-                except wx.PyDeadObjectError:
-                    self.timer.Stop()
-                    return
+            # 每帧取一次输出，按颜色合并成一个事件
+            chunks = self.output_queue.drain()
+            if chunks:
+                wx.PostEvent(self, OutputUpdateEvent(chunks=chunks))
             
-            # 检查进度队列
-            while not self.progress_queue.empty():
-                try:
-                    item = self.progress_queue.get_nowait()
-                    if isinstance(item, tuple) and len(item) == 2:
-                        progress, status = item
-                        wx.PostEvent(self, ProgressUpdateEvent(value=progress, status=status))
-                    elif isinstance(item, tuple) and len(item) == 2 and isinstance(item[1], (str, int)):
-                        status, data = item
-                        wx.PostEvent(self, ProcessCompletedEvent(status=status, data=data))
-                except queue.Empty:
-                    break
-                except wx.PyDeadObjectError:
-                    self.timer.Stop()
-                    return
+            # 进度只取最新值
+            try:
+                item = self.progress_queue.get_nowait()
+                if isinstance(item, tuple) and len(item) == 2:
+                    progress, status = item
+                    wx.PostEvent(self, ProgressUpdateEvent(value=progress, status=status))
+            except queue.Empty:
+                pass
+        except wx.PyDeadObjectError:
+            self.timer.Stop()
         except Exception:
             pass
     
@@ -1349,23 +1846,7 @@ class BKLoaderApp(wx.Frame):
             return
             
         try:
-            text = event.text
-            
-            text_lower = text.lower()
-            if "error" in text_lower or "fail" in text_lower or "failed" in text_lower:
-                self.output_panel.append_text(text, wx.RED)
-            elif "success" in text_lower or "pass" in text_lower or "ok" in text_lower or "finished successfully" in text_lower:
-                self.output_panel.append_text(text, wx.Colour(0, 128, 0))
-            elif "warning" in text_lower or "stopped" in text_lower or "停止" in text_lower:
-                self.output_panel.append_text(text, wx.Colour(255, 140, 0))
-            elif "正在停止" in text_lower:
-                self.output_panel.append_text(text, wx.Colour(255, 87, 34))
-            elif "[内部]" in text:
-                self.output_panel.append_text(text, wx.Colour(0, 0, 180))  # 蓝色
-            elif "[外部]" in text:
-                self.output_panel.append_text(text, wx.Colour(180, 0, 180))  # 紫色
-            else:
-                self.output_panel.append_text(text)
+            self.output_panel.append_chunks(event.chunks)
         except wx.PyDeadObjectError:
             pass
     
@@ -1383,49 +1864,33 @@ class BKLoaderApp(wx.Frame):
         except wx.PyDeadObjectError:
             pass
     
-    def on_process_completed(self, event):
-        if self._closing:
-            return
-            
-        try:
-            if event.status == "completed" and event.data == 0:
-                self.progress_panel.update_progress(100, "烧录成功!")
-                self.output_panel.append_text("\n✓ 烧录成功!\n", wx.Colour(0, 128, 0))
-                
-            elif event.status == "failure":
-                self.progress_panel.update_progress(0, "烧录失败")
-                self.output_panel.append_text(f"\n✗ 烧录失败，请检查设备连接和配置\n", wx.RED)
-                
-            elif event.status == "partial":
-                self.progress_panel.update_progress(0, f"烧录未完成，进度: {event.data}%")
-                self.output_panel.append_text(f"\n⚠ 烧录未完成，进度: {event.data}%\n", wx.Colour(255, 140, 0))
-                
-            elif event.status == "stopped":
-                self.progress_panel.update_progress(0, "用户停止烧录")
-                self.output_panel.append_text("\n⚠ 烧录已被用户停止\n", wx.Colour(255, 140, 0))
-                
-            elif event.status == "error":
-                self.progress_panel.update_progress(0, f"烧录错误，返回码: {event.data}")
-                self.output_panel.append_text(f"\n✗ 烧录错误，返回码: {event.data}\n", wx.RED)
-            
-            self.reset_buttons()
-        except wx.PyDeadObjectError:
-            pass
-    
     def reset_buttons(self):
         """重置按钮状态到正常状态"""
         try:
             self.control_panel.flash_btn.Enable()
             self.control_panel.stop_btn.Disable()
-            self.current_flash_stage = None
-            self.waiting_for_reboot = False
             self.progress_panel.reset()
             
+            # 多口烧录进行中时保持配置区域禁用
+            if self.farm_frame and self.farm_frame.is_running():
+                self.control_panel.flash_btn.Disable()
+                return
+            
             # 启用配置区域
             self.enable_config_areas(True)
+            self.update_flash_button()
         except wx.PyDeadObjectError:
             pass
     
+    def update_flash_button(self):
+        """单口烧录、多口烧录和自动烧录共用串口，任一进行中时禁用烧录按钮"""
+        busy = (self.is_flashing()
+                or (self.farm_frame and self.farm_frame.is_running())
+                or (self.auto_flash_frame and self.auto_flash_frame.is_active()))
+        self.control_panel.flash_btn.Enable(not busy)
+        if self.farm_frame:
+            self.farm_frame.update_start_button()
+    
     def enable_config_areas(self, enabled):
         """启用或禁用配置区域"""
         try:
@@ -1436,96 +1901,9 @@ class BKLoaderApp(wx.Frame):
         except wx.PyDeadObjectError:
             pass
     
-    def build_internal_command(self):
-        """构建内部Flash烧录命令"""
-        if self._closing:
-            return None
-            
-        try:
-            serial_config = self.serial_panel.get_config()
-            internal_files = self.files_panel.get_internal_files()
-            
-            if not serial_config.get('port'):
-                wx.MessageBox("请选择串口", "错误", wx.OK | wx.ICON_ERROR)
-                return None
-            
-            if not internal_files:
-                return None  # 没有内部文件需要烧录
-            
-            cmd_parts = []
-            cmd = resource_path(os.path.join("res", "bk_loader.exe"))
-            cmd_parts.append(cmd)
-            cmd_parts.append("download")
-            
-            port_num = serial_config['port'].replace("COM", "")
-            cmd_parts.extend(["-p", port_num])
-            
-            cmd_parts.extend(["-b", serial_config['baudrate']])
-            
-            cmd_parts.extend(["--uart-type", serial_config['uart_type']])
-            
-            cmd_parts.append("--mainBin-multi")
-            
-            # 构建文件地址列表
-            file_parts = []
-            for file_info in internal_files:
-                file_parts.append(f"{file_info['path']}@{file_info['address']}")
-            
-            cmd_parts.append(",".join(file_parts))
-            
-            if serial_config['big_endian']:
-                cmd_parts.append("--big-endian")
-            
-            if serial_config['fast_link']:
-                cmd_parts.extend(["--fast-link", "1"])
-            
-            return " ".join(cmd_parts)
-        except wx.PyDeadObjectError:
-            return None
-    
-    def build_external_command(self):
-        """构建外部SPI Flash烧录命令"""
-        if self._closing:
-            return None
-            
-        try:
-            serial_config = self.serial_panel.get_config()
-            external_files = self.files_panel.get_external_files()
-            
-            if not serial_config.get('port'):
-                wx.MessageBox("请选择串口", "错误", wx.OK | wx.ICON_ERROR)
-                return None
-            
-            if not external_files:
-                return None  # 没有外部文件需要烧录
-            
-            cmd_parts = []
-            cmd = resource_path(os.path.join("res", "bk_loader_nor_ver.exe"))
-            cmd_parts.append(cmd)
-            cmd_parts.append("download")
-            
-            port_num = serial_config['port'].replace("COM", "")
-            cmd_parts.extend(["-p", port_num])
-            
-            cmd_parts.extend(["-b", serial_config['baudrate']])
-            
-            cmd_parts.extend(["--uart-type", serial_config['uart_type']])
-            
-            cmd_parts.append("--mainBin-multi")
-            
-            # 构建文件地址列表
-            for file_info in external_files:
-                cmd_parts.append(f"{file_info['path']}@{file_info['address']}")
-            
-            if serial_config['fast_link']:
-                cmd_parts.extend(["--fast-link", "1"])
-                
-            if serial_config.get('update_ver', False):
-                cmd_parts.extend(["--update-ver", "1"])
-            
-            return " ".join(cmd_parts)
-        except wx.PyDeadObjectError:
-            return None
+    def is_flashing(self):
+        """单口烧录流程是否进行中"""
+        return self.pipeline is not None and self.pipeline.is_running()
     
     def on_flash(self, event):
         if self._closing:
@@ -1539,6 +1917,17 @@ class BKLoaderApp(wx.Frame):
             wx.MessageBox("请至少勾选一个文件进行烧录", "错误", wx.OK | wx.ICON_ERROR)
             return
         
+        serial_config = self.serial_panel.get_config()
+        if not serial_config.get('port'):
+            wx.MessageBox("请选择串口", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        self.save_last_config()
+        
+        # 与多口烧录、自动烧录和命令行使用同一个流水线(预检合并、差分、波特率降档、等待就绪、外部Flash)
+        self.pipeline = FlashPipeline(serial_config, internal_files, external_files, self.output_queue,
+                                      callback=call_after(self.on_pipeline_completed),
+                                      progress_queue=self.progress_queue, history=self.history)
+        
         try:
             self.output_panel.clear()
             self.progress_panel.reset()
@@ -1556,147 +1945,55 @@ class BKLoaderApp(wx.Frame):
             self.output_panel.append_text(f"外部SPI Flash文件数: {len(external_files)}\n")
             self.output_panel.append_text("="*80 + "\n")
             
-            # 先烧录内部Flash
-            if internal_files:
-                self.current_flash_stage = "internal"
-                internal_cmd = self.build_internal_command()
-                if internal_cmd:
-                    self.internal_executor = CommandExecutor(
-                        internal_cmd, 
-                        self.output_queue, 
-                        self.progress_queue,
-                        tool_type="internal",
-                        progress_offset=0,
-                        callback=self.on_internal_completed  # 设置回调函数
-                    )
-                    self.internal_executor.start()
-                else:
-                    self.on_internal_completed(False, False)
-            else:
-                self.on_internal_completed(True, False)  # 没有内部文件，直接开始外部烧录
+            estimate = self.pipeline.estimate()
+            if estimate:
+                self.progress_panel.set_estimate(estimate)
+                self.output_panel.append_text(f"根据烧录历史预计耗时: {estimate:.1f}s\n", wx.Colour(0, 0, 255))
             
+            self.pipeline.start()
+            self.update_flash_button()
         except wx.PyDeadObjectError:
             pass
     
-    def on_internal_completed(self, success=True, user_stopped=False):
-        """内部Flash烧录完成回调"""
-        if user_stopped:
-            # 用户停止了烧录
-            self.output_panel.append_text("\n内部Flash烧录已停止\n", wx.Colour(255, 87, 34))
-            self.reset_buttons()
-            return
-        
-        if not success:
-            # 内部烧录失败，停止整个流程
-            self.output_panel.append_text("\n内部Flash烧录失败，停止外部Flash烧录\n", wx.RED)
-            self.reset_buttons()
+    def on_pipeline_completed(self, port, success, user_stopped):
+        """烧录流程结束回调（在UI线程中执行）"""
+        pipeline = self.pipeline
+        if self._closing or pipeline is None:
             return
         
-        # 检查是否有外部文件需要烧录
-        external_files = self.files_panel.get_external_files()
-        
-        if external_files:
-            # 如果有内部文件和外部文件都需要烧录，等待1秒让设备重启
-            internal_files = self.files_panel.get_internal_files()
-            if internal_files and external_files:
-                self.output_panel.append_text("\n" + "="*80 + "\n", wx.Colour(0, 0, 180))
-                self.output_panel.append_text("内部Flash烧录完成，等待1秒设备重启...\n", wx.Colour(0, 0, 180))
-                self.output_panel.append_text("="*80 + "\n", wx.Colour(0, 0, 180))
-                
-                self.waiting_for_reboot = True
-                wx.CallLater(1000, self.start_external_flash)
-            else:
-                # 只有外部文件，直接开始
-                self.start_external_flash()
-        else:
-            # 没有外部文件，完成整个流程
-            self.output_panel.append_text("\n✓ 所有烧录任务完成!\n", wx.Colour(0, 128, 0))
-            self.reset_buttons()
-    
-    def start_external_flash(self):
-        """开始外部Flash烧录"""
-        self.waiting_for_reboot = False
-        self.output_panel.append_text("\n" + "="*80 + "\n", wx.Colour(180, 0, 180))
-        self.output_panel.append_text("开始外部SPI Flash烧录...\n", wx.Colour(180, 0, 180))
-        self.output_panel.append_text("="*80 + "\n", wx.Colour(180, 0, 180))
-        
-        self.current_flash_stage = "external"
-        external_cmd = self.build_external_command()
-        if external_cmd:
-            self.external_executor = CommandExecutor(
-                external_cmd, 
-                self.output_queue, 
-                self.progress_queue,
-                tool_type="external",
-                progress_offset=0,
-                callback=self.on_external_completed  # 设置回调函数
-            )
-            self.external_executor.start()
-        else:
-            self.on_external_completed(False, False)
-    
-    def on_external_completed(self, success=True, user_stopped=False):
-        """外部SPI Flash烧录完成回调"""
-        if user_stopped:
-            # 用户停止了烧录
-            self.output_panel.append_text("\n外部SPI Flash烧录已停止\n", wx.Colour(255, 87, 34))
-            self.reset_buttons()
-            return
-        
-        if success:
-            self.output_panel.append_text("\n✓ 外部SPI Flash烧录完成!\n", wx.Colour(0, 128, 0))
-        else:
-            self.output_panel.append_text("\n✗ 外部SPI Flash烧录失败\n", wx.RED)
-        
-        self.output_panel.append_text("\n" + "="*80 + "\n")
-        self.output_panel.append_text("烧录流程结束\n")
-        self.output_panel.append_text("="*80 + "\n")
+        try:
+            # 丢弃流程结束前残留的进度，避免定时器用旧进度覆盖结果
+            self.progress_queue.get_nowait()
+        except queue.Empty:
+            pass
         
-        self.reset_buttons()
-    
-    def on_stop(self, event):
-        if self._closing:
-            return
-            
         try:
-            self.output_panel.append_text("\n正在停止烧录...\n", wx.Colour(255, 87, 34))
-            self.progress_panel.status_label.SetLabel("停止中...")
-            
-            # 停止当前烧录阶段的线程
-            if self.current_flash_stage == "internal" and self.internal_executor and self.internal_executor.is_alive():
-                self.internal_executor.stop()
-            elif self.current_flash_stage == "external" and self.external_executor and self.external_executor.is_alive():
-                self.external_executor.stop()
-            elif self.waiting_for_reboot:
-                # 如果在等待重启阶段，直接停止
-                self.output_panel.append_text("已取消等待重启\n", wx.Colour(255, 87, 34))
-                self.waiting_for_reboot = False
-                self.reset_buttons()
-            
-            # 强制停止所有相关进程
-            try:
-                bk_pids = ProcessManager.find_processes_by_name("bk_loader")
-                for pid in bk_pids:
-                    try:
-                        ProcessManager.kill_process_tree(pid)
-                        self.output_panel.append_text(f"已终止进程 PID: {pid}\n", wx.Colour(255, 87, 34))
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+            for warning in pipeline.slow_warnings():
+                self.output_panel.append_text(f"⚠ {warning}\n", wx.Colour(255, 140, 0))
             
-            wx.CallLater(1000, self.on_stop_completed)
+            self.reset_buttons()
+            if user_stopped:
+                stop_time = f"（结束烧录进程用时 {pipeline.stop_ms:.0f} ms）" if pipeline.stop_ms is not None else ""
+                self.progress_panel.update_progress(0, "已停止")
+                self.output_panel.append_text(f"\n⚠ 烧录已停止{stop_time}\n", wx.Colour(255, 87, 34))
+            elif success:
+                self.progress_panel.update_progress(100, "烧录成功!")
+                self.output_panel.append_text("\n✓ 所有烧录任务完成!\n", wx.Colour(0, 128, 0))
+            else:
+                self.progress_panel.update_progress(0, "烧录失败")
+                self.output_panel.append_text("\n✗ 烧录失败，请检查设备连接和配置\n", wx.RED)
         except wx.PyDeadObjectError:
             pass
     
-    def on_stop_completed(self):
-        if self._closing:
+    def on_stop(self, event):
+        if self._closing or not self.is_flashing():
             return
             
         try:
-            self.progress_panel.update_progress(0, "已停止")
-            self.output_panel.append_text("\n⚠ 已停止烧录\n", wx.Colour(255, 87, 34))
-            self.reset_buttons()
+            self.output_panel.append_text("\n正在停止烧录...\n", wx.Colour(255, 87, 34))
+            self.progress_panel.status_label.SetLabel("停止中...")
+            # 烧录进程在期限内结束后由流水线回调 on_pipeline_completed
+            self.pipeline.stop()
         except wx.PyDeadObjectError:
             pass
     
@@ -1743,12 +2040,8 @@ class BKLoaderApp(wx.Frame):
             try:
                 config = self.get_current_config()
                 
-                # 检查文件是否存在
-                files = config.get('files', [])
-                missing_files = []
-                for file_info in files:
-                    if 'path' in file_info and not os.path.exists(file_info['path']):
-                        missing_files.append(file_info['path'])
+                # 检查文件是否存在（使用后台检查缓存的结果）
+                missing_files = self.file_checker.missing(config.get('files', []))
                 
                 if missing_files:
                     response = wx.MessageBox(
@@ -1760,8 +2053,7 @@ class BKLoaderApp(wx.Frame):
                         dialog.Destroy()
                         return
                 
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, indent=2, ensure_ascii=False)
+                write_json_atomic(file_path, config)
                 
                 wx.MessageBox(f"配置保存成功!\n文件: {os.path.basename(file_path)}", "提示", wx.OK | wx.ICON_INFORMATION)
             except Exception as e:
@@ -1769,6 +2061,59 @@ class BKLoaderApp(wx.Frame):
         
         dialog.Destroy()
     
+    def on_toggle_spill_log(self, event):
+        if self.spill_log_item.IsChecked():
+            log_file = os.path.join(self.log_dir, time.strftime("flash_%Y%m%d_%H%M%S.log"))
+            self.output_panel.start_spill(log_file)
+            self.output_panel.append_text(f"完整日志保存到: {log_file}\n", wx.Colour(0, 0, 255))
+        else:
+            self.output_panel.stop_spill()
+            self.output_panel.append_text("已停止保存完整日志\n", wx.Colour(0, 0, 255))
+    
+    def on_open_farm(self, event):
+        if self._closing:
+            return
+        
+        if self.farm_frame:
+            self.farm_frame.Raise()
+            return
+        
+        self.farm_frame = FarmFrame(self)
+        self.farm_frame.Centre()
+        self.farm_frame.Show()
+    
+    def on_open_auto_flash(self, event):
+        if self._closing:
+            return
+        
+        if self.auto_flash_frame:
+            self.auto_flash_frame.Raise()
+            return
+        
+        self.auto_flash_frame = AutoFlashFrame(self)
+        self.auto_flash_frame.Centre()
+        self.auto_flash_frame.Show()
+    
+    def on_show_history(self, event):
+        report = self.history.report()
+        dialog = wx.Dialog(self, title="烧录统计", size=(900, 400), style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        text = wx.TextCtrl(dialog, value=report, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.HSCROLL)
+        text.SetFont(wx.Font(10, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(wx.StaticText(dialog, label=f"历史文件: {self.history.path}"), 0, wx.ALL, 5)
+        sizer.Add(text, 1, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(dialog.CreateButtonSizer(wx.OK), 0, wx.ALIGN_RIGHT | wx.ALL, 5)
+        dialog.SetSizer(sizer)
+        dialog.ShowModal()
+        dialog.Destroy()
+    
+    def on_clear_diff_manifest(self, event):
+        result = wx.MessageBox("确定清除所有设备的差分烧录记录吗？清除后下次烧录将完整烧录所有文件。", "确认",
+                               wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
+        if result == wx.YES:
+            get_manifest_store().clear()
+            self.output_panel.append_text("已清除差分烧录记录，下次完整烧录\n", wx.Colour(0, 0, 255))
+    
     def on_about(self, event):
         info = wx.adv.AboutDialogInfo()
         info.SetName("BK7236 Flash烧录工具")
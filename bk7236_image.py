@@ -0,0 +1,345 @@
+"""BK7236 烧录镜像预检 - 检查大小、校验和、地址范围和重叠，可选把相邻镜像合并为一个
+
+bk_loader 对 --mainBin-multi 中的每个文件分别擦除和写入，预检在启动烧录程序前完成:
+- 用mmap读取每个镜像的大小和CRC32，结果按 路径+修改时间 缓存，重复烧录不再读文件
+- 地址超出Flash范围、镜像之间重叠或共用同一个4K扇区时拒绝烧录
+- 可选把地址相邻的镜像合并成一个镜像，空隙填0xFF，减少擦除+写入的次数；合并镜像只覆盖各镜像自己的4K扇区，
+  末尾补0xFF到64K边界(会擦除镜像之后不在烧录列表中的数据，如NV、校准区)需要显式指定 pad
+- 合并生成的文件超过 RETENTION_DAYS 天未使用时自动删除(prune_dir)
+
+不依赖wx，界面程序和命令行共用。
+
+命令行查看预检结果:
+    python bk7236_image.py app.bin@0x0 res.bin@0x110000 --merge
+    python bk7236_image.py app.bin@0x0 res.bin@0x110000 --merge --align 64 --pad
+"""
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+SECTOR_SIZE = 0x1000  # 4K扇区，Flash擦除的最小单位
+BLOCK_SIZE = 0x10000  # 64K块
+MERGE_ALIGNS = (SECTOR_SIZE, BLOCK_SIZE)
+
+# 各阶段Flash容量
+FLASH_SIZES = {
+    "internal": 0x400000,  # 内部Flash 4MB
+    "external": 0x1000000,  # 外部SPI Flash 16MB
+}
+
+LOG_DIR = os.path.join(os.path.expanduser("~"), "bk7236_flasher_logs")
+DEFAULT_CACHE_FILE = os.path.join(LOG_DIR, "image_cache.json")
+DEFAULT_MERGE_DIR = os.path.join(LOG_DIR, "merged")
+RETENTION_DAYS = 7  # 生成的镜像(合并、差分)超过该天数未使用即删除
+PRUNE_INTERVAL = 3600  # 同一目录两次清理的最小间隔(秒)
+
+# 一个镜像的预检结果，address/size/end为整数，end不含
+ImageInfo = namedtuple('ImageInfo', ['path', 'address', 'size', 'end', 'crc32', 'file_info'])
+
+
+def align_up(value, align):
+    return (value + align - 1) // align * align
+
+
+def align_down(value, align):
+    return value // align * align
+
+
+def image_checksum(path):
+    """用mmap读取镜像，返回 (大小, CRC32)"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return size, zlib.crc32(data)
+
+
+class ChecksumCache:
+    """镜像大小和CRC32的缓存，按 绝对路径 索引，修改时间或大小变化时重新计算"""
+    def __init__(self, path=DEFAULT_CACHE_FILE):
+        self.path = path
+        self._entries = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._loaded or not self.path:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                self._entries = entries
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, path):
+        """返回 (大小, CRC32)，文件不存在时抛出OSError"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(path)
+            if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                self.hits += 1
+                return entry['size'], entry['crc32']
+
+        size, crc = image_checksum(path)
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = {'mtime_ns': stat.st_mtime_ns, 'size': size, 'crc32': crc}
+            self._dirty = True
+        return size, crc
+
+    def save(self):
+        """有新计算的校验和时写回缓存文件(先写临时文件再改名)"""
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            self._dirty = False
+            entries = dict(self._entries)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"保存镜像校验和缓存失败: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_checksum_cache():
+    """进程内共用的校验和缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ChecksumCache()
+        return _cache
+
+
+def describe_range(image):
+    return f"{os.path.basename(image.path)} [0x{image.address:X}-0x{image.end:X})"
+
+
+def preflight(files, stage="internal", flash_size=None, cache=None):
+    """检查烧录文件，返回 (按地址排序的ImageInfo列表, 错误信息列表, 提示信息列表)"""
+    cache = cache or get_checksum_cache()
+    flash_size = flash_size or FLASH_SIZES.get(stage)
+    images = []
+    errors = []
+    warnings = []
+
+    for file_info in files:
+        path = file_info.get('path', '')
+        try:
+            address = int(str(file_info.get('address', '')), 16)
+        except ValueError:
+            errors.append(f"地址格式错误: {file_info.get('address')} ({path})")
+            continue
+        if not os.path.isfile(path):
+            errors.append(f"文件不存在: {path}")
+            continue
+        try:
+            size, crc = cache.lookup(path)
+        except OSError as e:
+            errors.append(f"读取文件失败: {path} ({e})")
+            continue
+        if size == 0:
+            errors.append(f"文件为空: {path}")
+            continue
+        images.append(ImageInfo(path, address, size, address + size, crc, file_info))
+    cache.save()
+
+    images.sort(key=lambda image: image.address)
+    for image in images:
+        if image.address < 0 or (flash_size and image.end > flash_size):
+            errors.append(f"地址超出Flash范围(0x{flash_size:X}): {describe_range(image)}")
+        if image.address % SECTOR_SIZE:
+            warnings.append(f"地址未按4K对齐，所在扇区的原有数据会被擦除: {describe_range(image)}")
+
+    for prev, image in zip(images, images[1:]):
+        if image.address < prev.end:
+            errors.append(f"地址重叠: {describe_range(prev)} 与 {describe_range(image)}")
+        elif align_down(image.address, SECTOR_SIZE) < align_up(prev.end, SECTOR_SIZE):
+            # 后一个镜像擦除扇区时会擦掉前一个镜像的末尾
+            errors.append(f"共用4K扇区: {describe_range(prev)} 与 {describe_range(image)}")
+    return images, errors, warnings
+
+
+def group_adjacent(images):
+    """把地址相邻(按4K扇区衔接，中间没有未擦除的扇区)的镜像分组"""
+    groups = []
+    for image in images:
+        if groups and align_down(image.address, SECTOR_SIZE) <= align_up(groups[-1][-1].end, SECTOR_SIZE):
+            groups[-1].append(image)
+        else:
+            groups.append([image])
+    return groups
+
+
+_prune_times = {}  # 目录 -> 上次清理的时间
+_prune_lock = threading.Lock()
+
+
+def prune_dir(out_dir, max_age=RETENTION_DAYS * 86400, now=None):
+    """删除目录中超过max_age秒未使用(按修改时间)的文件，同一目录每 PRUNE_INTERVAL 秒最多清理一次，返回删除的文件数
+
+    复用已生成的文件时会更新修改时间(touch)，正在使用的文件不会被删除。
+    """
+    now = time.time() if now is None else now
+    with _prune_lock:
+        if now - _prune_times.get(out_dir, 0) < PRUNE_INTERVAL:
+            return 0
+        _prune_times[out_dir] = now
+    removed = 0
+    try:
+        entries = list(os.scandir(out_dir))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass  # 其他进程正在使用或已删除
+    return removed
+
+
+def touch(path):
+    """更新文件的修改时间，标记为最近使用"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def merge_end(group, align=SECTOR_SIZE, limit=None, pad=False):
+    """合并镜像的结束地址: 默认只补齐到最后一个镜像所在的4K扇区；pad为True时补齐到align(不超过limit)"""
+    end = align_up(group[-1].end, SECTOR_SIZE)
+    if pad:
+        padded = align_up(group[-1].end, align)
+        end = max(min(padded, limit), end) if limit else padded
+    return end
+
+
+def merge_group(group, align=SECTOR_SIZE, out_dir=DEFAULT_MERGE_DIR, limit=None, pad=False):
+    """把一组相邻镜像合并为一个文件，返回合并后的路径
+
+    起始地址向下按4K对齐，镜像之间填0xFF，末尾按 merge_end() 补0xFF。
+    输出文件名由各镜像的地址和CRC32决定，内容相同时直接复用已生成的文件。
+    """
+    start = align_down(group[0].address, SECTOR_SIZE)
+    end = merge_end(group, align, limit, pad)
+    key = hashlib.sha1(json.dumps([(image.address, image.size, image.crc32) for image in group]
+                                  + [start, end]).encode()).hexdigest()[:16]
+    out_path = os.path.join(out_dir, f"merged_{start:08x}_{key}.bin")
+    if os.path.isfile(out_path) and os.path.getsize(out_path) == end - start:
+        touch(out_path)
+        return out_path
+
+    prune_dir(out_dir)  # 只在生成新文件时清理，文件只会在这时增加
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as out:
+        offset = start
+        for image in group:
+            out.write(b'\xff' * (image.address - offset))
+            with open(image.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                out.write(data)
+            offset = image.end
+        out.write(b'\xff' * (end - offset))
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def prepare_files(files, stage="internal", merge=False, align=SECTOR_SIZE, flash_size=None, cache=None,
+                  out_dir=DEFAULT_MERGE_DIR, pad=False):
+    """预检并(可选)合并烧录文件，返回 (实际烧录的文件列表, 错误信息列表, 提示信息列表)
+
+    有错误时返回的文件列表为空。pad为True时合并镜像末尾补0xFF到align边界，该区域原有的数据会被擦除，
+    只适合镜像后面没有其他数据的分区布局；pad为False时align大于4K也只按4K扇区合并。
+    """
+    images, errors, warnings = preflight(files, stage, flash_size, cache)
+    if errors:
+        return [], errors, warnings
+
+    total_kb = sum(image.size for image in images) / 1024.0
+    if not merge:
+        warnings.append(f"预检通过: {len(images)} 个文件, {total_kb:.1f} KB")
+        return list(files), errors, warnings
+
+    if align > SECTOR_SIZE and not pad:
+        warnings.append(f"未允许末尾补0xFF，{align // 1024}K对齐改为按4K扇区合并，镜像之后的数据不受影响")
+        align = SECTOR_SIZE
+    flash_size = flash_size or FLASH_SIZES.get(stage)
+    groups = group_adjacent(images)
+    result = []
+    for i, group in enumerate(groups):
+        if len(group) == 1 and align == SECTOR_SIZE:
+            result.append(group[0].file_info)
+            continue
+        # 末尾补齐不能覆盖下一组镜像
+        limit = align_down(groups[i + 1][0].address, SECTOR_SIZE) if i + 1 < len(groups) else flash_size
+        own_end = align_up(group[-1].end, SECTOR_SIZE)
+        end = merge_end(group, align, limit, pad)
+        if end > own_end:
+            warnings.append(f"警告: 合并镜像末尾补0xFF，[0x{own_end:X}-0x{end:X}) 原有数据(如NV、校准区)会被擦除")
+        try:
+            path = merge_group(group, align, out_dir, limit, pad)
+        except OSError as e:
+            return [], [f"合并镜像失败: {e}"], warnings
+        merged = dict(group[0].file_info)
+        merged['path'] = path
+        merged['address'] = f"0x{align_down(group[0].address, SECTOR_SIZE):X}"
+        result.append(merged)
+    warnings.append(f"预检通过: {len(images)} 个文件, {total_kb:.1f} KB, 合并为 {len(result)} 个镜像"
+                    f"({align // 1024}K对齐)")
+    return result, errors, warnings
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="BK7236 烧录镜像预检")
+    parser.add_argument('files', nargs='+', help="镜像文件，格式为 路径@地址")
+    parser.add_argument('--stage', choices=sorted(FLASH_SIZES), default="internal", help="烧录阶段(决定Flash容量)")
+    parser.add_argument('--merge', action='store_true', help="合并相邻镜像")
+    parser.add_argument('--align', type=int, choices=[4, 64], default=4, help="合并镜像的对齐大小(KB)")
+    parser.add_argument('--pad', action='store_true', help="合并镜像末尾补0xFF到对齐边界(会擦除镜像之后的数据)")
+    args = parser.parse_args(argv)
+
+    files = []
+    for item in args.files:
+        path, sep, address = item.rpartition('@')
+        if not sep:
+            print(f"格式错误(应为 路径@地址): {item}")
+            return 2
+        files.append({'path': path, 'address': address})
+
+    result, errors, warnings = prepare_files(files, args.stage, args.merge, args.align * 1024, pad=args.pad)
+    for message in warnings:
+        print(message)
+    for message in errors:
+        print(f"错误: {message}")
+    for file_info in result:
+        print(f"{file_info['path']}@{file_info['address']}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""BK7236 差分烧录 - 按设备记录上次写入各地址范围的内容哈希，只烧录变化的部分
+
+每个镜像按64K边界切成若干子范围并计算SHA1，与该设备上次成功烧录时记录的清单比较，
+只把内容变化的子范围(相邻的合并成一段)切出来交给烧录程序；内容全部相同时跳过该阶段。
+设备按 serial_config 中的 device_id 区分，未指定时使用串口适配器的VID:PID和序列号(或hwid)，都没有时使用串口号。
+某一阶段烧录失败或被停止时，本次涉及的范围从清单中删除，下次会完整烧录这些范围。
+serial_config 中 full_flash 为True时忽略清单完整烧录(烧录成功后仍更新清单)。
+
+不依赖wx，界面程序和命令行共用。
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+from bk7236_image import BLOCK_SIZE, SECTOR_SIZE, LOG_DIR, align_down, align_up, prune_dir, touch
+from serial_hotplug import port_identity
+
+DEFAULT_MANIFEST_FILE = os.path.join(LOG_DIR, "flash_manifest.json")
+DEFAULT_DIFF_DIR = os.path.join(LOG_DIR, "diff")
+
+
+def device_key(serial_config):
+    """差分清单中的设备标识"""
+    if serial_config.get('device_id'):
+        return str(serial_config['device_id'])
+    return port_identity(serial_config.get('port', ''))
+
+
+def split_ranges(address, size, block=BLOCK_SIZE):
+    """把 [address, address+size) 按block边界切分，返回 [(起始, 结束)]"""
+    ranges = []
+    start = address
+    end = address + size
+    while start < end:
+        stop = min(align_down(start, block) + block, end)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def range_hashes(path, address, block=BLOCK_SIZE):
+    """用mmap读取镜像，返回 [(起始, 结束, SHA1)]"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return [(start, end, hashlib.sha1(data[start - address:end - address]).hexdigest())
+                    for start, end in split_ranges(address, size, block)]
+
+
+def _sectors_overlap(a_start, a_end, b_start, b_end):
+    """两个范围按4K扇区擦除时是否会互相影响"""
+    return (align_down(a_start, SECTOR_SIZE) < align_up(b_end, SECTOR_SIZE)
+            and align_down(b_start, SECTOR_SIZE) < align_up(a_end, SECTOR_SIZE))
+
+
+class ManifestStore:
+    """所有设备的烧录清单: {设备: {阶段: {"0x起始": {"end": 结束, "hash": SHA1}}}}"""
+    def __init__(self, path=DEFAULT_MANIFEST_FILE):
+        self.path = path
+        self._data = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._data = data
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"保存差分烧录清单失败: {e}")
+
+    def get(self, key, stage):
+        """返回 {起始地址: (结束地址, SHA1)}"""
+        with self._lock:
+            self._load()
+            entries = self._data.get(key, {}).get(stage, {})
+            return {int(start, 16): (entry['end'], entry['hash']) for start, entry in entries.items()}
+
+    def update(self, key, stage, written=(), invalidated=()):
+        """记录写入成功的范围 [(起始, 结束, SHA1)]，删除被擦写过或状态未知的范围 [(起始, 结束)]"""
+        touched = [(start, end) for start, end, _ in written] + list(invalidated)
+        with self._lock:
+            self._load()
+            entries = self._data.setdefault(key, {}).setdefault(stage, {})
+            for start_text in list(entries):
+                start, end = int(start_text, 16), entries[start_text]['end']
+                if any(_sectors_overlap(start, end, t_start, t_end) for t_start, t_end in touched):
+                    del entries[start_text]
+            for start, end, digest in written:
+                entries[f"0x{start:X}"] = {'end': end, 'hash': digest}
+            self._save()
+
+    def clear(self, key=None):
+        """清除一个设备(key为None时所有设备)的清单，下次完整烧录"""
+        with self._lock:
+            self._load()
+            if key is None:
+                self._data = {}
+            else:
+                self._data.pop(key, None)
+            self._save()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_manifest_store():
+    """进程内共用的烧录清单"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ManifestStore()
+        return _store
+
+
+class DiffPlan:
+    """一个阶段的差分烧录计划，烧录结束后调用 finish() 更新清单"""
+    def __init__(self, store, key, stage, written, changed):
+        self.store = store
+        self.key = key
+        self.stage = stage
+        self.written = written  # 本次烧录后设备上应有的内容 [(起始, 结束, SHA1)]
+        self.changed = changed  # 需要烧录的范围 [(起始, 结束)]
+        self._done = False
+
+    def is_empty(self):
+        return not self.changed
+
+    def finish(self, success):
+        """成功时记录全部范围的哈希；失败或停止时烧录过的范围状态未知，从清单删除"""
+        if self._done:
+            return
+        self._done = True
+        if success:
+            self.store.update(self.key, self.stage, written=self.written)
+        elif self.changed:
+            self.store.update(self.key, self.stage, invalidated=self.changed)
+
+
+def write_slice(path, address, start, end, out_dir=DEFAULT_DIFF_DIR):
+    """把镜像中 [start, end) 的内容切成单独的文件，内容相同时复用已生成的文件"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        content = data[start - address:end - address]
+    out_path = os.path.join(out_dir, f"diff_{start:08x}_{hashlib.sha1(content).hexdigest()[:16]}.bin")
+    if os.path.isfile(out_path) and os.path.getsize(out_path) == len(content):
+        touch(out_path)
+        return out_path
+    prune_dir(out_dir)  # 超过 RETENTION_DAYS 天未使用的差分文件
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as out:
+        out.write(content)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def plan_diff(serial_config, files, stage, store=None, out_dir=DEFAULT_DIFF_DIR):
+    """按差分清单筛选需要烧录的内容，返回 (烧录文件列表, DiffPlan或None, 提示信息列表)
+
+    serial_config 中 diff_flash 未开启时原样返回文件列表；files应为预检(合并)后的文件列表。
+    """
+    if not serial_config.get('diff_flash') or not files:
+        return files, None, []
+    store = store or get_manifest_store()
+    key = device_key(serial_config)
+    known = {} if serial_config.get('full_flash') else store.get(key, stage)
+
+    result = []
+    written = []
+    changed = []
+    total = 0
+    for file_info in files:
+        address = int(str(file_info['address']), 16)
+        hashes = range_hashes(file_info['path'], address)
+        written.extend(hashes)
+        total += sum(end - start for start, end, _ in hashes)
+        runs = []
+        for start, end, digest in hashes:
+            if known.get(start) == (end, digest):
+                continue
+            if runs and runs[-1][1] == start:
+                runs[-1][1] = end
+            else:
+                runs.append([start, end])
+        changed.extend((start, end) for start, end in runs)
+
+        if len(runs) == 1 and runs[0] == [hashes[0][0], hashes[-1][1]]:
+            result.append(file_info)  # 整个镜像都有变化
+            continue
+        for start, end in runs:
+            sliced = dict(file_info)
+            sliced['path'] = write_slice(file_info['path'], address, start, end, out_dir)
+            sliced['address'] = f"0x{start:X}"
+            result.append(sliced)
+
+    plan = DiffPlan(store, key, stage, written, changed)
+    changed_kb = sum(end - start for start, end in changed) / 1024.0
+    if plan.is_empty():
+        message = f"差分烧录({key}): 内容与上次烧录相同，跳过"
+    elif serial_config.get('full_flash'):
+        message = f"差分烧录({key}): 完整烧录 {changed_kb:.0f} KB"
+    else:
+        message = (f"差分烧录({key}): 需要烧录 {changed_kb:.0f}/{total / 1024.0:.0f} KB，"
+                   f"共 {len(result)} 段")
+    return result, plan, [message]
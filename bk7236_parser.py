@@ -0,0 +1,180 @@
+"""bk_loader 输出解析 - 失败检测、阶段识别和进度计算一次完成
+
+不依赖wx，烧录线程和性能测试脚本都可以直接导入。
+"""
+import re
+from collections import namedtuple
+
+# 一行输出的解析结果
+# failure: 失败行文本(未失败为None)  reason: 失败原因
+# progress/status: 进度和状态(无进度信息为None)  phase: 该行所属阶段(无阶段变化为None)
+# percent: 擦除/写入百分比行的百分比(其他行为None)
+LineInfo = namedtuple('LineInfo', ['failure', 'reason', 'progress', 'status', 'phase', 'percent'])
+
+EMPTY_INFO = LineInfo(None, None, None, None, None, None)
+
+# 失败关键字表: (关键字, 失败原因)，匹配不区分大小写
+FAILURE_PATTERNS = [
+    ('connect failed', "串口连接失败"),
+    ('Connect device fail!', "设备连接失败"),
+    ('Writing Flash Failed', "Flash写入失败"),
+    ('EraseFlash ->fail', "Flash擦除失败"),
+    ('WriteFlash ->fail', "Flash写入失败"),
+    ('Timeout', "操作超时"),
+    ('Not found', "未找到设备或文件"),
+    ('Error:', "错误信息"),
+    ('Failed', "失败"),
+    ('无效', "无效操作或参数"),
+    ('不支持', "不支持的操作"),
+]
+
+# 所有失败关键字合并为一个预编译的正则，每个关键字对应一个命名分组
+# 匹配前先把整行转成小写，比 re.IGNORECASE 快得多
+_FAILURE_RE = re.compile(
+    '|'.join(f'(?P<f{i}>{re.escape(pattern.lower())})' for i, (pattern, _) in enumerate(FAILURE_PATTERNS))
+)
+
+# 擦除/写入百分比是数量最多的行，单独走快速路径
+_PERCENT_RE = re.compile(r'(Erasing|Writing) Flash \.\.\. (\d+)%')
+_CHIP_RE = re.compile(r'Current Chip is : (\w+)')
+_FILE_LENGTH_RE = re.compile(r'file_length : 0x[0-9a-f]+ \((\d+) KB\)')
+_TOTAL_TIME_RE = re.compile(r'Total Test Time : (\d+\.\d+) s')
+
+
+def _parse_chip(text):
+    match = _CHIP_RE.search(text)
+    if match:
+        return (10, f"识别到芯片: {match.group(1)}")
+    return None
+
+def _parse_baudrate(text):
+    if "success" in text:
+        return (12, "波特率切换成功")
+    return None
+
+def _parse_file_length(text):
+    match = _FILE_LENGTH_RE.search(text)
+    if match:
+        return (25, f"文件大小: {match.group(1)} KB")
+    return None
+
+def _parse_total_time(text):
+    match = _TOTAL_TIME_RE.search(text)
+    if match:
+        return (100, f"烧录完成，耗时: {match.group(1)}秒")
+    return None
+
+
+# 阶段标记表，按顺序匹配: (关键字, 进度/状态或解析函数, 进入的阶段)
+# 解析函数返回None时继续匹配后面的条目
+MARKERS = (
+    ("connect success", (5, "串口连接成功"), "connect"),
+    ("Gotten Bus", (7, "获取设备总线"), "connect"),
+    ("Current Chip is", _parse_chip, "connect"),
+    ("Current baudrate", _parse_baudrate, "connect"),
+    ("Unprotecting Flash", (15, "解除Flash保护"), "unprotect"),
+    ("Unprotected Flash ->pass", (20, "Flash保护已解除"), "unprotect"),
+    ("file_length", _parse_file_length, None),
+    ("Begin EraseFlash", (30, "开始擦除Flash..."), "erase"),
+    ("Start 4K Erase", (35, "4K擦除..."), "erase"),
+    ("End 4K Erase", (40, "4K擦除完成"), "erase"),
+    ("Start 64K Erase", (45, "64K擦除..."), "erase"),
+    ("End 64K Erase", (60, "64K擦除完成"), "erase"),
+    ("EraseFlash ->pass", (65, "Flash擦除完成"), "write"),
+    ("Begin write to flash", (70, "开始写入Flash..."), "write"),
+    ("WriteFlash ->pass", (90, "Flash写入完成"), "protect"),
+    ("Enprotect pass", (95, "Flash保护完成"), "reboot"),
+    ("Boot_Reboot", (97, "设备重启中..."), "reboot"),
+    ("Writing Flash OK", (100, "烧录完成"), "finish"),
+    ("All Finished Successfully", (100, "烧录完成"), "finish"),
+    ("Total Test Time", _parse_total_time, "finish"),
+)
+
+# 需要记录到分类器上的信息: 关键字 -> (属性名, 正则, 类型)，供烧录统计使用
+CAPTURES = {
+    "Current Chip is": ('chip', _CHIP_RE, str),
+    "file_length": ('file_kb', _FILE_LENGTH_RE, int),
+}
+
+
+def classify_failure(text):
+    """检查一行输出是否包含失败信息，返回(失败行, 失败原因)，未失败返回None"""
+    match = _FAILURE_RE.search(text.lower())
+    if not match:
+        return None
+    reason = FAILURE_PATTERNS[int(match.lastgroup[1:])][1]
+    return (text.strip(), reason)
+
+
+class OutputClassifier:
+    """bk_loader输出分类器，每行只扫描一次即可得到失败、阶段和进度"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phase = "idle"
+        self.erase_percent = 0
+        self.write_percent = 0
+        self.chip = None
+        self.file_kb = None
+
+    def classify(self, text):
+        """解析一行输出，返回LineInfo"""
+        text = text.strip()
+        if not text:
+            return EMPTY_INFO
+
+        failure = classify_failure(text)
+        if failure:
+            return LineInfo(failure[0], failure[1], None, None, None, None)
+
+        # 快速路径: 擦除/写入百分比
+        if '%' in text:
+            match = _PERCENT_RE.search(text)
+            if match:
+                percent = int(match.group(2))
+                if match.group(1) == "Erasing":
+                    self.phase = "erase"
+                    self.erase_percent = percent
+                    return LineInfo(None, None, int(45 + percent * 0.15), f"擦除Flash: {percent}%", "erase", percent)
+                self.phase = "write"
+                self.write_percent = percent
+                return LineInfo(None, None, int(70 + percent * 0.20), f"写入Flash: {percent}%", "write", percent)
+
+        for needle, result, phase in MARKERS:
+            if needle not in text:
+                continue
+            if callable(result):
+                result = result(text)
+                if result is None:
+                    continue
+                capture = CAPTURES.get(needle)
+                if capture:
+                    attr, regex, convert = capture
+                    setattr(self, attr, convert(regex.search(text).group(1)))
+            if phase:
+                if phase != self.phase:
+                    if phase == "erase":
+                        self.erase_percent = 0
+                    elif phase == "write":
+                        self.write_percent = 0
+                self.phase = phase
+            return LineInfo(None, None, result[0], result[1], phase, None)
+
+        return EMPTY_INFO
+
+
+def classify_color(text):
+    """根据输出内容确定日志颜色类别，在烧录线程中计算，UI线程只做颜色映射"""
+    text_lower = text.lower()
+    if "error" in text_lower or "fail" in text_lower:
+        return "error"
+    if "success" in text_lower or "pass" in text_lower or "ok" in text_lower:
+        return "success"
+    if "warning" in text_lower or "stopped" in text_lower or "停止" in text_lower:
+        return "warning"
+    if "[内部]" in text:
+        return "internal"
+    if "[外部]" in text:
+        return "external"
+    return None
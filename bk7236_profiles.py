@@ -0,0 +1,309 @@
+"""BK7236 烧录配置方案 - 多个命名配置保存在一个文件中，原子写入、延迟后台保存
+
+配置文件(默认 ~/.bk7236_flasher_config.json)格式:
+    {"last_config": 上次使用的配置, "active_profile": 当前方案名, "profiles": {方案名: 配置}}
+与旧版只有 last_config 的文件兼容，bk7236_engine.load_profile 也能直接读取。
+
+- 所有方案读入内存后按名称索引，切换方案不再读文件
+- 修改后延迟 save_delay 秒在后台线程保存，连续修改只写一次；先写临时文件再改名，写到一半崩溃不会损坏原文件
+- 配置中的烧录文件是否存在由后台线程检查，结果按路径缓存，不阻塞界面(网络共享上的文件检查可能很慢)
+
+不依赖wx，界面程序和命令行共用。
+
+命令行查看方案:
+    python bk7236_profiles.py [配置文件]
+"""
+import copy
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+DEFAULT_STORE_FILE = os.path.join(os.path.expanduser("~"), ".bk7236_flasher_config.json")
+SAVE_DELAY = 1.0  # 修改后延迟保存的时间(秒)
+EXISTS_TTL = 30.0  # 文件存在检查结果的缓存时间(秒)
+
+
+def write_json_atomic(path, data, indent=2):
+    """先写同目录下的临时文件并刷到磁盘，再改名覆盖目标文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ProfileStore:
+    """命名烧录配置的存储，线程安全
+
+    读取在第一次访问时完成(可用 load_async 放到后台线程)，之后的查询和修改都只操作内存，
+    修改后由后台定时器保存。程序退出前调用 flush() 立即写入未保存的修改。
+    """
+    def __init__(self, path=DEFAULT_STORE_FILE, save_delay=SAVE_DELAY):
+        self.path = path
+        self.save_delay = save_delay
+        self._profiles = {}  # 方案名 -> 配置
+        self._keys = {}  # 小写方案名 -> 方案名，查找不区分大小写
+        self._extra = {}  # 文件中其他字段原样保留
+        self._last = None
+        self._active = None
+        self._loaded = False
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self.load_error = None
+
+    # ---------- 读取 ----------
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            # 文件损坏时保留一份副本，避免下次保存把它覆盖掉
+            self.load_error = f"读取配置文件失败: {e}"
+            try:
+                os.replace(self.path, f"{self.path}.{time.strftime('%Y%m%d_%H%M%S')}.bad")
+            except OSError:
+                pass
+            return
+        if not isinstance(data, dict):
+            return
+        profiles = data.pop('profiles', None)
+        if isinstance(profiles, dict):
+            for name, config in profiles.items():
+                if isinstance(config, dict):
+                    self._profiles[name] = config
+                    self._keys[name.lower()] = name
+        self._last = data.pop('last_config', None)
+        self._active = data.pop('active_profile', None)
+        self._extra = data
+
+    def load(self):
+        """读取配置文件(已读取时直接返回)，返回上次使用的配置"""
+        with self._lock:
+            self._load()
+            return copy.deepcopy(self._last)
+
+    def load_async(self, callback):
+        """在后台线程读取配置文件，完成后在该线程调用 callback(上次使用的配置)"""
+        def run():
+            try:
+                last = self.load()
+            except Exception as e:
+                print(f"加载配置失败: {e}")
+                last = None
+            callback(last)
+        threading.Thread(target=run, name="profile-load", daemon=True).start()
+
+    # ---------- 查询 ----------
+    def names(self):
+        with self._lock:
+            self._load()
+            return sorted(self._profiles, key=str.lower)
+
+    def find(self, name):
+        """按名称(不区分大小写)查找，返回保存时的方案名，不存在时返回None"""
+        with self._lock:
+            self._load()
+            return self._keys.get(name.strip().lower())
+
+    def get(self, name):
+        """返回方案配置的副本，不存在时返回None"""
+        with self._lock:
+            self._load()
+            key = self._keys.get(name.strip().lower())
+            return copy.deepcopy(self._profiles[key]) if key else None
+
+    def active(self):
+        with self._lock:
+            self._load()
+            return self._active if self._active in self._profiles else None
+
+    # ---------- 修改 ----------
+    def put(self, name, config):
+        """保存(覆盖同名)方案并设为当前方案"""
+        name = name.strip()
+        if not name:
+            raise ValueError("方案名不能为空")
+        with self._lock:
+            self._load()
+            old = self._keys.get(name.lower())
+            if old and old != name:
+                del self._profiles[old]
+            self._profiles[name] = copy.deepcopy(config)
+            self._keys[name.lower()] = name
+            self._active = name
+            self._schedule_save()
+
+    def delete(self, name):
+        with self._lock:
+            self._load()
+            key = self._keys.pop(name.strip().lower(), None)
+            if not key:
+                return False
+            del self._profiles[key]
+            if self._active == key:
+                self._active = None
+            self._schedule_save()
+            return True
+
+    def set_active(self, name):
+        with self._lock:
+            self._load()
+            self._active = self._keys.get(name.strip().lower()) if name else None
+            self._schedule_save()
+
+    def set_last(self, config):
+        """记录上次使用的配置，内容没有变化时不保存"""
+        with self._lock:
+            self._load()
+            if config == self._last:
+                return
+            self._last = copy.deepcopy(config)
+            self._schedule_save()
+
+    # ---------- 保存 ----------
+    def _schedule_save(self):
+        self._dirty = True
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.save_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _snapshot(self):
+        data = dict(self._extra)
+        if self._last is not None:
+            data['last_config'] = self._last
+        if self._active:
+            data['active_profile'] = self._active
+        data['profiles'] = self._profiles
+        return copy.deepcopy(data)
+
+    def flush(self):
+        """立即保存未写入的修改"""
+        with self._save_lock:
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                data = self._snapshot()
+            try:
+                write_json_atomic(self.path, data)
+            except OSError as e:
+                print(f"保存配置失败: {e}")
+                with self._lock:
+                    self._dirty = True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """进程内共用的配置方案存储"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore()
+        return _store
+
+
+class FileChecker:
+    """在后台线程检查烧录文件是否存在，结果按路径缓存 ttl 秒"""
+    def __init__(self, ttl=EXISTS_TTL):
+        self.ttl = ttl
+        self._cache = {}  # 路径 -> (是否存在, 检查时间)
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._thread = None
+
+    def cached(self, path):
+        """返回缓存的检查结果，未检查或已过期时返回None"""
+        with self._lock:
+            entry = self._cache.get(path)
+        if entry and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def exists(self, path):
+        """同步检查(优先使用缓存)"""
+        result = self.cached(path)
+        if result is None:
+            result = os.path.exists(path)
+            with self._lock:
+                self._cache[path] = (result, time.time())
+        return result
+
+    def missing(self, files):
+        """同步返回不存在的文件路径列表"""
+        return [file_info['path'] for file_info in files if file_info.get('path') and not self.exists(file_info['path'])]
+
+    def check_async(self, files, callback):
+        """在后台线程检查，完成后在该线程调用 callback(不存在的文件路径列表)"""
+        paths = [file_info['path'] for file_info in files if file_info.get('path')]
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="file-check", daemon=True)
+                self._thread.start()
+        self._requests.put((paths, callback))
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(path, None)
+
+    def _worker(self):
+        while True:
+            paths, callback = self._requests.get()
+            missing = [path for path in paths if not self.exists(path)]
+            try:
+                callback(missing)
+            except Exception as e:
+                print(f"文件检查回调错误: {e}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    store = ProfileStore(argv[0] if argv else DEFAULT_STORE_FILE)
+    last = store.load()
+    if store.load_error:
+        print(store.load_error)
+        return 1
+    active = store.active()
+    names = store.names()
+    print(f"配置文件: {store.path}")
+    print(f"上次配置: {'有' if last else '无'}，方案数: {len(names)}")
+    checker = FileChecker()
+    for name in names:
+        files = store.get(name).get('files', [])
+        missing = checker.missing(files)
+        mark = "*" if name == active else " "
+        print(f"{mark} {name:<30} 文件 {len(files):>2}" + (f"，缺少 {len(missing)}" if missing else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""BK7236 烧录统计 - 记录每次烧录各阶段耗时、文件大小、写入速度和结果
+
+每次内部/外部Flash烧录结束后追加一条JSON行到历史文件(只追加，不改写)，
+内存中按 串口+芯片 建立索引，用于预测烧录耗时(ETA)和发现变慢的串口、适配器或线缆。
+
+命令行查看统计:
+    python bk7236_telemetry.py [历史文件]
+"""
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+DEFAULT_HISTORY_FILE = os.path.join(os.path.expanduser("~"), "bk7236_flasher_logs", "flash_history.jsonl")
+
+# 最近几次写入速度低于基准的比例时判为变慢
+SLOW_RATIO = 0.8
+RECENT_COUNT = 3
+
+
+def files_kb(files):
+    """计算烧录文件总大小(KB)，文件不存在时忽略"""
+    total = 0
+    for file_info in files:
+        try:
+            total += os.path.getsize(file_info['path'])
+        except (OSError, KeyError):
+            pass
+    return round(total / 1024.0, 1)
+
+
+class PhaseTimer:
+    """记录一次烧录中每个阶段第一次出现的时间"""
+    def __init__(self):
+        self.start_time = time.time()
+        self.end_time = None
+        self.phase_times = {}
+
+    def mark(self, phase):
+        if phase not in self.phase_times:
+            self.phase_times[phase] = time.time()
+
+    def stop(self):
+        if self.end_time is None:
+            self.end_time = time.time()
+
+    def durations(self):
+        """返回 {阶段: 秒}，每个阶段持续到下一个阶段开始；handshake为启动到串口连接成功"""
+        end = self.end_time or time.time()
+        marks = sorted(self.phase_times.items(), key=lambda item: item[1])
+        result = {}
+        if marks:
+            result['handshake'] = round(marks[0][1] - self.start_time, 3)
+        for i, (phase, started) in enumerate(marks):
+            finished = marks[i + 1][1] if i + 1 < len(marks) else end
+            result[phase] = round(finished - started, 3)
+        return result
+
+
+def make_record(port, stage, timer, classifier, success, user_stopped, image_kb=None):
+    """根据阶段计时和输出解析结果生成一条烧录记录"""
+    timer.stop()
+    phases = timer.durations()
+    file_kb = classifier.file_kb or image_kb
+    write_time = phases.get('write')
+    if user_stopped:
+        result = "stopped"
+    else:
+        result = "pass" if success else "fail"
+    return {
+        'time': round(timer.start_time, 3),
+        'port': port or "",
+        'chip': classifier.chip or "unknown",
+        'stage': stage,
+        'file_kb': file_kb,
+        'image_kb': image_kb,
+        'result': result,
+        'total': round(timer.end_time - timer.start_time, 3),
+        'phases': phases,
+        'write_kbps': round(file_kb / write_time, 1) if file_kb and write_time else None,
+    }
+
+
+class FlashHistory:
+    """只追加的烧录历史，按 (串口, 芯片) 索引最近window条记录"""
+    def __init__(self, path=DEFAULT_HISTORY_FILE, window=50):
+        self.path = path
+        self.window = window
+        self._index = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 写到一半被中断的行
+                    self._index[(record.get('port', ""), record.get('chip', "unknown"))].append(record)
+        except OSError:
+            pass
+
+    def append(self, record):
+        with self._lock:
+            self._load()
+            self._index[(record['port'], record['chip'])].append(record)
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"写入烧录历史失败: {e}")
+
+    def records(self, port=None, chip=None, stage=None, passed_only=False):
+        with self._lock:
+            self._load()
+            groups = [list(records) for key, records in self._index.items()
+                      if (port is None or key[0] == port) and (chip is None or key[1] == chip)]
+        result = [record for records in groups for record in records
+                  if (stage is None or record.get('stage') == stage)
+                  and (not passed_only or record.get('result') == "pass")]
+        result.sort(key=lambda record: record.get('time', 0))
+        return result
+
+    def estimate(self, port, stage, image_kb=None, chip=None):
+        """预测一次烧录的耗时(秒)，没有历史时返回None
+
+        优先使用该串口的记录，新串口使用所有串口的记录；按文件大小比例缩放。
+        """
+        samples = self.records(port, chip, stage, passed_only=True)[-self.window:]
+        if not samples:
+            samples = self.records(None, chip, stage, passed_only=True)[-self.window:]
+        if not samples:
+            return None
+
+        totals = []
+        for record in samples:
+            if image_kb and record.get('image_kb'):
+                totals.append(record['total'] * image_kb / record['image_kb'])
+            else:
+                totals.append(record['total'])
+        return statistics.median(totals)
+
+    def slow_warning(self, record):
+        """检查刚完成的一次烧录所在串口最近的写入速度，变慢时返回提示文字"""
+        if not record or record.get('result') != "pass" or not record.get('write_kbps'):
+            return None
+        port, chip, stage = record['port'], record['chip'], record['stage']
+        own = [r['write_kbps'] for r in self.records(port, chip, stage, passed_only=True) if r.get('write_kbps')]
+        if len(own) < RECENT_COUNT:
+            return None
+        recent = statistics.median(own[-RECENT_COUNT:])
+
+        # 与其他串口同芯片的写入速度比较
+        others = [r['write_kbps'] for r in self.records(None, chip, stage, passed_only=True)
+                  if r['port'] != port and r.get('write_kbps')]
+        if others:
+            fleet = statistics.median(others)
+            if recent < fleet * SLOW_RATIO:
+                return (f"{port} 写入速度 {recent:.0f} KB/s，比其他串口({fleet:.0f} KB/s)慢"
+                        f"{(1 - recent / fleet) * 100:.0f}%，请检查串口适配器和线缆")
+
+        # 与该串口自己的历史比较
+        earlier = own[:-RECENT_COUNT]
+        if earlier:
+            baseline = statistics.median(earlier)
+            if recent < baseline * SLOW_RATIO:
+                return (f"{port} 写入速度 {recent:.0f} KB/s，比以往({baseline:.0f} KB/s)慢"
+                        f"{(1 - recent / baseline) * 100:.0f}%，请检查串口适配器、线缆或固件变更")
+        return None
+
+    def report(self):
+        """按 串口/芯片/阶段 汇总的统计文本"""
+        with self._lock:
+            self._load()
+            keys = sorted(self._index)
+        lines = [f"{'串口':<10} {'芯片':<10} {'阶段':<9} {'次数':>4} {'通过率':>6} {'耗时中位s':>9} {'写入KB/s':>9}  提示"]
+        for port, chip in keys:
+            for stage in ("internal", "external"):
+                records = self.records(port, chip, stage)
+                if not records:
+                    continue
+                passed = [r for r in records if r.get('result') == "pass"]
+                total = statistics.median(r['total'] for r in passed) if passed else 0
+                speeds = [r['write_kbps'] for r in passed if r.get('write_kbps')]
+                speed = statistics.median(speeds) if speeds else 0
+                warning = self.slow_warning(passed[-1]) if passed else None
+                lines.append(f"{port:<10} {chip:<10} {stage:<9} {len(records):>4} "
+                             f"{len(passed) * 100 / len(records):>5.0f}% {total:>9.1f} {speed:>9.0f}  {warning or ''}")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else DEFAULT_HISTORY_FILE
+    if not os.path.exists(path):
+        print(f"烧录历史文件不存在: {path}")
+        return 1
+    print(FlashHistory(path).report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""bk_loader 模拟器 - 在没有硬件和Windows的环境下替代 bk_loader.exe / bk_loader_nor_ver.exe
+
+接受与bk_loader相同的命令行参数(download -p ... -b ... --mainBin-multi ...)，
+按设定的速率输出合成的或录制的bk_loader日志，用于压测 CommandExecutor 等烧录流程。
+
+模拟参数可以用 --sim-* 选项给出，也可以用同名环境变量(BK_SIM_SIZE_KB 等)给出，
+这样不需要改动烧录引擎构建的命令。
+
+    python bk_loader_sim.py download -p 3 -b 2000000 --mainBin-multi a.bin@0x0 --sim-fail write
+"""
+import argparse
+import os
+import sys
+import time
+
+FAILURES = ("none", "connect", "erase", "write", "timeout", "baud")
+
+
+def synthetic_log(size_kb=4096, chip="BK7236", fail=None, fail_at=50):
+    """生成一次烧录的bk_loader输出，每4KB输出一行擦除/写入百分比
+
+    fail: None/"connect"/"erase"/"write"/"timeout"/"baud"，fail_at为失败时的百分比；
+    "baud" 模拟切换到过高的波特率后通信超时
+    """
+    steps = max(1, size_kb // 4)
+    lines = ["Open COM success"]
+    if fail == "connect":
+        return lines + ["connect failed", "Connect device fail!"]
+    if fail == "timeout":
+        return lines + ["Timeout"]
+    lines += [
+        "connect success",
+        "Gotten Bus",
+        f"Current Chip is : {chip}",
+    ]
+    if fail == "baud":
+        return lines + ["Timeout"]
+    lines += [
+        "Current baudrate 2000000 set success",
+        "Unprotecting Flash",
+        "Unprotected Flash ->pass",
+        f"file_length : 0x{size_kb * 1024:x} ({size_kb} KB)",
+        "Begin EraseFlash",
+        "Start 4K Erase",
+        "End 4K Erase",
+        "Start 64K Erase",
+    ]
+    for i in range(1, steps + 1):
+        percent = i * 100 // steps
+        if fail == "erase" and percent >= fail_at:
+            return lines + ["EraseFlash ->fail"]
+        lines.append(f"Erasing Flash ... {percent}%")
+    lines += ["End 64K Erase", "EraseFlash ->pass", "Begin write to flash"]
+    for i in range(1, steps + 1):
+        percent = i * 100 // steps
+        if fail == "write" and percent >= fail_at:
+            return lines + ["Writing Flash Failed", "WriteFlash ->fail"]
+        lines.append(f"Writing Flash ... {percent}%")
+    lines += [
+        "WriteFlash ->pass",
+        "Enprotect pass",
+        "Boot_Reboot",
+        "All Finished Successfully",
+        "Total Test Time : 12.345 s",
+    ]
+    return lines
+
+
+def load_replay(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return [line.rstrip("\r\n") for line in f]
+
+
+def env_default(name, default):
+    return os.environ.get("BK_SIM_" + name, default)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="bk_loader 模拟器")
+    parser.add_argument('command', nargs='?', default="download")
+    parser.add_argument('-p', dest='port')
+    parser.add_argument('-b', dest='baudrate')
+    parser.add_argument('--sim-size-kb', type=int, default=int(env_default("SIZE_KB", 1024)),
+                        help="合成日志对应的镜像大小(KB)")
+    parser.add_argument('--sim-line-rate', type=float, default=float(env_default("LINE_RATE", 0)),
+                        help="每秒输出行数，0表示不限速")
+    parser.add_argument('--sim-connect-delay', type=float, default=float(env_default("CONNECT_DELAY", 0)),
+                        help="输出第一行前的延时(秒)，模拟握手耗时")
+    parser.add_argument('--sim-fail', choices=FAILURES, default=env_default("FAIL", "none"),
+                        help="模拟的失败类型")
+    parser.add_argument('--sim-fail-at', type=int, default=int(env_default("FAIL_AT", 50)),
+                        help="擦除/写入失败时的百分比")
+    parser.add_argument('--sim-max-baud', type=int, default=int(env_default("MAX_BAUD", 0)),
+                        help="模拟串口适配器支持的最高波特率，-b 超过时握手后超时，0表示不限制")
+    parser.add_argument('--sim-exit-code', type=int, default=None,
+                        help="退出码，默认成功为0、失败为1")
+    parser.add_argument('--sim-replay', default=env_default("REPLAY", ""),
+                        help="回放录制的bk_loader日志文件")
+    parser.add_argument('--sim-stamp', action='store_true', default=env_default("STAMP", "") == "1",
+                        help="在百分比行末尾附加输出时间戳(@time.time())，用于测量延迟")
+    args, _ = parser.parse_known_args(argv)
+
+    fail = None if args.sim_fail == "none" else args.sim_fail
+    if args.sim_max_baud and args.baudrate and int(args.baudrate) > args.sim_max_baud:
+        fail = "baud"
+    if args.sim_replay:
+        lines = load_replay(args.sim_replay)
+    else:
+        lines = synthetic_log(args.sim_size_kb, fail=fail, fail_at=args.sim_fail_at)
+
+    if args.sim_connect_delay:
+        time.sleep(args.sim_connect_delay)
+
+    out = sys.stdout
+    interval = 1.0 / args.sim_line_rate if args.sim_line_rate > 0 else 0
+    start = time.perf_counter()
+    try:
+        for i, line in enumerate(lines):
+            if interval:
+                delay = start + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if args.sim_stamp and line.endswith('%'):
+                line = f"{line} @{time.time():.6f}"
+            out.write(line + "\n")
+            # 模拟bk_loader逐行输出
+            out.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        return 1
+
+    if args.sim_exit_code is not None:
+        return args.sim_exit_code
+    return 1 if fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
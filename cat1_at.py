@@ -0,0 +1,216 @@
+# coding=utf-8
+"""CAT1 模组AT指令客户端 - 按行解析串口数据，区分指令应答和主动上报(URC)，支持多条指令同时在途
+
+原来 get_cat1_imei / get_cat1_iccid 每次清空 recv_queue、发一条指令、recv_queue.get(timeout=1) 取一次数据，
+再按 "\\r\\n" 分割后取固定位置的行，应答分两次到达时就解析失败，三项信息要等三次。
+ATClient:
+- feed() 接收串口原始数据(可以是任意切分的片段)，拼成完整的行后处理
+- 最终结果码 OK / ERROR / +CME ERROR: n / +CMS ERROR: n 结束队首的指令
+- 队首指令的信息行(以该指令的 "+XXX:" 前缀开头，或不以 "+" 开头的纯文本如版本号)归入该指令的应答，
+  回显的指令行忽略；其他 "+XXX:" 行以及 RDY、RING 等视为URC，交给 on_urc 回调并放入 urcs 队列
+- 最多 max_in_flight 条指令同时在途，按发送顺序完成；其余排队，前面的指令完成后再发送
+- 每条指令从发出开始单独计时，超时后从在途列表中移除
+
+    client = ATClient(write)          # write(command) 发送一行指令(不含行尾)
+    serial_thread: client.feed(data)
+    imei, iccid, version = client.execute_all([("AT+GSN=1", "+GSN"), ("AT+ICCID", "+ICCID"), ("AT+CGMR", None)])
+
+注意: 前一条指令超时后迟到的应答会被当作下一条指令的应答，模组不支持连续接收指令时把 max_in_flight 设为1。
+
+不依赖wx。
+"""
+import collections
+import queue
+import threading
+import time
+
+DEFAULT_TIMEOUT = 1.0   # 单条指令的超时(秒)
+MAX_IN_FLIGHT = 3       # 同时在途的指令数
+MAX_LINE_LEN = 2048
+
+FINAL_OK = "OK"
+FINAL_ERRORS = ("ERROR", "+CME ERROR", "+CMS ERROR", "NO CARRIER")
+# 不以 "+" 开头的常见URC
+PLAIN_URCS = ("RDY", "RING", "POWERED DOWN", "NORMAL POWER DOWN", "Call Ready", "SMS Ready")
+
+
+def command_prefix(command):
+    """"AT+GSN=1" -> "+GSN"，"AT+CGMR" -> "+CGMR"，不是扩展指令时返回None"""
+    name = command[2:] if command[:2].upper() == "AT" else command
+    if not name.startswith("+"):
+        return None
+    for separator in "=?":
+        name = name.split(separator, 1)[0]
+    return name.upper()
+
+
+class ATResult:
+    """一条指令的执行结果: ok 为True时 lines 是信息行；否则 error 为错误结果码或 "timeout" """
+    def __init__(self, command, prefix, timeout):
+        self.command = command
+        self.prefix = prefix
+        self.timeout = timeout
+        self.lines = []
+        self.ok = False
+        self.error = None
+        self.final = None
+        self.sent_time = None
+        self.deadline = None
+        self.elapsed = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def value(self):
+        """第一行信息行去掉 "+XXX:" 前缀后的值，失败或没有信息行时返回 "" """
+        if not self.ok or not self.lines:
+            return ""
+        line = self.lines[0]
+        if self.prefix and line.upper().startswith(self.prefix + ":"):
+            line = line[len(self.prefix) + 1:]
+        return line.strip().strip('"')
+
+    def _finish(self, final, ok, error=None):
+        self.final = final
+        self.ok = ok
+        self.error = error
+        self.elapsed = time.time() - self.sent_time if self.sent_time else None
+        self._done.set()
+
+    def __repr__(self):
+        state = "OK" if self.ok else (self.error or "pending")
+        return "<ATResult %s %s %r>" % (self.command, state, self.lines)
+
+
+class ATClient:
+    def __init__(self, write, timeout=DEFAULT_TIMEOUT, max_in_flight=MAX_IN_FLIGHT, on_urc=None):
+        self.write = write
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.on_urc = on_urc
+        self.urcs = queue.Queue(256)
+        self.timeouts = 0
+        self._buffer = ""
+        self._pending = collections.deque()    # 等待发送的指令
+        self._in_flight = collections.deque()  # 已发送、等待结果码的指令，按发送顺序
+        self._lock = threading.RLock()
+
+    # ---------- 发送 ----------
+    def submit(self, command, prefix=None, timeout=None):
+        """提交一条指令，返回 ATResult(用 wait() 等待完成)；prefix 默认按指令名推断"""
+        result = ATResult(command, prefix if prefix is not None else command_prefix(command),
+                          self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._pending.append(result)
+            self._pump()
+        return result
+
+    def _pump(self):
+        while self._pending and len(self._in_flight) < self.max_in_flight:
+            result = self._pending.popleft()
+            result.sent_time = time.time()
+            result.deadline = result.sent_time + result.timeout
+            self._in_flight.append(result)
+            try:
+                self.write(result.command)
+            except Exception as e:
+                self._in_flight.remove(result)
+                result._finish(None, False, "write failed: %s" % e)
+
+    def wait(self, result):
+        """等待指令完成或超时，返回 result"""
+        while not result.done:
+            with self._lock:
+                deadline = result.deadline
+            if deadline is None:
+                result._done.wait(0.05)  # 还在排队
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0 or not result._done.wait(remaining):
+                self._expire(result)
+        return result
+
+    def execute(self, command, prefix=None, timeout=None):
+        return self.wait(self.submit(command, prefix, timeout))
+
+    def execute_all(self, commands, timeout=None):
+        """同时提交多条指令 [(指令, 前缀或None)]，全部完成后返回各自的 value()，失败的为 "" """
+        results = [self.submit(command, prefix, timeout) for command, prefix in commands]
+        return [self.wait(result).value() for result in results]
+
+    def _expire(self, result):
+        with self._lock:
+            if result.done:
+                return
+            if result in self._in_flight:
+                self._in_flight.remove(result)
+            elif result in self._pending:
+                self._pending.remove(result)
+            self.timeouts += 1
+            result._finish(None, False, "timeout")
+            self._pump()
+
+    def reset(self):
+        """串口重新打开时调用，未完成的指令按超时结束"""
+        with self._lock:
+            self._buffer = ""
+            for result in list(self._in_flight) + list(self._pending):
+                result._finish(None, False, "timeout")
+            self._in_flight.clear()
+            self._pending.clear()
+
+    # ---------- 接收 ----------
+    def feed(self, data):
+        """接收线程调用，data 为 bytes 或 str，可以是任意切分的片段"""
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('utf-8', 'replace')
+        with self._lock:
+            self._buffer += data
+            lines = self._buffer.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            self._buffer = lines.pop()
+            if len(self._buffer) > MAX_LINE_LEN:
+                lines.append(self._buffer)
+                self._buffer = ""
+            for line in lines:
+                self._handle_line(line.strip())
+            self._expire_overdue(time.time())
+
+    def _expire_overdue(self, now):
+        while self._in_flight and self._in_flight[0].deadline <= now:
+            self.timeouts += 1
+            self._in_flight.popleft()._finish(None, False, "timeout")
+        self._pump()
+
+    def _handle_line(self, line):
+        if not line:
+            return
+        head = self._in_flight[0] if self._in_flight else None
+        if head is not None:
+            if line == FINAL_OK:
+                self._in_flight.popleft()._finish(line, True)
+                self._pump()
+                return
+            if line.startswith(FINAL_ERRORS):
+                self._in_flight.popleft()._finish(line, False, line)
+                self._pump()
+                return
+            if line.upper() == head.command.upper():
+                return  # 回显
+            if head.prefix and line.upper().startswith(head.prefix + ":"):
+                head.lines.append(line)
+                return
+            if not line.startswith("+") and not line.startswith(PLAIN_URCS):
+                head.lines.append(line)
+                return
+        self._urc(line)
+
+    def _urc(self, line):
+        try:
+            self.urcs.put_nowait(line)
+        except queue.Full:
+            self.urcs.get_nowait()
+            self.urcs.put_nowait(line)
+        if self.on_urc:
+            self.on_urc(line)
@@ -0,0 +1,126 @@
+# coding=utf-8
+"""CAT1 模组串口帧解码 - 从字节流中按 F4 F5 帧头和长度字段切出完整的帧
+
+帧格式: F4 F5 | 长度(2字节, 大端, 长度字段之后的字节数, 含CRC) | 数据 | CRC16/Modbus(2字节, 大端)
+例如查询帧 F4 F5 00 0A 02 03 09 00 00 00 00 00 E3 08
+
+串口每次读到的数据可能只有半帧，也可能包含多帧或夹杂模组输出的文本日志，
+FrameDecoder 把读到的数据追加到同一个缓冲区，只输出完整且CRC正确的帧；
+帧头之前的数据作为文本输出，长度不合理或CRC错误时跳过一个字节重新查找帧头。
+
+不依赖wx。
+"""
+from collections import namedtuple
+
+from crc16_modbus import check_crc
+
+FRAME_HEADER = b'\xF4\xF5'
+HEADER_LEN = 4  # 帧头 + 长度字段
+MIN_BODY_LEN = 3  # 长度字段之后至少有1字节数据和2字节CRC
+MAX_BODY_LEN = 1024
+MAX_TEXT_LEN = 4096  # 没有换行的文本超过该长度时直接输出
+
+# 查询模组信息(软件版本、信号强度、IMEI、ICCID)的帧
+QUERY_FRAME = bytes.fromhex("F4 F5 00 0A 02 03 09 00 00 00 00 00 E3 08")
+QUERY_RESPONSE_MIN_LEN = 25
+
+# 查询应答解析结果，csq单位dBm
+ModuleInfo = namedtuple('ModuleInfo', ['version', 'csq', 'imei', 'iccid'])
+
+
+def format_hex(data):
+    """bytes -> "F4 F5 00 0A ..." """
+    return data.hex(' ').upper()
+
+
+def parse_query_response(frame):
+    """解析查询应答帧，不是查询应答时返回None，解码失败时抛出异常"""
+    if not (isinstance(frame, (bytes, bytearray)) and len(frame) >= QUERY_RESPONSE_MIN_LEN
+            and frame[:2] == FRAME_HEADER):
+        return None
+    return ModuleInfo(version=frame[8:23].decode('utf-8').strip('\x00'),
+                      csq=frame[24] - 256,
+                      imei=frame[25:40].decode('utf-8').strip('\x00'),
+                      iccid=frame[40:60].decode('utf-8').strip('\x00'))
+
+
+class FrameDecoder:
+    """F4 F5 帧的增量解码器
+
+    feed() 追加收到的数据并返回 [(类型, 数据)]，类型为 "frame"(完整帧 bytes) 或 "text"(帧之外的数据 bytes)。
+    文本按行输出，末尾不完整的一行留到下次；串口空闲时调用 flush() 取出剩余文本。
+    """
+    def __init__(self, max_body_len=MAX_BODY_LEN):
+        self.max_body_len = max_body_len
+        self.buffer = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.dropped = 0  # 重新同步时跳过的字节数
+
+    def reset(self):
+        self.buffer.clear()
+
+    def feed(self, data):
+        self.buffer += data
+        return self.decode()
+
+    def decode(self):
+        results = []
+        buf = self.buffer
+        start = 0
+        while True:
+            index = buf.find(FRAME_HEADER, start)
+            if index < 0:
+                # 没有帧头: 完整的文本行输出，最后一个字节可能是下一帧的 F4，保留
+                keep = len(buf) - 1 if buf[-1:] == FRAME_HEADER[:1] else len(buf)
+                end = buf.rfind(b'\n', start, keep) + 1
+                if keep - start > MAX_TEXT_LEN:
+                    end = keep
+                if end > start:
+                    results.append(("text", bytes(buf[start:end])))
+                    start = end
+                break
+            if index > start:
+                results.append(("text", bytes(buf[start:index])))
+                start = index
+            if len(buf) - index < HEADER_LEN:
+                break
+            body_len = int.from_bytes(buf[index + 2:index + 4], 'big')
+            if body_len < MIN_BODY_LEN or body_len > self.max_body_len:
+                # 长度不合理，不是真正的帧头
+                self.dropped += 1
+                start = index + 1
+                continue
+            end = index + HEADER_LEN + body_len
+            if len(buf) < end:
+                break  # 半帧，等待后续数据
+            frame = bytes(buf[index:end])
+            if not check_crc(frame, 'big'):
+                self.crc_errors += 1
+                self.dropped += 1
+                start = index + 1
+                continue
+            self.frames += 1
+            results.append(("frame", frame))
+            start = end
+        del buf[:start]
+        return results
+
+    def flush(self, drop_partial=False):
+        """取出缓冲区中剩余的文本(不含可能是帧开头的数据)
+
+        drop_partial 为True时丢弃缓冲区开头等不到后续数据的半帧(模组拔出或复位时会留下半帧)。
+        """
+        if self.buffer.startswith(FRAME_HEADER[:len(self.buffer)]) and self.buffer and drop_partial:
+            self.dropped += len(self.buffer)
+            self.buffer.clear()
+        if not self.buffer or self.buffer.startswith(FRAME_HEADER[:len(self.buffer)]):
+            return None
+        index = self.buffer.find(FRAME_HEADER)
+        if index < 0:
+            index = len(self.buffer) - 1 if self.buffer[-1:] == FRAME_HEADER[:1] else len(self.buffer)
+        if index == 0:
+            return None
+        text = bytes(self.buffer[:index])
+        del self.buffer[:index]
+        return text
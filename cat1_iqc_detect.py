@@ -7,10 +7,15 @@ import threading
 import time
 import queue
 import json
-import os
-import logging
-from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+import sqlite3
+from datetime import datetime, timedelta
+from cat1_log import Mylogger, HexBytes
+from cat1_frame import FrameDecoder, QUERY_FRAME, format_hex
+from cat1_stations import StationHub
+from cat1_results import ResultDB, STATUS_NEW
+from cat1_query import QueryEngine, EVENT_REMOVED, EVENT_RESPONSE
+from cat1_view import ViewModel, RowsModel, signal_level, FRAME_INTERVAL_MS, SIGNAL_NONE, SIGNAL_UNKNOWN, SIGNAL_WEAK
+from serial_capture import get_capture, capture_enabled
 
 
 def get_available_ports():
@@ -26,74 +31,12 @@ def show_available_ports(ports):
         logger.info("%-10s %-10s %-50s" % (item[0], item[1], item[2]))
 
 
-LOG_PATH = "logs"
-
-
-class Mylogger:
-    def __init__(self) -> None:
-        self.logger = None
-        self.init_log()
-
-    def init_log(self):
-        self.logger = logging.getLogger()
-        self.logger.setLevel(logging.DEBUG)
-
-        if not os.path.exists(LOG_PATH):
-            os.mkdir(LOG_PATH)
-
-        format_option = logging.Formatter(
-            '%(asctime)s.%(msecs)03d | %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S')
-
-        now = datetime.now().strftime("%Y-%m-%d")
-        file_name = f'AutoTest_{now}.log'
-
-        # 控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        console_handler.setFormatter(format_option)
-
-        # 文件处理器
-        file_handler = TimedRotatingFileHandler(filename=LOG_PATH + '/' + file_name,
-                                                when='MIDNIGHT',
-                                                interval=1,
-                                                backupCount=7,
-                                                encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(format_option)
-
-        # 统计日志处理器
-        count_file_name = 'count-' + time.strftime('%Y-%m-%d', time.localtime(time.time())) + '.log'
-        count_log_formatter = logging.Formatter('%(message)s')
-        count_handler = TimedRotatingFileHandler(filename='logs/' + count_file_name,
-                                                 when='MIDNIGHT',
-                                                 interval=1,
-                                                 backupCount=7,
-                                                 encoding='utf-8')
-        count_handler.setFormatter(count_log_formatter)
-        count_handler.setLevel(logging.FATAL)
-
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(count_handler)
-
-    def info(self, msg, *args, **kwargs):
-        self.logger.info(msg, *args, **kwargs)
-
-    def warn(self, msg, *args, **kwargs):
-        self.logger.warning(msg, *args, **kwargs)
-
-    def error(self, msg, *args, **kwargs):
-        self.logger.error(msg, *args, **kwargs)
-
-    def debug(self, msg, *args, **kwargs):
-        self.logger.debug(msg, *args, **kwargs)
-
-    def count_log(self, msg, *args, **kwargs):
-        self.logger.fatal(msg, *args, **kwargs)
+logger = Mylogger()
+capture = get_capture()
 
 
-logger = Mylogger()
+READ_TIMEOUT = 0.02      # 串口读超时(秒)，收到数据后最多再等这么久就交给解码器
+PARTIAL_TIMEOUT = 0.5    # 半帧超过该时间没有后续数据时丢弃
 
 
 class SerialCommunication:
@@ -101,10 +44,11 @@ class SerialCommunication:
         self.recv_queue = queue.Queue()
         self.ser_receive_flag = False
         self.recv_thread_enable = False
+        self.decoder = FrameDecoder()
 
     def open_serial_port(self, port_name, baud_rate):
         try:
-            ser = serial.Serial(port_name, baud_rate)
+            ser = serial.Serial(port_name, baud_rate, timeout=READ_TIMEOUT)
             logger.info("open serial port: %s success" % port_name)
             return ser
         except serial.serialutil.SerialException:
@@ -125,77 +69,78 @@ class SerialCommunication:
         if ser is None or not ser.isOpen():
             return
         logger.info(f"Sent: {data}")
+        payload = (data + "\n").encode("utf-8")
+        capture.tx(ser.port, payload)
         try:
-            ser.write((data + "\n").encode("utf-8"))
+            ser.write(payload)
         except serial.serialutil.SerialException:
             logger.error("WriteFile failed")
 
     def send_byte_data(self, ser, data):
         if len(data) == 0 or ser is None or not ser.isOpen():
             return
-        logger.info("send: [%d] %s" % ((len(data) + 1) / 3, data))
+        logger.info("send: [%d] %s", (len(data) + 1) // 3, data)
+        payload = bytes.fromhex(data)
+        capture.tx(ser.port, payload)
         try:
-            ser.write(bytearray.fromhex(data))
+            ser.write(payload)
         except serial.serialutil.SerialException:
             logger.error("WriteFile failed")
 
-    def crc16(self, data: bytes) -> int:
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc = crc >> 1
-        return crc
+    def put_recv(self, item):
+        if self.recv_queue.qsize() > 2048:
+            self.recv_queue.get_nowait()
+        self.recv_queue.put(item)
+
+    def handle_text(self, data):
+        try:
+            recv_data = data.decode('utf-8')
+            logger.info(recv_data)
+            self.put_recv(recv_data)
+        except UnicodeDecodeError:
+            logger.warn("UnicodeDecodeError")
+            logger.info(data)
 
     def receive_data(self):
+        """阻塞读串口(短超时)，按 F4 F5 帧头和长度字段切帧，半帧和多帧粘连都能正确处理"""
+        last_data_time = time.time()
         while self.recv_thread_enable:
-            time.sleep(0.3)
-            if not self.ser_receive_flag or self.ser is None or not self.ser.isOpen():
+            ser = self.ser
+            if not self.ser_receive_flag or ser is None or not ser.isOpen():
+                self.decoder.reset()
+                time.sleep(0.05)
                 continue
 
             try:
-                cnt = self.ser.in_waiting
-                if cnt <= 0:
-                    time.sleep(1)
-                    continue
-                received_data = self.ser.read(cnt)
-            except serial.serialutil.SerialException:
+                received_data = ser.read(ser.in_waiting or 1)
+            except (serial.serialutil.SerialException, TypeError, AttributeError, OSError):
                 logger.error("receive data SerialException")
                 self.ser_receive_flag = False
                 continue
 
-            if len(received_data) == 0:
+            now = time.time()
+            if not received_data:
+                # 串口空闲: 输出剩余的文本，丢弃等不到后续数据的半帧
+                text = self.decoder.flush(drop_partial=now - last_data_time > PARTIAL_TIMEOUT)
+                if text:
+                    self.handle_text(text)
                 continue
-
-            if self.recv_queue.qsize() > 2048:
-                self.recv_queue.get_nowait()
-
-            if received_data[0] == 0xF4:
-                hex_str = ""
-                recv_hex_str = received_data.hex()
-                for i in range(0, len(recv_hex_str), 2):
-                    hex_str += recv_hex_str[i:i + 2].upper() + " "
-                logger.info("recv: [%d] %s" % (len(hex_str) / 3, hex_str))
-
-                crc = self.crc16(received_data[0:cnt - 2]).to_bytes(2, 'big')
-                if not (crc[0] == received_data[cnt - 2] and crc[1] == received_data[cnt - 1]):
-                    logger.warn("crc check fail")
-
-                self.recv_queue.put(received_data)
-            else:
-                try:
-                    recv_data = received_data.decode('utf-8')
-                    logger.info(recv_data)
-                    self.recv_queue.put(recv_data)
-                except UnicodeDecodeError:
-                    logger.warn("UnicodeDecodeError")
-                    logger.info(received_data)
+            last_data_time = now
+            capture.rx(ser.port, received_data)
+
+            crc_errors = self.decoder.crc_errors
+            for kind, data in self.decoder.feed(received_data):
+                if kind == "frame":
+                    logger.info("recv: [%d] %s", len(data), HexBytes(data))
+                    self.put_recv(data)
+                else:
+                    self.handle_text(data)
+            if self.decoder.crc_errors != crc_errors:
+                logger.warn("crc check fail")
 
     def start_serial_threads(self, ser):
         self.ser = ser
+        self.decoder.reset()
         self.ser_receive_flag = True
         if not self.recv_thread_enable:
             self.recv_thread_enable = True
@@ -214,7 +159,285 @@ class SerialCommunication:
     def stop_serial_threads(self):
         self.ser_receive_flag = False
         self.ser = None
-        
+
+
+class MultiStationFrame(wx.Frame):
+    """多工位检测窗口: 勾选多个串口同时检测，所有串口由一个I/O线程处理"""
+    COLUMNS = [("工位", 50), ("串口", 110), ("状态", 80), ("软件版本号", 170), ("信号", 70),
+               ("IMEI号码", 150), ("ICCID号码", 190), ("结果", 60)]
+
+    def __init__(self, main_frame):
+        super(MultiStationFrame, self).__init__(main_frame, title="多工位检测", size=(960, 560))
+        self.main_frame = main_frame
+        self.hub = None
+        self.rows = {}  # 串口 -> 行号
+        self.rows_model = RowsModel()  # I/O线程写入各工位快照，定时器每帧刷新一次有变化的行
+        self.row_colours = {"PASS": wx.Colour(220, 255, 220), "FAIL": wx.Colour(255, 220, 220), "": wx.WHITE}
+        self.InitUI()
+        self.update_port_list()
+        self.render_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.render_rows, self.render_timer)
+        self.render_timer.Start(FRAME_INTERVAL_MS)
+
+    def InitUI(self):
+        panel = wx.Panel(self)
+        panel.SetBackgroundColour('#F5F7FA')
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+
+        top_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        port_box = wx.StaticBoxSizer(wx.VERTICAL, panel, "串口")
+        self.port_list = wx.CheckListBox(panel, size=(260, 140))
+        port_box.Add(self.port_list, 1, wx.EXPAND | wx.ALL, 5)
+        btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.btn_refresh = wx.Button(panel, label="刷新")
+        self.btn_select_all = wx.Button(panel, label="全选")
+        btn_sizer.Add(self.btn_refresh, 0, wx.RIGHT, 5)
+        btn_sizer.Add(self.btn_select_all, 0)
+        port_box.Add(btn_sizer, 0, wx.ALL, 5)
+        top_sizer.Add(port_box, 0, wx.EXPAND | wx.ALL, 5)
+
+        right_sizer = wx.BoxSizer(wx.VERTICAL)
+        self.label_target = wx.StaticText(panel, label="")
+        self.label_target.SetFont(wx.Font(12, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        self.label_target.SetForegroundColour('#1E3A8A')
+        right_sizer.Add(self.label_target, 0, wx.ALL, 10)
+        self.label_counts = wx.StaticText(panel, label="成功: 0  失败: 0")
+        self.label_counts.SetFont(wx.Font(16, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        right_sizer.Add(self.label_counts, 0, wx.ALL, 10)
+        self.btn_start = wx.Button(panel, label="开始检测", size=(120, 40))
+        self.btn_start.SetFont(wx.Font(12, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        self.btn_start.SetForegroundColour('#3CB371')
+        right_sizer.Add(self.btn_start, 0, wx.ALL, 10)
+        top_sizer.Add(right_sizer, 1, wx.EXPAND)
+        main_sizer.Add(top_sizer, 0, wx.EXPAND | wx.ALL, 5)
+
+        self.grid = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        self.grid.SetFont(wx.Font(11, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        for i, (name, width) in enumerate(self.COLUMNS):
+            self.grid.InsertColumn(i, name, width=width)
+        main_sizer.Add(self.grid, 1, wx.EXPAND | wx.ALL, 5)
+
+        panel.SetSizer(main_sizer)
+
+        self.statusbar = self.CreateStatusBar(1)
+        self.statusbar.SetBackgroundColour('#E2E8F0')
+        self.statusbar.SetStatusText("未开始")
+
+        self.btn_refresh.Bind(wx.EVT_BUTTON, lambda event: self.update_port_list())
+        self.btn_select_all.Bind(wx.EVT_BUTTON, self.on_select_all)
+        self.btn_start.Bind(wx.EVT_BUTTON, self.on_start_stop)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+    def update_port_list(self):
+        checked = set(self.checked_ports()) or set(self.main_frame.saved_stations)
+        self.port_list.Clear()
+        for port in get_available_ports():
+            # ASR开头的是模组自身的USB口，单工位检测正在使用的串口也不列出
+            if port[2].startswith("ASR") or (self.main_frame.ser and port[1] == self.main_frame.com_name):
+                continue
+            index = self.port_list.Append(port[1] + "  " + port[2])
+            if port[1] in checked:
+                self.port_list.Check(index)
+        self.label_target.SetLabel("目标版本: %s" % self.main_frame.target_version)
+
+    def checked_ports(self):
+        return [self.port_list.GetString(i).split(' ')[0] for i in self.port_list.GetCheckedItems()]
+
+    def on_select_all(self, event):
+        for i in range(self.port_list.GetCount()):
+            self.port_list.Check(i)
+
+    def on_start_stop(self, event):
+        if self.hub:
+            self.stop()
+            return
+
+        ports = self.checked_ports()
+        if not ports:
+            wx.MessageBox("请至少勾选一个串口", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        self.main_frame.saved_stations = ports
+        self.main_frame.save_config()
+
+        self.grid.DeleteAllItems()
+        self.rows = {}
+        self.rows_model.reset()
+        for index, port in enumerate(ports):
+            row = self.grid.InsertItem(index, str(index + 1))
+            self.grid.SetItem(row, 1, port)
+            self.rows[port] = row
+
+        self.hub = StationHub(self.main_frame.target_version, self.main_frame.baud_rate,
+                              on_update=lambda snapshot: self.rows_model.update(snapshot['port'], snapshot),
+                              on_result=self.on_result, on_log=self.on_log, record=self.record,
+                              capture=capture)
+        for port in ports:
+            self.hub.add_port(port)
+        self.hub.start()
+        logger.info("多工位检测开始: %s" % ", ".join(ports))
+
+        self.btn_start.SetLabelText("停止检测")
+        self.btn_start.SetForegroundColour(wx.RED)
+        for ctrl in (self.port_list, self.btn_refresh, self.btn_select_all):
+            ctrl.Enable(False)
+        self.statusbar.SetStatusText("检测中: %d 个工位" % len(ports))
+
+    def stop(self):
+        if not self.hub:
+            return
+        self.hub.stop()
+        self.hub = None
+        logger.info("多工位检测停止")
+        self.btn_start.SetLabelText("开始检测")
+        self.btn_start.SetForegroundColour('#3CB371')
+        for ctrl in (self.port_list, self.btn_refresh, self.btn_select_all):
+            ctrl.Enable(True)
+        self.statusbar.SetStatusText("已停止")
+
+    def on_log(self, level, message):
+        getattr(logger, level)(message)
+
+    def record(self, port, info, passed):
+        """在I/O线程中调用，写入结果库，返回是否首次检测"""
+        status, _ = self.main_frame.results.record(info.imei, info.iccid, info.version,
+                                                   self.main_frame.target_version, info.csq, port)
+        return status == STATUS_NEW
+
+    def on_result(self, snapshot, passed):
+        """在I/O线程中调用，写统计日志"""
+        if snapshot['retest']:
+            logger.info("[%s] 重复检测，IMEI: %s，不重复统计" % (snapshot['port'], snapshot['imei']))
+            return
+        result = "PASS" if passed else "FAIL"
+        logger.count_log(f"{snapshot['imei']}   {result}   Target:{self.main_frame.target_version}   "
+                         f"Actual:{snapshot['version']}   Port:{snapshot['port']}")
+
+    def render_rows(self, event=None):
+        """定时器调用: 只刷新快照有变化的行，统计数有变化时才更新"""
+        changes = self.rows_model.take_changes()
+        if not changes or not self.hub:
+            return
+        for snapshot in changes.values():
+            self.update_row(snapshot)
+        counts = "成功: %d  失败: %d" % self.hub.counts()
+        if self.label_counts.GetLabel() != counts:
+            self.label_counts.SetLabel(counts)
+
+    def update_row(self, snapshot):
+        row = self.rows.get(snapshot['port'])
+        if row is None:
+            return
+        csq = "" if snapshot['csq'] is None else "%d dBm" % snapshot['csq']
+        result = snapshot['result'] + ("(重复)" if snapshot['retest'] else "")
+        values = [snapshot['state'], snapshot['version'], csq, snapshot['imei'], snapshot['iccid'], result]
+        for column, value in enumerate(values, start=2):
+            if self.grid.GetItemText(row, column) != value:
+                self.grid.SetItem(row, column, value)
+        colour = self.row_colours.get(snapshot['result'], wx.WHITE)
+        if self.grid.GetItemBackgroundColour(row) != colour:
+            self.grid.SetItemBackgroundColour(row, colour)
+
+    def on_close(self, event):
+        self.render_timer.Stop()
+        self.stop()
+        self.main_frame.station_frame = None
+        self.Destroy()
+
+
+class ResultsFrame(wx.Frame):
+    """检测记录: 按IMEI查询、班次汇总、导出CSV"""
+    EXPORT_RANGES = [("今天", 0), ("最近7天", 7), ("最近30天", 30), ("全部", None)]
+
+    def __init__(self, main_frame):
+        super(ResultsFrame, self).__init__(main_frame, title="检测记录", size=(820, 560))
+        self.main_frame = main_frame
+        self.results = main_frame.results
+
+        panel = wx.Panel(self)
+        panel.SetBackgroundColour('#F5F7FA')
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+
+        search_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        search_sizer.Add(wx.StaticText(panel, label="IMEI："), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        self.text_imei = wx.TextCtrl(panel, size=(200, -1), style=wx.TE_PROCESS_ENTER)
+        search_sizer.Add(self.text_imei, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        self.btn_lookup = wx.Button(panel, label="查询")
+        search_sizer.Add(self.btn_lookup, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 20)
+        self.choice_range = wx.Choice(panel, choices=[name for name, _ in self.EXPORT_RANGES])
+        self.choice_range.SetSelection(0)
+        search_sizer.Add(self.choice_range, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        self.btn_export = wx.Button(panel, label="导出CSV")
+        search_sizer.Add(self.btn_export, 0, wx.ALIGN_CENTER_VERTICAL)
+        main_sizer.Add(search_sizer, 0, wx.ALL, 10)
+
+        self.history_list = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for i, (name, width) in enumerate([("时间", 150), ("结果", 60), ("软件版本号", 160), ("目标版本", 160),
+                                            ("信号", 60), ("ICCID号码", 180), ("工位", 80)]):
+            self.history_list.InsertColumn(i, name, width=width)
+        main_sizer.Add(self.history_list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+
+        main_sizer.Add(wx.StaticText(panel, label="班次汇总"), 0, wx.ALL, 10)
+        self.shift_list = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for i, (name, width) in enumerate([("日期", 110), ("班次", 60), ("PASS", 80), ("FAIL", 80), ("重复检测", 80)]):
+            self.shift_list.InsertColumn(i, name, width=width)
+        main_sizer.Add(self.shift_list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        panel.SetSizer(main_sizer)
+
+        self.btn_lookup.Bind(wx.EVT_BUTTON, self.on_lookup)
+        self.text_imei.Bind(wx.EVT_TEXT_ENTER, self.on_lookup)
+        self.btn_export.Bind(wx.EVT_BUTTON, self.on_export)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        self.update_shift_list()
+
+    def update_shift_list(self):
+        self.shift_list.DeleteAllItems()
+        since = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        for row, values in enumerate(self.results.shift_summary(since)):
+            self.shift_list.InsertItem(row, values[0])
+            for column, value in enumerate(values[1:], start=1):
+                self.shift_list.SetItem(row, column, str(value))
+
+    def on_lookup(self, event):
+        imei = self.text_imei.GetValue().strip()
+        self.history_list.DeleteAllItems()
+        if not imei:
+            return
+        record = self.results.lookup(imei)
+        if not record:
+            wx.MessageBox("没有该模块的检测记录: %s" % imei, "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        for row, test in enumerate(record['history']):
+            self.history_list.InsertItem(row, datetime.fromtimestamp(test['time']).strftime("%Y-%m-%d %H:%M:%S"))
+            values = [test['result'], test['version'], test['target_version'], "%s dBm" % test['csq'],
+                      test['iccid'], test['station']]
+            for column, value in enumerate(values, start=1):
+                self.history_list.SetItem(row, column, str(value))
+            self.history_list.SetItemBackgroundColour(
+                row, wx.Colour(220, 255, 220) if test['result'] == "PASS" else wx.Colour(255, 220, 220))
+
+    def on_export(self, event):
+        name, days = self.EXPORT_RANGES[self.choice_range.GetSelection()]
+        since = None
+        if days is not None:
+            since = time.mktime((datetime.now() - timedelta(days=days)).replace(
+                hour=0, minute=0, second=0, microsecond=0).timetuple())
+        dialog = wx.FileDialog(self, "导出检测记录", defaultFile="iqc_%s.csv" % datetime.now().strftime("%Y%m%d"),
+                               wildcard="CSV文件 (*.csv)|*.csv", style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dialog.ShowModal() == wx.ID_OK:
+            path = dialog.GetPath()
+            try:
+                count = self.results.export_csv(path, since)
+                wx.MessageBox("已导出%s的 %d 条记录" % (name, count), "成功", wx.OK | wx.ICON_INFORMATION)
+            except (OSError, sqlite3.Error) as e:
+                wx.MessageBox("导出失败: %s" % e, "错误", wx.OK | wx.ICON_ERROR)
+        dialog.Destroy()
+
+    def on_close(self, event):
+        self.main_frame.results_frame = None
+        self.Destroy()
+
+
 class MyFrame(wx.Frame):
     def __init__(self, *args, **kw):
         super(MyFrame, self).__init__(*args, **kw)
@@ -225,7 +448,6 @@ class MyFrame(wx.Frame):
         self.cat1_iccid = ""
         self.target_version = ""
         self.saved_serial = ""
-        self.last_imei = ""
 
         self.auto_detect_flag = False
         self.task_run_flag = False
@@ -236,6 +458,15 @@ class MyFrame(wx.Frame):
 
         self.success_count = 0
         self.fail_count = 0
+        self.saved_stations = []    # 多工位检测上次勾选的串口
+        self.station_frame = None
+        self.results = ResultDB()   # 检测结果库，按IMEI跨会话去重
+        self.results_frame = None
+        self.query_options = {}     # config.json 中的查询事务参数: response_timeout / hold_interval / max_timeouts
+        # 检测线程写入的显示值，界面定时器每帧最多刷新一次(见 cat1_view.py)
+        self.view = ViewModel(version="", csq="", imei="", iccid="", signal=SIGNAL_NONE,
+                              result=("", None), exception=("", None))
+        self.view.update(counts="成功: 0  失败: 0", stats="判定用时: -")
 
         self.InitUI()
 
@@ -400,20 +631,58 @@ class MyFrame(wx.Frame):
         self.btn_refresh_serial = wx.Button(panel, label="刷新")
         serial_sizer.Add(self.btn_refresh_serial, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
 
+        self.btn_multi_station = wx.Button(panel, label="多工位检测")
+        serial_sizer.Add(self.btn_multi_station, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+
+        self.btn_results = wx.Button(panel, label="检测记录")
+        serial_sizer.Add(self.btn_results, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+
         main_sizer.Add(serial_sizer, 0, wx.ALIGN_LEFT | wx.ALL, 10)
 
         panel.SetSizer(main_sizer)
 
         # ---------- 状态栏 ----------
-        self.statusbar = self.CreateStatusBar(2)
-        self.statusbar.SetStatusWidths([-2, -1])
+        self.statusbar = self.CreateStatusBar(3)
+        self.statusbar.SetStatusWidths([-2, -1, -1])
         self.statusbar.SetBackgroundColour('#E2E8F0')
         self.statusbar.SetForegroundColour('#475569')
         self.statusbar.SetStatusText("串口未连接", 0)
         self.statusbar.SetStatusText("成功: 0  失败: 0", 1)
+        self.statusbar.SetStatusText("判定用时: -", 2)
+
+        # 预先生成结果颜色和各档信号图标，刷新时只查表
+        self.result_colours = {"pass": wx.GREEN, "fail": wx.RED, "retest": wx.Colour(255, 140, 0)}
+        grey = wx.Colour(128, 128, 128)
+        self.signal_icons = {
+            SIGNAL_NONE: ("", grey),
+            SIGNAL_UNKNOWN: ("❓", grey),
+            1: ("📶📶", wx.Colour('#3CB371')),
+            2: ("📶📶", wx.Colour(0, 200, 0)),
+            3: ("📶📶", wx.Colour(255, 165, 0)),
+            4: ("📶📶", wx.Colour(255, 140, 0)),
+            5: ("📶📶", wx.Colour(255, 69, 0)),
+            6: ("📶📶", wx.RED),
+            SIGNAL_WEAK: ("⚠️", wx.RED),
+        }
+        self.view_renderers = {
+            'version': self.label_sw_version.SetLabelText,
+            'csq': self.label_csq.SetLabelText,
+            'imei': self.label_imei.SetLabelText,
+            'iccid': self.label_iccid.SetLabelText,
+            'signal': self.render_signal_icon,
+            'result': lambda value: self.render_colored_label(self.label_result, value),
+            'exception': lambda value: self.render_colored_label(self.label_except, value),
+            'counts': lambda text: self.statusbar.SetStatusText(text, 1),
+            'stats': lambda text: self.statusbar.SetStatusText(text, 2),
+        }
+        self.render_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.render_view, self.render_timer)
+        self.render_timer.Start(FRAME_INTERVAL_MS)
 
         # 绑定事件
         self.btn_refresh_serial.Bind(wx.EVT_BUTTON, self.on_refresh_serial)
+        self.btn_multi_station.Bind(wx.EVT_BUTTON, self.on_multi_station)
+        self.btn_results.Bind(wx.EVT_BUTTON, self.on_show_results)
         self.btn_save_version.Bind(wx.EVT_BUTTON, self.on_save_version)
         self.btn_start.Bind(wx.EVT_BUTTON, self.on_start_stop)
         self.cb_serial.Bind(wx.EVT_COMBOBOX, self.on_serial_selected)
@@ -427,6 +696,8 @@ class MyFrame(wx.Frame):
 
         # 加载配置
         self.load_config()
+        self.query_engine = QueryEngine(lambda: self.sc.send_byte_data(self.ser, format_hex(QUERY_FRAME)),
+                                        self.sc.recv_queue, **self.query_options)
         self.update_serial_list()
         self.set_default_version()
 
@@ -473,6 +744,22 @@ class MyFrame(wx.Frame):
     def on_refresh_serial(self, event):
         self.update_serial_list()
 
+    def on_multi_station(self, event):
+        if self.station_frame:
+            self.station_frame.Raise()
+            return
+        self.station_frame = MultiStationFrame(self)
+        self.station_frame.Center()
+        self.station_frame.Show()
+
+    def on_show_results(self, event):
+        if self.results_frame:
+            self.results_frame.Raise()
+            return
+        self.results_frame = ResultsFrame(self)
+        self.results_frame.Center()
+        self.results_frame.Show()
+
     def on_serial_selected(self, event):
         selected = event.GetString()
         self.com_name = selected.split(' ')[0]
@@ -487,6 +774,10 @@ class MyFrame(wx.Frame):
                 config = json.load(f)
                 self.target_version = config.get('target_version', "")
                 self.saved_serial = config.get('serial_port', "")
+                self.saved_stations = config.get('stations', [])
+                self.query_options = {key: config[key] for key in ('response_timeout', 'hold_interval', 'max_timeouts')
+                                      if key in config}
+                capture.enable(capture_enabled(config))
                 logger.info("target_version: %s, serial_port: %s" % (self.target_version, self.saved_serial))
         except FileNotFoundError:
             logger.error("config.json not found")
@@ -517,6 +808,7 @@ class MyFrame(wx.Frame):
             config = {}
         config['target_version'] = self.target_version
         config['serial_port'] = self.com_name
+        config['stations'] = self.saved_stations
         with open("config.json", 'w', encoding='UTF-8') as f:
             json.dump(config, f, indent=4, ensure_ascii=False)
         logger.info("配置保存成功: target_version=%s, serial_port=%s" % (self.target_version, self.com_name))
@@ -544,58 +836,35 @@ class MyFrame(wx.Frame):
         wx.MessageBox("版本已保存: %s" % self.target_version, "成功", wx.OK | wx.ICON_INFORMATION)
 
     # ---------- 信号强度图标（按档位）----------
-    def update_signal_icon(self):
-        if not hasattr(self, 'label_signal_icon'):
-            return
-        try:
-            csq_value = int(self.csq)
-        except (ValueError, TypeError):
-            icon_text, color = "❓", (128, 128, 128)
-            self.label_signal_icon.SetLabel(icon_text)
-            self.label_signal_icon.SetForegroundColour(color)
-            self.label_signal_icon.Refresh()
-            return
-
-        if csq_value > -85:
-            icon_text, color = "📶📶", '#3CB371'
-        elif -90 < csq_value <= -85:
-            icon_text, color = "📶📶", (0, 200, 0)
-        elif -95 < csq_value <= -90:
-            icon_text, color = "📶📶", (255, 165, 0)
-        elif -100 < csq_value <= -95:
-            icon_text, color = "📶📶", (255, 140, 0)
-        elif -105 < csq_value <= -100:
-            icon_text, color = "📶📶", (255, 69, 0)
-        elif -110 < csq_value <= -105:
-            icon_text, color = "📶📶", wx.RED
-        else:
-            icon_text, color = "⚠️", wx.RED
-
-        # logger.debug("CSQ: %d, Icon: %s, Color: %s" % (csq_value, icon_text, color))
+    # ---------- 界面刷新 ----------
+    def render_view(self, event=None):
+        """定时器调用: 把视图模型中有变化的项刷新到控件，没有变化时不做任何事"""
+        for name, value in self.view.take_changes().items():
+            self.view_renderers[name](value)
+
+    def render_colored_label(self, label, value):
+        text, colour = value
+        label.SetLabelText(text)
+        if colour:
+            label.SetForegroundColour(self.result_colours[colour])
+
+    def render_signal_icon(self, level):
+        icon_text, colour = self.signal_icons[level]
         self.label_signal_icon.SetLabel(icon_text)
-        self.label_signal_icon.SetForegroundColour(color)
+        self.label_signal_icon.SetForegroundColour(colour)
         self.label_signal_icon.Refresh()
 
     def clear_detection_result(self):
-        """清除界面上的检测结果"""
-        self.label_sw_version.SetLabelText("")
-        self.label_csq.SetLabelText("")
-        self.label_imei.SetLabelText("")
-        self.label_iccid.SetLabelText("")
-        self.label_result.SetLabelText("")
-        self.label_except.SetLabelText("")
-        self.label_signal_icon.SetLabel("")  # 重置为默认图标
+        """清除界面上的检测结果(任意线程可调用)"""
+        self.view.clear()
         self.csq = ""
-        self.last_imei = ""  # 重要：重置IMEI记录，确保新模块能触发统计
     
     # ---------- 检测线程（持续发送指令，IMEI去重）----------
     def detect_task(self):
-        self.last_imei = ""
-        last_send_time = 0
-        SEND_INTERVAL = 1.5
-        no_response_count = 0           # 无响应计数器
-        MAX_NO_RESPONSE = 30             # 最大无响应次数
+        """查询事务: 收到应答立即判定，连续超时视为模组已取下(见 cat1_query.py)
 
+        是否为新模组(需要统计)只由 QueryEngine.imei 判断，开始检测时 query_engine.reset() 清除。
+        """
         while self.task_run_enable:
             if not self.task_run_flag:
                 time.sleep(0.2)
@@ -605,70 +874,52 @@ class MyFrame(wx.Frame):
                 time.sleep(1)
                 continue
 
-            current_time = time.time()
-            if current_time - last_send_time >= SEND_INTERVAL:
-                data = "F4 F5 00 0A 02 03 09 00 00 00 00 00 E3 08"
-                self.sc.send_byte_data(self.ser, data)
-                last_send_time = current_time
-
-            try:
-                data_bytes = self.sc.recv_queue.get(timeout=0.2)
-            except queue.Empty:
-                # 无数据时计数器加1
-                no_response_count += 1
-                if no_response_count >= MAX_NO_RESPONSE:
-                    logger.info("连续30次无响应，清除界面结果")
-                    # 连续30次无响应，清除界面结果
-                    wx.CallAfter(self.clear_detection_result)
-                    no_response_count = 0  # 重置，避免反复清除
+            response = self.query_engine.query(stop=lambda: not self.task_run_flag)
+            if response is None:
                 continue
-
-            if not (isinstance(data_bytes, (bytes, bytearray)) and len(data_bytes) >= 25
-                    and data_bytes[0] == 0xF4 and data_bytes[1] == 0xF5):
-                no_response_count = 0
+            if response.event == EVENT_REMOVED:
+                logger.info("连续%d次查询无应答，清除界面结果", self.query_engine.max_timeouts)
+                self.clear_detection_result()
                 continue
-            
-            # 收到有效数据，重置计数器
-            no_response_count = 0
-        
-            ver = imei = iccid = ""
-            csq = 0
-            try:
-                ver   = data_bytes[8:23].decode('utf-8').strip('\x00')
-                imei  = data_bytes[25:40].decode('utf-8').strip('\x00')
-                iccid = data_bytes[40:60].decode('utf-8').strip('\x00')
-                csq   = data_bytes[24] - 256
-            except Exception as e:
-                logger.error("decode error: %s" % e)
+            if response.event != EVENT_RESPONSE:
                 continue
 
-            wx.CallAfter(self.label_sw_version.SetLabelText, ver)
-            wx.CallAfter(self.label_csq.SetLabelText, str(csq) + " dBm")
-            wx.CallAfter(self.label_imei.SetLabelText, imei)
-            wx.CallAfter(self.label_iccid.SetLabelText, iccid)
+            ver, csq, imei, iccid = response.info
+
             self.csq = csq
-            wx.CallAfter(self.update_signal_icon)
+            self.view.update(version=ver, csq=str(csq) + " dBm", imei=imei, iccid=iccid, signal=signal_level(csq))
 
-            if imei != self.last_imei:
-                self.last_imei = imei
-                if self.target_version == ver:
-                    wx.CallAfter(self.label_result.SetLabelText, "PASS")
-                    wx.CallAfter(self.label_result.SetForegroundColour, wx.GREEN)
+            if response.new_module:
+                stats_text = self.query_engine.stats_text()
+                logger.info("模组 %s 判定用时 %.2fs，%s", imei, self.query_engine.verdict_times[-1], stats_text)
+                self.view.update(stats=stats_text)
+                # 写入结果库，以前检测过的模组(跨会话)不重复统计
+                try:
+                    status, previous = self.results.record(imei, iccid, ver, self.target_version, csq, self.com_name)
+                except Exception as e:
+                    logger.error("record result error: %s" % e)
+                    status, previous = STATUS_NEW, None
+                if status != STATUS_NEW:
+                    result = "PASS" if self.target_version == ver else "FAIL"
+                    first_time = datetime.fromtimestamp(previous['first_time']).strftime("%Y-%m-%d %H:%M:%S")
+                    self.view.update(result=(result + "(重复)", "pass" if result == "PASS" else "fail"),
+                                     exception=('该模块已于 %s 检测过(%s)，不重复统计' % (first_time, previous['result']),
+                                                "retest"))
+                    logger.info("重复检测，IMEI: %s，首次检测: %s" % (imei, first_time))
+                elif self.target_version == ver:
+                    self.view.update(result=("PASS", "pass"))
                     self.success_count += 1
                     # 修改日志记录：包含目标版本和实际版本
                     logger.count_log(f"{imei}   PASS   Target:{self.target_version}   Actual:{ver}")
                 else:
-                    wx.CallAfter(self.label_result.SetLabelText, "FAIL")
-                    wx.CallAfter(self.label_result.SetForegroundColour, wx.RED)
-                    wx.CallAfter(self.label_except.SetLabelText, '检测到软件版本号和目标版本不匹配，请确认模块版本是否正确！')
-                    wx.CallAfter(self.label_except.SetForegroundColour, wx.RED)
+                    self.view.update(result=("FAIL", "fail"),
+                                     exception=('检测到软件版本号和目标版本不匹配，请确认模块版本是否正确！', "fail"))
                     self.fail_count += 1
                     # 修改日志记录：包含目标版本和实际版本
                     logger.count_log(f"{imei}   FAIL   Target:{self.target_version}   Actual:{ver}")
-                wx.CallAfter(self.statusbar.SetStatusText,
-                            "成功: %d  失败: %d" % (self.success_count, self.fail_count), 1)
+                self.view.update(counts="成功: %d  失败: %d" % (self.success_count, self.fail_count))
             else:
-                logger.debug("重复上报，IMEI: %s，不重复统计" % imei)
+                logger.debug("重复上报，IMEI: %s，不重复统计", imei)
 
     # ---------- 开始/停止检测 ----------
     def on_start_stop(self, event):
@@ -695,6 +946,10 @@ class MyFrame(wx.Frame):
             wx.MessageBox("请先选择串口", "错误", wx.OK | wx.ICON_ERROR)
             return
 
+        if self.station_frame and self.station_frame.hub and self.com_name in self.station_frame.rows:
+            wx.MessageBox("串口 %s 正在多工位检测中使用" % self.com_name, "错误", wx.OK | wx.ICON_ERROR)
+            return
+
         self.ser = self.sc.open_serial_port(self.com_name, self.baud_rate)
         if not self.ser:
             wx.MessageBox("串口 %s 打开失败" % self.com_name, "错误", wx.OK | wx.ICON_ERROR)
@@ -707,7 +962,7 @@ class MyFrame(wx.Frame):
         self.btn_start.SetForegroundColour(wx.RED)
         self.task_run_flag = True
         self.auto_detect_flag = True
-        self.last_imei = ""
+        self.query_engine.reset()
 
         # 禁用所有配置控件
         self.cb_serial.Enable(False)
@@ -762,9 +1017,13 @@ class MyFrame(wx.Frame):
     def on_close_window(self, event):
         result = wx.MessageBox("确定要退出吗？", "确认", wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
         if result == wx.YES:
+            self.render_timer.Stop()
+            if self.station_frame:
+                self.station_frame.stop()
             self.task_run_enable = False
             self.sc.stop_serial_threads()
             self.sc.close_serial_port(self.ser)
+            self.results.close()
             self.Destroy()
         else:
             event.Veto()
@@ -7,10 +7,10 @@ import threading
 import time
 import queue
 import json
-import os
-import logging
-from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+from cat1_log import Mylogger, HexBytes
+from crc16_modbus import check_crc
+from serial_capture import get_capture, capture_enabled
+from cat1_at import ATClient
 
 
 def get_available_ports():
@@ -27,80 +27,8 @@ def show_available_ports(ports):
         logger.info("%-10s %-10s %-50s" % (item[0], item[1], item[2]))
 
 
-LOG_PATH = "logs"
-
-
-class Mylogger:
-    def __init__(self) -> None:
-        self.logger = None
-        self.init_log()
-
-    def init_log(self):
-        self.logger = logging.getLogger()
-        self.logger.setLevel(logging.DEBUG)
-
-        if not os.path.exists(LOG_PATH):
-            os.mkdir(LOG_PATH)
-
-        format_option = logging.Formatter(
-            '%(asctime)s.%(msecs)03d | %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S')
-
-        now = datetime.now().strftime("%Y-%m-%d")
-        file_name = f'AutoTest_{now}.log'
-
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        console_handler.setFormatter(format_option)
-
-        # 创建文件处理器
-        file_handler = TimedRotatingFileHandler(filename=LOG_PATH + '/' +
-                                                file_name,
-                                                when='MIDNIGHT',
-                                                interval=1,
-                                                backupCount=7,
-                                                encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(format_option)
-
-        # 统计日志文件名
-        count_file_name = 'count-' + time.strftime(
-            '%Y-%m-%d', time.localtime(time.time())) + '.log'
-        # 统计文件格式
-        count_log_formatter = logging.Formatter('%(message)s')
-        # 统计日志处理器
-        count_handler = TimedRotatingFileHandler(filename='logs/' +
-                                                 count_file_name,
-                                                 when='MIDNIGHT',
-                                                 interval=1,
-                                                 backupCount=7,
-                                                 encoding='utf-8')
-        count_handler.setFormatter(count_log_formatter)
-        count_handler.setLevel(logging.FATAL)
-
-        # 将处理器添加到logger对象中
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(count_handler)
-
-    def info(self, msg, *args, **kwargs):
-        self.logger.info(msg, *args, **kwargs)
-
-    def warn(self, msg, *args, **kwargs):
-        self.logger.warn(msg, *args, **kwargs)
-
-    def error(self, msg, *args, **kwargs):
-        self.logger.error(msg, *args, **kwargs)
-
-    def debug(self, msg, *args, **kwargs):
-        self.logger.debug(msg, *args, **kwargs)
-
-    def count_log(self, msg, *args, **kwargs):
-        self.logger.fatal(msg, *args, **kwargs)
-
-
 logger = Mylogger()
+capture = get_capture()
 
 
 class SerialCommunication:
@@ -108,6 +36,7 @@ class SerialCommunication:
         self.recv_queue = queue.Queue()
         self.ser_receive_flag = False
         self.recv_thread_enable = False
+        self.at_client = None  # 设置后收到的数据直接交给AT指令客户端按行解析
 
     def open_serial_port(self, port_name, baud_rate):
         try:
@@ -139,8 +68,10 @@ class SerialCommunication:
             return
 
         logger.info(f"Sent: {data}")
+        payload = (data + "\n").encode("utf-8")
+        capture.tx(ser.port, payload)
         try:
-            ser.write((data + "\n").encode("utf-8"))
+            ser.write(payload)
         except serial.serialutil.SerialException:
             logger.error("WriteFile failed")
 
@@ -154,34 +85,19 @@ class SerialCommunication:
         if ser.isOpen() == False:
             return
 
-        logger.info("send: [%d] %s" % ((len(data) + 1) / 3, data))
+        logger.info("send: [%d] %s", (len(data) + 1) // 3, data)
+        payload = bytes.fromhex(data)
+        capture.tx(ser.port, payload)
         try:
-            ser.write(bytearray.fromhex(data))
+            ser.write(payload)
         except serial.serialutil.SerialException:
             logger.error("WriteFile failed")
 
-    def crc16(self, data: bytes) -> int:
-        # 初始化crc为0xFFFF
-        crc = 0xFFFF
-        # 循环处理每个数据字节
-        for byte in data:
-            # 将每个数据字节与crc进行异或操作
-            crc ^= byte
-            # 对crc的每一位进行处理
-            for _ in range(8):
-                # 如果最低位为1，则右移一位并执行异或0xA001操作(即0x8005按位颠倒后的结果)
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0xA001
-                # 如果最低位为0，则仅将crc右移一位
-                else:
-                    crc = crc >> 1
-        # 返回最终的crc值
-        return crc
-
     def receive_data(self):
         received_data = ""
         while self.recv_thread_enable:
-            time.sleep(0.3)
+            # AT口按行解析，不需要等整帧到齐，短间隔轮询
+            time.sleep(0.01 if self.at_client else 0.3)
             if self.ser_receive_flag == False:
                 continue
 
@@ -194,7 +110,8 @@ class SerialCommunication:
             try:
                 cnt = self.ser.in_waiting
                 if cnt <= 0:
-                    time.sleep(1)
+                    if not self.at_client:
+                        time.sleep(1)
                     continue
 
                 received_data = self.ser.read(cnt)
@@ -206,21 +123,21 @@ class SerialCommunication:
 
             if len(received_data) == 0:
                 continue
-            
+            capture.rx(self.ser.port, received_data)
+
+            if self.at_client:
+                logger.info("recv: %r", received_data)
+                self.at_client.feed(received_data)
+                continue
+
             if self.recv_queue.qsize() > 2048:
                 self.recv_queue.get_nowait()
 
             if received_data[0] == 0xF4:
-                hex_str = ""
-                recv_hex_str = received_data.hex()
-                for i in range(0, len(recv_hex_str), 2):
-                    hex_str += recv_hex_str[i:i + 2].upper() + " "
-                logger.info("recv: [%d] %s" % (len(hex_str) / 3, hex_str))
+                logger.info("recv: [%d] %s", len(received_data), HexBytes(received_data))
 
                 # crc 校验
-                crc = self.crc16(received_data[0:cnt - 2]).to_bytes(2, 'big')
-                if not (crc[0] == received_data[cnt - 2]
-                        and crc[1] == received_data[cnt - 1]):
+                if not check_crc(received_data, 'big'):
                     logger.warn("crc check fail")
 
                 self.recv_queue.put(received_data)
@@ -270,6 +187,7 @@ class MyFrame(wx.Frame):
         self.csq        = ""  # cat1 信号强度
         self.cat1_imei  = ""  # cat1 IMEI号码
         self.cat1_iccid = ""  # cat1 ICCID号码
+        self.at_version = ""  # AT+CGMR 返回的模组固件版本，只记录日志，不参与判定
 
         self.auto_detect_flag = False  # 自动检测使能标志
         self.task_run_flag = False  # 检测线程运行检测标志
@@ -356,6 +274,10 @@ class MyFrame(wx.Frame):
         self.statusbar.SetStatusWidths([-1, -2])        
 
         self.sc1 = SerialCommunication()
+        # AT口(串口1)的指令客户端，IMEI/ICCID/版本号三条指令同时发出
+        self.at = ATClient(lambda command: self.sc1.send_str_data(self.ser1, command + "\r"),
+                           on_urc=lambda line: logger.info("URC: %s", line))
+        self.sc1.at_client = self.at
         self.sc2 = SerialCommunication()
         self.ser_ports = get_available_ports()
         show_available_ports(self.ser_ports)
@@ -434,6 +356,7 @@ class MyFrame(wx.Frame):
                 buf = json.load(f)
                 self.target_version = buf.get('target_version')
                 logger.info("target_version: %s" % self.target_version)
+                capture.enable(capture_enabled(buf))
         except FileNotFoundError:
             logger.error("config.json not found")
             wx.MessageBox("配置文件加载失败，请检查！", "错误", wx.OK | wx.ICON_ERROR)
@@ -441,65 +364,64 @@ class MyFrame(wx.Frame):
 
     def get_cat1_imei(self):
         if self.ser1 is not None:
-            while self.sc1.recv_queue.empty() == False:
-                self.sc1.recv_queue.get_nowait()
-
-            self.sc1.send_str_data(self.ser1, "AT+GSN=1\r\n")
-
-            try:
-                data_str = self.sc1.recv_queue.get(timeout=1)
-            except queue.Empty:
-                return
-
-            if data_str.find("+GSN:"):
-                data_str = data_str.split("\r\n")
-                if len(data_str) > 3:
-                    result = data_str[3]
-                    imei = data_str[1]
-                else:
-                    result = ""
-                    imei = ""
-
-            if (result == "OK"):
-                logger.info("imei %s" % imei)
-                if imei.find("+GSN:") != -1:
-                    imei = imei.split("+GSN:")
-                    if len(imei) > 1:
-                        imei = imei[1].strip()
-                    logger.info("get imei is {0}".format(imei))
-                    self.cat1_imei = imei.strip()
-            else:
-                logger.info("get data is {0}".format(data_str))
+            result = self.at.execute("AT+GSN=1")
+            if not result.ok:
+                logger.info("get imei failed: %s %s" % (result.error, result.lines))
                 return
+            logger.info("get imei is {0}".format(result.value()))
+            self.cat1_imei = result.value()
 
     def get_cat1_iccid(self):
         if self.ser1 is not None:
-            while self.sc1.recv_queue.empty() == False:
-                self.sc1.recv_queue.get_nowait()
-
-            self.sc1.send_str_data(self.ser1, "AT+ICCID\r\n")
-
-            try:
-                data_str = self.sc1.recv_queue.get(timeout=1)
-            except queue.Empty:
+            result = self.at.execute("AT+ICCID")
+            if not result.ok:
+                logger.error("get iccid failed: %s %s" % (result.error, result.lines))
                 return
+            logger.info("get iccid is {0}".format(result.value()))
+            self.cat1_iccid = result.value()
 
-            if data_str.find("+ICCID:"):
-                data_str = data_str.split("\r\n")
-                if len(data_str) > 3:
-                    result = data_str[3]
-                    iccid = data_str[1]
-                else:
-                    result = ""
-                    iccid = ""
-
-            if (result == "OK"):
-                iccid = iccid.split("+ICCID:")[1]
-                logger.info("get iccid is {0}".format(iccid))
-                self.cat1_iccid = iccid.strip()
-            else:
-                logger.error("get data is {0}".format(data_str))
-                return
+    def get_cat1_at_info(self):
+        """IMEI、ICCID、固件版本三条AT指令同时在途，一个应答周期内取完
+
+        判定用的软件版本只取串口2查询帧中的版本号；AT+CGMR 是模组固件版本，只记录到 at_version。
+        IMEI、ICCID 只在查询帧没有给出时用AT应答补上。
+        """
+        if self.ser1 is None:
+            return
+        imei, iccid, version = self.at.execute_all([("AT+GSN=1", None), ("AT+ICCID", None), ("AT+CGMR", None)])
+        logger.info("at info: imei %s, iccid %s, firmware %s" % (imei, iccid, version))
+        if imei and not self.cat1_imei.strip('\x00'):
+            self.cat1_imei = imei
+        if iccid and not self.cat1_iccid.strip('\x00'):
+            self.cat1_iccid = iccid
+        self.at_version = version
+
+    def find_at_port(self):
+        """AT口(串口1)是描述以 ASR 开头的模组USB口，串口下拉框中只列出其他串口"""
+        for item in self.ser_ports:
+            if item[2].startswith("ASR"):
+                return item[1]
+        return ""
+
+    def open_at_port(self):
+        """打开AT口并开始接收，找不到或打开失败时只用串口2查询"""
+        self.com1_name = self.find_at_port()
+        if not self.com1_name:
+            logger.info("AT port not found, query by frame port only")
+            return False
+        self.ser1 = self.sc1.open_serial_port(self.com1_name, 115200)
+        if self.ser1 is None:
+            return False
+        self.at.reset()
+        self.sc1.start_serial_threads(self.ser1)
+        return True
+
+    def close_at_port(self):
+        self.sc1.stop_serial_threads()
+        self.sc1.close_serial_port(self.ser1)
+        self.ser1 = None
+        self.at_version = ""
+        self.at.reset()
 
     def get_cat1_version(self):
         if self.ser2 is not None:
@@ -552,8 +474,11 @@ class MyFrame(wx.Frame):
                 # if self.task_run_flag:
                 #     self.label_iccid_text.SetLabelText(self.cat1_iccid)
 
-                # 查询版本号
+                # 查询版本号、信号强度(串口2的F4 F5帧)
                 self.get_cat1_version()
+                # AT口打开时 IMEI、ICCID、固件版本三条指令同时在途，一个应答周期内取完(不改变判定用的版本号)
+                if self.ser1 is not None:
+                    self.get_cat1_at_info()
                 if self.task_run_flag and self.cat1_ver != "":
                     self.label_sw_vertion_text.SetLabelText(self.cat1_ver)
                     self.label_csq_text.SetLabelText(str(self.csq) + " dBm")
@@ -602,9 +527,8 @@ class MyFrame(wx.Frame):
 
             self.auto_detect_flag = False
             self.task_run_flag = False
-            self.sc1.stop_serial_threads()
+            self.close_at_port()
             self.sc2.stop_serial_threads()
-            self.sc1.close_serial_port(self.ser1)
             self.sc2.close_serial_port(self.ser2)
             # self.statusbar.SetStatusText(self.com1_name + " 未连接", 0)
             # self.statusbar.SetStatusText(self.com2_name + " 未连接", 1)
@@ -629,6 +553,9 @@ class MyFrame(wx.Frame):
             wx.MessageBox("串口 " + self.com2_name + " 打开失败", "错误", wx.OK | wx.ICON_ERROR)
             return        
 
+        if self.open_at_port():
+            logger.info("AT port %s opened" % self.com1_name)
+
         # if self.ser1 is not None:
         #     self.statusbar.SetStatusText(self.com1_name + " 已连接", 0)
         #     self.sc1.start_serial_threads(self.ser1)
@@ -702,6 +629,9 @@ class MyFrame(wx.Frame):
                         #     self.cb1.Delete(index)
                         # self.cb1.Refresh()
 
+                        if port[1] == self.com1_name and self.ser1 is not None:
+                            self.close_at_port()
+
                         remove_index = []
                         for i in range(self.cb2.GetCount()):
                             if port[1] == self.cb2.GetString(i).split(" ")[0]:
@@ -747,6 +677,12 @@ class MyFrame(wx.Frame):
 
                         #     self.cb1.Refresh()
                         # else:
+                        if port[2].startswith("ASR"):
+                            # AT口不加入下拉框，检测进行中时重新打开
+                            if self.task_run_enable and self.auto_detect_flag and self.ser1 is None:
+                                self.ser_ports = current_ports
+                                self.open_at_port()
+                            continue
                         if self.cb2.GetCount() == 0:
                             self.statusbar.SetStatusText(self.com2_name + " 未连接", 0)
 
@@ -0,0 +1,136 @@
+# coding=utf-8
+"""串口检测工具的日志 - 串口线程只把日志记录放入队列，由后台线程写文件和控制台
+
+- 根logger上只挂一个 QueueHandler，控制台、按天滚动的日志文件、统计日志都由 QueueListener 的线程写入，
+  磁盘卡顿或控制台输出慢不会拖慢串口收发
+- 日志参数在后台线程格式化，HexBytes(data) 只有真正写出时才转成 "F4 F5 ..." 形式
+- 打包成exe(sys.frozen)或没有控制台时不输出到控制台
+- 队列满时丢弃新的日志记录，不阻塞调用线程
+
+不依赖wx，cat1_iqc_detect.py 和 cat1_iqc_detect2.py 共用。
+"""
+import atexit
+import logging
+import os
+import queue
+import sys
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+LOG_PATH = "logs"
+QUEUE_SIZE = 10000
+
+
+class HexBytes:
+    """延迟格式化的字节串，写日志时才转成大写十六进制"""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return self.data.hex(' ').upper()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """不在调用线程中格式化消息的 QueueHandler，队列满时丢弃"""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 异常堆栈在调用线程中转成文本，其余参数留给后台线程格式化
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def console_enabled():
+    """打包后的exe(--noconsole)没有控制台，也不需要控制台输出"""
+    return not getattr(sys, 'frozen', False) and sys.stderr is not None
+
+
+def setup_logging(log_path=LOG_PATH, console=None, level=logging.DEBUG):
+    """配置根logger，返回 QueueListener(程序退出时自动停止并写完队列中的日志)"""
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    if not os.path.exists(log_path):
+        os.mkdir(log_path)
+
+    format_option = logging.Formatter(
+        '%(asctime)s.%(msecs)03d | %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S')
+
+    handlers = []
+    if console_enabled() if console is None else console:
+        # 控制台处理器
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(level)
+        console_handler.setFormatter(format_option)
+        handlers.append(console_handler)
+
+    # 文件处理器
+    file_name = f'AutoTest_{datetime.now().strftime("%Y-%m-%d")}.log'
+    file_handler = TimedRotatingFileHandler(filename=os.path.join(log_path, file_name),
+                                            when='MIDNIGHT',
+                                            interval=1,
+                                            backupCount=7,
+                                            encoding='utf-8')
+    file_handler.setLevel(level)
+    file_handler.setFormatter(format_option)
+    handlers.append(file_handler)
+
+    # 统计日志处理器(只记录 count_log 写入的 FATAL 级别)
+    count_file_name = 'count-' + time.strftime('%Y-%m-%d', time.localtime(time.time())) + '.log'
+    count_handler = TimedRotatingFileHandler(filename=os.path.join(log_path, count_file_name),
+                                             when='MIDNIGHT',
+                                             interval=1,
+                                             backupCount=7,
+                                             encoding='utf-8')
+    count_handler.setFormatter(logging.Formatter('%(message)s'))
+    count_handler.setLevel(logging.FATAL)
+    handlers.append(count_handler)
+
+    log_queue = queue.Queue(QUEUE_SIZE)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class Mylogger:
+    """兼容原来的 logger.info / warn / error / debug / count_log 调用"""
+    def __init__(self, log_path=LOG_PATH, console=None) -> None:
+        self.logger = logging.getLogger()
+        self.listener = setup_logging(log_path, console)
+
+    # stacklevel=2: 日志中的文件名和行号显示调用者，而不是这里
+    def info(self, msg, *args, **kwargs):
+        kwargs.setdefault('stacklevel', 2)
+        self.logger.info(msg, *args, **kwargs)
+
+    def warn(self, msg, *args, **kwargs):
+        kwargs.setdefault('stacklevel', 2)
+        self.logger.warning(msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        kwargs.setdefault('stacklevel', 2)
+        self.logger.error(msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        kwargs.setdefault('stacklevel', 2)
+        self.logger.debug(msg, *args, **kwargs)
+
+    def count_log(self, msg, *args, **kwargs):
+        kwargs.setdefault('stacklevel', 2)
+        self.logger.fatal(msg, *args, **kwargs)
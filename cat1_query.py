@@ -0,0 +1,150 @@
+# coding=utf-8
+"""CAT1 单工位检测的查询事务 - 发送查询帧后在自己的期限内等待对应的应答
+
+原来 detect_task 每1.5秒发一次查询，每次 recv_queue.get(timeout=0.2)，连续30次取不到数据才认为模组已取下，
+出结果和发现取下的快慢都由这些常数决定，而不是由模组决定。QueryEngine 把一次"查询-应答"作为一个事务:
+- 发送前丢弃队列中残留的旧应答，发送后在 response_timeout 内等待查询应答帧，期间收到的文本(模组开机日志)等忽略
+- 没有模组时事务一个接一个(超时后立即重发)，模组插上后最多一个 response_timeout 就能收到应答并判定；
+  判定完成后每 hold_interval 查询一次，只用于发现模组取下(hold_interval 为0时收到应答立即重发)
+- 连续 max_timeouts 个事务超时视为模组已取下
+- 统计每个模组从出现(第一次收到数据)到判定完成的时间(time-to-verdict)和每次事务的应答时间，给出中位数和P95
+
+不依赖wx。
+"""
+import collections
+import math
+import queue
+import time
+
+from cat1_frame import parse_query_response
+
+RESPONSE_TIMEOUT = 0.5   # 单个事务等待应答的时间(秒)
+HOLD_INTERVAL = 0.3      # 已判定的模组继续查询的间隔(秒)
+MAX_TIMEOUTS = 3         # 连续超时的事务数达到该值视为模组已取下
+STATS_SIZE = 1000        # 统计最近多少个模组/事务
+
+EVENT_RESPONSE = "response"  # 收到应答
+EVENT_TIMEOUT = "timeout"    # 本次事务超时
+EVENT_REMOVED = "removed"    # 连续超时，模组已取下(每个模组只报告一次)
+
+QueryResult = collections.namedtuple('QueryResult', ['event', 'info', 'new_module', 'elapsed'])
+
+
+def percentile(values, percent):
+    """最近秩法求百分位数，values为空时返回None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100.0 * len(ordered)) - 1)]
+
+
+class QueryEngine:
+    """send() 发送一次查询帧；recv_queue 中是接收线程放入的帧(bytes)和文本(str)"""
+    def __init__(self, send, recv_queue, response_timeout=RESPONSE_TIMEOUT, hold_interval=HOLD_INTERVAL,
+                 max_timeouts=MAX_TIMEOUTS):
+        self.send = send
+        self.recv_queue = recv_queue
+        self.response_timeout = response_timeout
+        self.hold_interval = hold_interval
+        self.max_timeouts = max_timeouts
+        self.verdict_times = collections.deque(maxlen=STATS_SIZE)
+        self.response_times = collections.deque(maxlen=STATS_SIZE)
+        self.transactions = 0
+        self.timeouts = 0
+        self.stale = 0  # 发送前丢弃的残留数据
+        self.reset()
+
+    def reset(self):
+        """重新开始(串口重新打开或界面清除结果后调用)"""
+        self.imei = ""
+        self.present = False
+        self.consecutive_timeouts = 0
+        self.appear_time = None  # 模组出现(第一次收到数据)的时间
+        self.next_query = 0.0
+
+    def _drain(self):
+        while True:
+            try:
+                item = self.recv_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.stale += 1
+            self._activity(item, time.time())
+
+    def _activity(self, item, now):
+        # 没有模组(或正在超时)时收到任何数据(开机日志或应答)都说明有模组插上，从这时开始计时
+        if (not self.present or self.consecutive_timeouts) and self.appear_time is None and item:
+            self.appear_time = now
+
+    def query(self, stop=None):
+        """执行一个事务，返回 QueryResult；stop() 返回True时提前结束并返回None"""
+        delay = self.next_query - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self._drain()
+        start = time.time()
+        self.transactions += 1
+        self.send()
+        deadline = start + self.response_timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return self._timeout()
+            if stop and stop():
+                return None
+            try:
+                item = self.recv_queue.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                continue
+            now = time.time()
+            self._activity(item, now)
+            try:
+                info = parse_query_response(item)
+            except Exception:
+                info = None  # 解码失败按无效应答处理，继续等待
+            if info is not None:
+                return self._response(info, start, now)
+
+    def _response(self, info, start, now):
+        elapsed = now - start
+        self.response_times.append(elapsed)
+        self.consecutive_timeouts = 0
+        self.present = True
+        new_module = info.imei != self.imei
+        if new_module:
+            self.imei = info.imei
+            self.verdict_times.append(now - (self.appear_time or start))
+        self.appear_time = None
+        self.next_query = now + self.hold_interval
+        return QueryResult(EVENT_RESPONSE, info, new_module, elapsed)
+
+    def _timeout(self):
+        self.timeouts += 1
+        self.consecutive_timeouts += 1
+        self.next_query = 0.0  # 超时已经等待过，立即重发
+        if self.present and self.consecutive_timeouts >= self.max_timeouts:
+            self.imei = ""
+            self.present = False
+            self.appear_time = None
+            return QueryResult(EVENT_REMOVED, None, False, self.response_timeout)
+        return QueryResult(EVENT_TIMEOUT, None, False, self.response_timeout)
+
+    def stats(self):
+        """返回统计dict，时间单位为秒，没有数据的项为None"""
+        verdicts = list(self.verdict_times)
+        responses = list(self.response_times)
+        return {
+            'modules': len(verdicts),
+            'verdict_median': percentile(verdicts, 50),
+            'verdict_p95': percentile(verdicts, 95),
+            'response_median': percentile(responses, 50),
+            'response_p95': percentile(responses, 95),
+            'transactions': self.transactions,
+            'timeouts': self.timeouts,
+        }
+
+    def stats_text(self):
+        stats = self.stats()
+        if not stats['modules']:
+            return "判定用时: -"
+        return "判定用时 中位:%.2fs P95:%.2fs" % (stats['verdict_median'], stats['verdict_p95'])
@@ -0,0 +1,200 @@
+# coding=utf-8
+"""CAT1 IQC检测结果库 - SQLite保存每个模组的检测结果，按IMEI跨会话去重
+
+表结构:
+- modules: 每个IMEI一行(主键)，保存最近一次的检测结果和首次检测时间，用于去重和查询
+- tests:   每次判定一行(同一模组重复检测也记录)，按时间和IMEI建索引，用于导出
+- shifts:  每个班次的PASS/FAIL/重复检测数，记录时同步累加，汇总不需要扫描全表
+
+同一IMEI再次检测(当天稍后或其他日期)记为重复检测，不再计入PASS/FAIL数量。
+使用WAL模式，写入不阻塞查询；所有操作串行加锁，检测线程和界面线程可以共用一个对象。
+
+不依赖wx。
+
+命令行:
+    python cat1_results.py lookup 860000000000001
+    python cat1_results.py export results.csv --since 2026-10-01 --until 2026-10-18
+    python cat1_results.py summary --days 7
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_DB_FILE = os.path.join("logs", "iqc_results.db")
+DAY_SHIFT = ("白班", 8, 20)  # 白班 8:00-20:00，其余时间为夜班(算在开始那天)
+NIGHT_SHIFT = "夜班"
+
+CSV_FIELDS = ['time', 'imei', 'iccid', 'version', 'target_version', 'csq', 'result', 'station', 'retest']
+
+STATUS_NEW = "new"          # 首次检测
+STATUS_RETEST = "retest"    # 以前检测过
+
+
+def shift_of(timestamp):
+    """返回 (班次日期 "YYYY-MM-DD", 班次名)"""
+    moment = datetime.fromtimestamp(timestamp)
+    name, start_hour, end_hour = DAY_SHIFT
+    if start_hour <= moment.hour < end_hour:
+        return moment.strftime("%Y-%m-%d"), name
+    if moment.hour < start_hour:
+        moment -= timedelta(days=1)
+    return moment.strftime("%Y-%m-%d"), NIGHT_SHIFT
+
+
+def parse_date(text):
+    """"YYYY-MM-DD" -> 当天0点的时间戳"""
+    return time.mktime(time.strptime(text, "%Y-%m-%d"))
+
+
+class ResultDB:
+    def __init__(self, path=DEFAULT_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS modules (
+                imei TEXT PRIMARY KEY,
+                iccid TEXT, version TEXT, target_version TEXT, csq INTEGER,
+                result TEXT, station TEXT,
+                first_time REAL, last_time REAL, test_count INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS tests (
+                id INTEGER PRIMARY KEY,
+                time REAL, imei TEXT, iccid TEXT, version TEXT, target_version TEXT, csq INTEGER,
+                result TEXT, station TEXT, retest INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS tests_time ON tests(time);
+            CREATE INDEX IF NOT EXISTS tests_imei ON tests(imei);
+            CREATE TABLE IF NOT EXISTS shifts (
+                shift_date TEXT, shift TEXT,
+                pass INTEGER DEFAULT 0, fail INTEGER DEFAULT 0, retest INTEGER DEFAULT 0,
+                PRIMARY KEY (shift_date, shift)
+            );
+        """)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, imei, iccid, version, target_version, csq, station="", timestamp=None):
+        """记录一次判定，返回 (状态, 以前的记录dict或None)
+
+        状态为 STATUS_NEW 时调用方计入PASS/FAIL，STATUS_RETEST 时不重复统计。
+        """
+        timestamp = timestamp or time.time()
+        result = "PASS" if version == target_version else "FAIL"
+        shift_date, shift = shift_of(timestamp)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT * FROM modules WHERE imei = ?", (imei,)).fetchone()
+            previous = dict(row) if row else None
+            if previous:
+                self._conn.execute(
+                    "UPDATE modules SET iccid = ?, version = ?, target_version = ?, csq = ?, result = ?, station = ?,"
+                    " last_time = ?, test_count = test_count + 1 WHERE imei = ?",
+                    (iccid, version, target_version, csq, result, station, timestamp, imei))
+            else:
+                self._conn.execute(
+                    "INSERT INTO modules VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
+                    (imei, iccid, version, target_version, csq, result, station, timestamp, timestamp))
+            self._conn.execute(
+                "INSERT INTO tests (time, imei, iccid, version, target_version, csq, result, station, retest)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (timestamp, imei, iccid, version, target_version, csq, result, station, 1 if previous else 0))
+            column = "retest" if previous else result.lower()
+            self._conn.execute("INSERT OR IGNORE INTO shifts (shift_date, shift) VALUES (?, ?)", (shift_date, shift))
+            self._conn.execute(f"UPDATE shifts SET {column} = {column} + 1 WHERE shift_date = ? AND shift = ?",
+                               (shift_date, shift))
+        return (STATUS_RETEST if previous else STATUS_NEW), previous
+
+    def lookup(self, imei):
+        """返回该IMEI的记录dict(含 history: 各次检测列表)，没有时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM modules WHERE imei = ?", (imei,)).fetchone()
+            if not row:
+                return None
+            record = dict(row)
+            record['history'] = [dict(test) for test in self._conn.execute(
+                "SELECT * FROM tests WHERE imei = ? ORDER BY time", (imei,))]
+        return record
+
+    def shift_summary(self, since=None):
+        """返回 [(班次日期, 班次, pass, fail, retest)]，按时间倒序；since为 "YYYY-MM-DD" """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT shift_date, shift, pass, fail, retest FROM shifts WHERE shift_date >= ?"
+                " ORDER BY shift_date DESC, shift", (since or "",)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def export_csv(self, path, since=None, until=None):
+        """导出 [since, until) 时间范围内的每次检测(时间戳)，返回导出的行数"""
+        query = "SELECT * FROM tests WHERE time >= ? AND time < ? ORDER BY time"
+        params = (since or 0, until or float('inf'))
+        count = 0
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_FIELDS)
+                while True:
+                    rows = cursor.fetchmany(5000)
+                    if not rows:
+                        break
+                    writer.writerows(
+                        [datetime.fromtimestamp(row['time']).strftime("%Y-%m-%d %H:%M:%S")] +
+                        [row[field] for field in CSV_FIELDS[1:]] for row in rows)
+                    count += len(rows)
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CAT1 IQC检测结果库")
+    parser.add_argument('--db', default=DEFAULT_DB_FILE, help="结果库文件")
+    sub = parser.add_subparsers(dest='command', required=True)
+    lookup = sub.add_parser('lookup', help="按IMEI查询")
+    lookup.add_argument('imei')
+    export = sub.add_parser('export', help="导出CSV")
+    export.add_argument('output')
+    export.add_argument('--since', help="开始日期 YYYY-MM-DD")
+    export.add_argument('--until', help="结束日期 YYYY-MM-DD(不含)")
+    summary = sub.add_parser('summary', help="班次汇总")
+    summary.add_argument('--days', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"结果库不存在: {args.db}")
+        return 1
+    db = ResultDB(args.db)
+    if args.command == 'lookup':
+        record = db.lookup(args.imei)
+        if not record:
+            print(f"未检测过: {args.imei}")
+            return 1
+        for test in record['history']:
+            print(f"{datetime.fromtimestamp(test['time']):%Y-%m-%d %H:%M:%S}  {test['result']}  "
+                  f"版本:{test['version']}  目标:{test['target_version']}  CSQ:{test['csq']}  "
+                  f"ICCID:{test['iccid']}  工位:{test['station']}")
+    elif args.command == 'export':
+        count = db.export_csv(args.output, parse_date(args.since) if args.since else None,
+                              parse_date(args.until) if args.until else None)
+        print(f"已导出 {count} 条记录: {args.output}")
+    else:
+        since = (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+        print(f"{'日期':<12}{'班次':<6}{'PASS':>8}{'FAIL':>8}{'重复':>8}")
+        for shift_date, shift, passed, failed, retest in db.shift_summary(since):
+            print(f"{shift_date:<12}{shift:<6}{passed:>8}{failed:>8}{retest:>8}")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+# coding=utf-8
+"""CAT1 多工位IQC检测 - 一个线程同时检测多个串口上的模组
+
+单工位检测每个串口要一个接收线程和一个检测线程，StationHub 把所有串口放在同一个I/O线程里:
+- Linux/macOS 用 selectors 等待任意串口可读，有数据立即处理
+- Windows 的串口句柄不能用于select，改为每10ms轮询一遍所有串口的 in_waiting
+每个工位按 SEND_INTERVAL 发送查询帧，用 FrameDecoder 切帧，按IMEI去重后判定PASS/FAIL，
+PASS/FAIL计数所有工位共用。串口拔出后每隔 REOPEN_INTERVAL 尝试重新打开。
+
+不依赖wx，界面通过 on_update / on_result 回调(在I/O线程中调用)获取结果。
+"""
+import os
+import selectors
+import threading
+import time
+
+import serial
+
+from cat1_frame import FrameDecoder, QUERY_FRAME, parse_query_response
+
+BAUD_RATE = 9600
+SEND_INTERVAL = 1.5       # 查询间隔(秒)
+NO_RESPONSE_TIMEOUT = 6.0  # 超过该时间没有应答视为模组已取下，清除该工位结果
+REOPEN_INTERVAL = 2.0     # 串口打开失败或拔出后重新打开的间隔(秒)
+POLL_INTERVAL = 0.01      # 轮询模式下没有数据时的等待时间(秒)
+SELECT_TIMEOUT = 0.05     # selectors 模式下最长等待时间(秒)，也是发送查询和超时检查的精度
+
+STATE_CLOSED = "未连接"
+STATE_WAITING = "等待模组"
+STATE_ONLINE = "检测中"
+
+
+class Station:
+    """一个工位(串口)的状态，只在I/O线程中修改"""
+    def __init__(self, index, port):
+        self.index = index
+        self.port = port
+        self.ser = None
+        self.decoder = FrameDecoder()
+        self.state = STATE_CLOSED
+        self.info = None  # 最近一次的 ModuleInfo
+        self.result = ""  # "PASS" / "FAIL" / ""
+        self.retest = False  # 以前检测过，不计入统计
+        self.last_imei = ""
+        self.last_send = 0.0
+        self.last_response = 0.0
+        self.last_open = 0.0
+        self.open_error_logged = False
+
+    def clear(self):
+        self.info = None
+        self.result = ""
+        self.retest = False
+        self.last_imei = ""
+
+    def snapshot(self):
+        """给界面线程使用的只读副本"""
+        info = self.info
+        return {
+            'index': self.index,
+            'port': self.port,
+            'state': self.state,
+            'version': info.version if info else "",
+            'csq': info.csq if info else None,
+            'imei': info.imei if info else "",
+            'iccid': info.iccid if info else "",
+            'result': self.result,
+            'retest': self.retest,
+        }
+
+
+class StationHub:
+    """多工位检测的I/O核心
+
+    on_update(snapshot)  工位状态或结果变化时调用
+    on_result(snapshot, passed)  新模组(IMEI变化)判定完成时调用，用于写统计日志
+    record(port, info, passed)  新模组判定后调用(如写入结果库)，返回False时表示以前检测过，不计入PASS/FAIL
+    on_log(level, message)  日志回调，level为 "info" / "warn" / "error"
+    capture  serial_capture.SerialCapture，记录各串口收发的原始数据
+    """
+    def __init__(self, target_version, baud_rate=BAUD_RATE, on_update=None, on_result=None, on_log=None,
+                 record=None, capture=None):
+        self.target_version = target_version
+        self.baud_rate = baud_rate
+        self.on_update = on_update
+        self.on_result = on_result
+        self.on_log = on_log
+        self.record = record
+        self.capture = capture
+        self.success_count = 0
+        self.fail_count = 0
+        self.stations = {}  # 串口 -> Station
+        self._commands = []  # 其他线程提交的 (操作, 串口)，在I/O线程中执行
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._next_index = 1
+        # Windows串口句柄不支持select，使用轮询
+        self.use_selector = os.name != 'nt'
+        self._selector = selectors.DefaultSelector() if self.use_selector else None
+
+    # ---------- 对外接口(任意线程) ----------
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="cat1-stations", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def add_port(self, port):
+        with self._lock:
+            self._commands.append(("add", port))
+
+    def remove_port(self, port):
+        with self._lock:
+            self._commands.append(("remove", port))
+
+    def set_target_version(self, version):
+        self.target_version = version
+
+    def counts(self):
+        with self._lock:
+            return self.success_count, self.fail_count
+
+    def reset_counts(self):
+        with self._lock:
+            self.success_count = 0
+            self.fail_count = 0
+
+    # ---------- I/O线程 ----------
+    def _log(self, level, message):
+        if self.on_log:
+            self.on_log(level, message)
+
+    def _notify(self, station):
+        if self.on_update:
+            try:
+                self.on_update(station.snapshot())
+            except Exception as e:
+                self._log("error", "station update callback error: %s" % e)
+
+    def _apply_commands(self):
+        with self._lock:
+            commands, self._commands = self._commands, []
+        for action, port in commands:
+            if action == "add" and port not in self.stations:
+                station = Station(self._next_index, port)
+                self._next_index += 1
+                self.stations[port] = station
+                self._notify(station)
+            elif action == "remove" and port in self.stations:
+                self._close(self.stations.pop(port))
+
+    def _open(self, station, now):
+        station.last_open = now
+        try:
+            # timeout=0: 非阻塞读，等待由selectors或轮询完成
+            station.ser = serial.Serial(station.port, self.baud_rate, timeout=0, write_timeout=0.5)
+        except (serial.serialutil.SerialException, OSError) as e:
+            station.ser = None
+            if not station.open_error_logged:
+                station.open_error_logged = True
+                self._log("warn", "[%s] open failed: %s" % (station.port, e))
+            return
+        station.open_error_logged = False
+        station.decoder.reset()
+        station.state = STATE_WAITING
+        station.last_send = 0.0
+        station.last_response = now
+        if self._selector:
+            try:
+                self._selector.register(station.ser.fileno(), selectors.EVENT_READ, station)
+            except (AttributeError, OSError, ValueError):
+                # 没有fileno的串口实现(如虚拟串口)退回轮询
+                self.use_selector = False
+        self._log("info", "[%s] open serial port success" % station.port)
+        self._notify(station)
+
+    def _close(self, station):
+        if station.ser is None:
+            return
+        if self._selector:
+            try:
+                self._selector.unregister(station.ser.fileno())
+            except (KeyError, OSError, ValueError):
+                pass
+        try:
+            station.ser.close()
+        except (serial.serialutil.SerialException, OSError):
+            pass
+        station.ser = None
+        station.state = STATE_CLOSED
+        station.clear()
+        self._notify(station)
+
+    def _service(self, now):
+        """打开串口、发送查询、检查无应答超时"""
+        for station in list(self.stations.values()):
+            if station.ser is None:
+                if now - station.last_open >= REOPEN_INTERVAL:
+                    self._open(station, now)
+                continue
+            if now - station.last_send >= SEND_INTERVAL:
+                station.last_send = now
+                try:
+                    station.ser.write(QUERY_FRAME)
+                    if self.capture:
+                        self.capture.tx(station.port, QUERY_FRAME)
+                except (serial.serialutil.SerialException, OSError) as e:
+                    self._log("error", "[%s] write failed: %s" % (station.port, e))
+                    self._close(station)
+                    continue
+            if station.state == STATE_ONLINE and now - station.last_response >= NO_RESPONSE_TIMEOUT:
+                self._log("info", "[%s] no response, clear result" % station.port)
+                station.state = STATE_WAITING
+                station.clear()
+                self._notify(station)
+
+    def _read(self, station, now):
+        """读取串口中已有的数据，返回读到的字节数"""
+        try:
+            waiting = station.ser.in_waiting
+            if not waiting and not self.use_selector:
+                return 0
+            data = station.ser.read(waiting or 1)
+        except (serial.serialutil.SerialException, OSError, TypeError, AttributeError) as e:
+            self._log("error", "[%s] read failed: %s" % (station.port, e))
+            self._close(station)
+            return 0
+        if not data:
+            return 0
+        if self.capture:
+            self.capture.rx(station.port, data)
+        for kind, frame in station.decoder.feed(data):
+            if kind == "frame":
+                self._handle_frame(station, frame, now)
+        return len(data)
+
+    def _handle_frame(self, station, frame, now):
+        try:
+            info = parse_query_response(frame)
+        except Exception as e:
+            self._log("error", "[%s] decode error: %s" % (station.port, e))
+            return
+        if info is None:
+            return
+        station.last_response = now
+        station.state = STATE_ONLINE
+        station.info = info
+        if info.imei != station.last_imei:
+            station.last_imei = info.imei
+            passed = info.version == self.target_version
+            station.result = "PASS" if passed else "FAIL"
+            counted = True
+            if self.record:
+                try:
+                    counted = self.record(station.port, info, passed)
+                except Exception as e:
+                    self._log("error", "[%s] record result error: %s" % (station.port, e))
+            station.retest = not counted
+            with self._lock:
+                if counted and passed:
+                    self.success_count += 1
+                elif counted:
+                    self.fail_count += 1
+            if self.on_result:
+                try:
+                    self.on_result(station.snapshot(), passed)
+                except Exception as e:
+                    self._log("error", "station result callback error: %s" % e)
+        self._notify(station)
+
+    def _wait_and_read(self, now):
+        if self.use_selector:
+            if not self._selector.get_map():
+                time.sleep(SELECT_TIMEOUT)
+                return
+            for key, _ in self._selector.select(SELECT_TIMEOUT):
+                if key.data.ser is not None:
+                    self._read(key.data, time.time())
+            return
+        total = 0
+        for station in list(self.stations.values()):
+            if station.ser is not None:
+                total += self._read(station, now)
+        if not total:
+            time.sleep(POLL_INTERVAL)
+
+    def _run(self):
+        while self._running:
+            self._apply_commands()
+            now = time.time()
+            self._service(now)
+            self._wait_and_read(now)
+        for station in list(self.stations.values()):
+            self._close(station)
+        self.stations = {}
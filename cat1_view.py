@@ -0,0 +1,107 @@
+# coding=utf-8
+"""CAT1 IQC检测界面的视图模型 - 检测线程只更新模型，界面定时器每帧最多刷新一次且只改有变化的控件
+
+原来 detect_task 每收到一帧就调用6次以上 wx.CallAfter(版本、信号、IMEI、ICCID、信号图标、结果、状态栏)，
+多工位时每个工位每次状态变化也各调用一次，事件队列被大量回调占满，界面会卡顿。
+- ViewModel: 单工位界面的各项显示值，update()/clear() 在任意线程中原子地修改
+- RowsModel: 多工位表格，每个工位只保留最新的快照
+界面线程用 wx.Timer 每 FRAME_INTERVAL_MS 调用一次 take_changes()，没有变化时什么都不做；
+同一帧内多次更新只显示最后的值，取回的只是和上次显示不同的项。
+
+信号强度按 signal_level() 分档，界面在启动时按档位预先生成图标文字和颜色，档位不变时不重设图标。
+
+不依赖wx。
+"""
+import threading
+
+FRAME_INTERVAL_MS = 50  # 界面刷新间隔(毫秒)，即最多每秒刷新20次
+
+# 信号强度分档: (下限dBm, 档位)，csq 大于下限即属于该档
+SIGNAL_THRESHOLDS = [(-85, 1), (-90, 2), (-95, 3), (-100, 4), (-105, 5), (-110, 6)]
+SIGNAL_UNKNOWN = 0   # 没有模组或无法解析
+SIGNAL_WEAK = 7      # -110dBm 及以下
+SIGNAL_NONE = -1     # 清空图标
+
+_MISSING = object()
+
+
+def signal_level(csq):
+    """csq(dBm) -> 档位，无法解析时返回 SIGNAL_UNKNOWN"""
+    try:
+        csq = int(csq)
+    except (ValueError, TypeError):
+        return SIGNAL_UNKNOWN
+    for lower, level in SIGNAL_THRESHOLDS:
+        if csq > lower:
+            return level
+    return SIGNAL_WEAK
+
+
+class ViewModel:
+    """一组命名的显示值，defaults 为 clear() 时恢复的项，其他项(如统计数)用 update() 添加，clear() 不影响"""
+    def __init__(self, **defaults):
+        self._defaults = dict(defaults)
+        self._values = dict(defaults)
+        self._rendered = {}
+        self._dirty = True
+        self._lock = threading.Lock()
+
+    def update(self, **values):
+        with self._lock:
+            self._values.update(values)
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._values.update(self._defaults)
+            self._dirty = True
+
+    def get(self, name, default=None):
+        with self._lock:
+            return self._values.get(name, default)
+
+    def invalidate(self):
+        """下一次 take_changes() 返回所有项(控件被外部修改后重新同步)"""
+        with self._lock:
+            self._rendered = {}
+            self._dirty = True
+
+    def take_changes(self):
+        """界面线程调用，返回自上次以来值有变化的项 {名称: 值}"""
+        if not self._dirty:
+            return {}
+        with self._lock:
+            values = dict(self._values)
+            self._dirty = False
+        rendered = self._rendered
+        changes = {name: value for name, value in values.items() if rendered.get(name, _MISSING) != value}
+        rendered.update(changes)
+        return changes
+
+
+class RowsModel:
+    """多工位表格的模型: 键(串口) -> 最新的快照dict"""
+    def __init__(self):
+        self._pending = {}
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def update(self, key, snapshot):
+        with self._lock:
+            self._pending[key] = snapshot
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+        self._rendered = {}
+
+    def take_changes(self):
+        """界面线程调用，返回 {键: 快照}，只包含和上次显示的快照不同的行"""
+        if not self._pending:
+            return {}
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        rendered = self._rendered
+        changes = {key: snapshot for key, snapshot in pending.items() if rendered.get(key) != snapshot}
+        rendered.update(changes)
+        return changes
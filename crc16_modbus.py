@@ -0,0 +1,110 @@
+# coding=utf-8
+"""CRC-16/Modbus 查表实现 (多项式0x8005按位颠倒后为0xA001, 初值0xFFFF)
+
+原来各脚本中逐位计算的 crc16 每个字节要循环8次，这里预先算好256项的表，每个字节只查一次表；
+较长的数据按16位字查65536项的表(第一次用到时生成)，每两个字节查一次表(slicing-by-2)。
+data 可以是 bytes / bytearray / memoryview，通过memoryview迭代，不复制数据。
+
+- crc16(data)              计算CRC
+- crc16(data, crc)         接着上一段的结果继续计算，用于流式解析
+- Crc16().update(...)      同上，对象形式
+- append_crc(data)         返回 data + 2字节CRC
+- check_crc(frame)         校验帧末尾的2字节CRC
+
+Modbus/LoRa 模块的CRC低字节在前(byteorder='little')，CAT1 模组的 F4 F5 帧高字节在前(byteorder='big')。
+
+性能对比见 bench_crc16.py。
+"""
+
+import sys
+import threading
+
+INIT = 0xFFFF
+POLY = 0xA001
+WORD_MIN_LEN = 32  # 数据不短于该长度时按16位字查表
+
+
+def _make_table():
+    table = []
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ POLY
+            else:
+                crc = crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+TABLE = _make_table()
+
+_word_table = None
+_word_table_lock = threading.Lock()
+
+
+def _get_word_table():
+    """65536项的表: 对CRC异或一个16位字(低字节在前)后连续处理两个字节的结果"""
+    global _word_table
+    with _word_table_lock:
+        if _word_table is None:
+            words = []
+            for value in range(65536):
+                crc = (value >> 8) ^ TABLE[value & 0xFF]
+                words.append((crc >> 8) ^ TABLE[crc & 0xFF])
+            _word_table = tuple(words)
+        return _word_table
+
+
+def crc16(data, crc=INIT, _table=TABLE):
+    """计算CRC-16/Modbus，crc为上一段数据的结果时继续计算"""
+    if len(data) >= WORD_MIN_LEN and sys.byteorder == 'little':
+        view = memoryview(data)
+        if view.c_contiguous:
+            view = view.cast('B')
+            end = len(view) & ~1
+            word_table = _word_table or _get_word_table()
+            for word in view[:end].cast('H'):
+                crc = word_table[crc ^ word]
+            if end < len(view):
+                crc = (crc >> 8) ^ _table[(crc ^ view[end]) & 0xFF]
+            return crc
+    for byte in data:
+        crc = (crc >> 8) ^ _table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+class Crc16:
+    """增量计算CRC，适合数据分多次到达的流式解析"""
+    def __init__(self, data=None):
+        self.value = INIT
+        if data is not None:
+            self.update(data)
+
+    def update(self, data):
+        self.value = crc16(data, self.value)
+        return self
+
+    def digest(self, byteorder='little'):
+        return self.value.to_bytes(2, byteorder)
+
+    def reset(self):
+        self.value = INIT
+
+
+def crc_bytes(data, byteorder='little'):
+    """返回2字节的CRC"""
+    return crc16(data).to_bytes(2, byteorder)
+
+
+def append_crc(data, byteorder='little'):
+    """返回末尾加上2字节CRC的帧"""
+    return bytes(data) + crc16(data).to_bytes(2, byteorder)
+
+
+def check_crc(frame, byteorder='little'):
+    """校验帧末尾的2字节CRC，帧长度不足3字节时返回False"""
+    if len(frame) < 3:
+        return False
+    view = memoryview(frame)
+    return crc16(view[:-2]) == int.from_bytes(view[-2:], byteorder)
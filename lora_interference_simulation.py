@@ -6,6 +6,8 @@ import time
 import json
 import logging
 from datetime import datetime
+from crc16_modbus import check_crc, crc_bytes
+from serial_capture import get_capture, capture_enabled
 
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
@@ -31,6 +33,9 @@ file_handler.setFormatter(format_option)
 logger.addHandler(console_handler)
 logger.addHandler(file_handler)
 
+# 收发的原始数据另存为二进制抓包文件(--capture 或 config.json 中 "capture": true 时)，用 serial_capture.py 离线查看
+capture = get_capture()
+
 
 class SerialCommunication:
     def __init__(self):
@@ -76,24 +81,6 @@ class SerialCommunication:
 
             logging.warning("Invalid serial port. Please try again.")
 
-    def crc16(self, data: bytes) -> int:
-        # 初始化crc为0xFFFF
-        crc = 0xFFFF
-        # 循环处理每个数据字节
-        for byte in data:
-            # 将每个数据字节与crc进行异或操作
-            crc ^= byte
-            # 对crc的每一位进行处理
-            for _ in range(8):
-                # 如果最低位为1，则右移一位并执行异或0xA001操作(即0x8005按位颠倒后的结果)
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0xA001
-                # 如果最低位为0，则仅将crc右移一位
-                else:
-                    crc = crc >> 1
-        # 返回最终的crc值
-        return crc
-
     def receive_data(self):
         while True:
             cnt = self.ser.in_waiting
@@ -102,6 +89,7 @@ class SerialCommunication:
                 continue
 
             received_data = self.ser.read(cnt)
+            capture.rx(self.serial_port, received_data)
             if received_data[0] == 0xff:
                 hex_str = ""
                 recv_hex_str = received_data.hex()
@@ -110,9 +98,7 @@ class SerialCommunication:
                 logging.info("recv: [%d] %s", len(hex_str) / 3, hex_str)
 
                 # crc 校验
-                crc = self.crc16(received_data[0:cnt - 2]).to_bytes(2, 'little')
-                if not (crc[0] == received_data[cnt - 2]
-                        and crc[1] == received_data[cnt - 1]):
+                if not check_crc(received_data):
                     logging.error("crc check fail")
                     break
                 self.recv_queue.put(received_data)
@@ -148,9 +134,7 @@ class SerialCommunication:
         hex_str = hex(int(freq))[2:].zfill(2)
         data = "FF 10 00 D3 00 01 02 00 " + str(hex_str).upper() + " "
         data_byte = bytearray.fromhex(data)
-        crc = self.crc16(data_byte).to_bytes(2, byteorder='little')
-        data += hex(crc[0])[2:].upper().zfill(2) + " "
-        data += hex(crc[1])[2:].upper().zfill(2)
+        data += crc_bytes(data_byte).hex(' ').upper()
         self.send_byte_data(data)
 
         retry_cnt = 0
@@ -201,9 +185,7 @@ class SerialCommunication:
         net_id_str = str(hex_str).upper()
         data = "FF 10 00 D8 00 02 04 00 00 " + net_id_str[0:2] + " " + net_id_str[2:4] + " "
         data_byte = bytearray.fromhex(data)
-        crc = self.crc16(data_byte).to_bytes(2, byteorder='little')
-        data += hex(crc[0])[2:].upper().zfill(2) + " "
-        data += hex(crc[1])[2:].upper().zfill(2)
+        data += crc_bytes(data_byte).hex(' ').upper()
         self.send_byte_data(data)
 
         retry_cnt = 0
@@ -254,9 +236,7 @@ class SerialCommunication:
         duration_str = str(hex_str).upper()
         data = "FF 10 ED 2A 00 01 02 " + duration_str[0:2] + " " + duration_str[2:4] + " "
         data_byte = bytearray.fromhex(data)
-        crc = self.crc16(data_byte).to_bytes(2, byteorder='little')
-        data += hex(crc[0])[2:].upper().zfill(2) + " "
-        data += hex(crc[1])[2:].upper().zfill(2)
+        data += crc_bytes(data_byte).hex(' ').upper()
         self.send_byte_data(data)
 
         retry_cnt = 0
@@ -308,9 +288,7 @@ class SerialCommunication:
         data = "FF 10 EB 3C 00 04 08 A5 AD A5 AD " + addr_str[0:2] + " " + \
             addr_str[2:4] + " " + addr_str[4:6] + " " + addr_str[6:8] + " "
         data_byte = bytearray.fromhex(data)
-        crc = self.crc16(data_byte).to_bytes(2, byteorder='little')
-        data += hex(crc[0])[2:].upper().zfill(2) + " "
-        data += hex(crc[1])[2:].upper().zfill(2)
+        data += crc_bytes(data_byte).hex(' ').upper()
 
         retry_cnt = 0
         while True:
@@ -383,9 +361,7 @@ class SerialCommunication:
         hex_str = hex(int(ch))[2:].zfill(2)
         data = "FF 10 01 CD 00 07 0E " + str(hex_str).upper() + " 00 FF FF FF FF FF FF FF FF FF FF 00 00 "
         data_byte = bytearray.fromhex(data)
-        crc = self.crc16(data_byte).to_bytes(2, byteorder='little')
-        data += hex(crc[0])[2:].upper().zfill(2) + " "
-        data += hex(crc[1])[2:].upper().zfill(2)
+        data += crc_bytes(data_byte).hex(' ').upper()
         self.send_byte_data(data)
 
         retry_cnt = 0
@@ -413,9 +389,7 @@ class SerialCommunication:
         data = "FF 10 01 F4 00 03 06 " + addr_str[0:2] + " " + \
             addr_str[2:4] + " " + addr_str[4:6] + " " + addr_str[6:8] + " 00 00 "
         data_byte = bytearray.fromhex(data)
-        crc = self.crc16(data_byte).to_bytes(2, byteorder='little')
-        data += hex(crc[0])[2:].upper().zfill(2) + " "
-        data += hex(crc[1])[2:].upper().zfill(2)
+        data += crc_bytes(data_byte).hex(' ').upper()
         # 设置干扰目的地址
         self.send_byte_data(data)
 
@@ -444,7 +418,9 @@ class SerialCommunication:
         logging.info("simulation success")
 
     def send_str_data(self, data):
-        self.ser.write((data + "\n").encode("utf-8"))
+        payload = (data + "\n").encode("utf-8")
+        capture.tx(self.serial_port, payload)
+        self.ser.write(payload)
         logging.info(f"Sent: {data}")
 
     def send_byte_data(self, data):
@@ -455,7 +431,9 @@ class SerialCommunication:
         if queue_size != 0:
             logging.info("recv_queue size: %d", queue_size)
         logging.info("send: [%d] %s", (len(data) + 1) / 3, data)
-        self.ser.write(bytearray.fromhex(data))
+        payload = bytes.fromhex(data)
+        capture.tx(self.serial_port, payload)
+        self.ser.write(payload)
 
     def start_serial_threads(self):
         receive_thread = threading.Thread(target=self.receive_data)
@@ -510,6 +488,7 @@ class LocConfig:
                 self.time_interval = buf.get('time_interval')
                 self.interference_num = buf.get('interference_num')
                 self.next_interference_interval = buf.get('next_interference_interval')
+                capture.enable(capture_enabled(buf))
                 logging.info("interference_duration: %d", self.interference_duration)
                 logging.info("interference_num: %d", self.interference_num)
                 logging.info("time_interval: %d", self.time_interval)
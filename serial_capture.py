@@ -0,0 +1,579 @@
+# coding=utf-8
+"""串口收发抓包 - 把每次收发的原始字节以二进制格式追加到抓包文件，离线建索引后按需查找和解码
+
+原来只有 AutoTest_*.log 中的十六进制文本记录收发数据，文件大、生成慢、查找也慢。
+SerialCapture.rx()/tx() 在串口线程中只把 (时间, 串口, 方向, 数据) 追加到队列，
+由后台线程打包后经缓冲写入 logs/capture/capture_YYYY-MM-DD.scap，每天一个文件，多次运行追加到同一文件。
+
+抓包默认关闭: 命令行带 --capture、环境变量 SERIAL_CAPTURE=1 或 config.json 中 "capture": true 时才记录，
+第一次收发数据时才启动后台线程；和日志一样只保留最近 RETENTION_DAYS 天的抓包文件和索引。
+
+文件格式(小端):
+- 文件头 16字节: "SCAP" | 版本(1) | 保留(3) | 保留(8)
+- 记录头 16字节: 单调时钟(ns, int64) | 串口编号(uint16) | 类型(uint8) | 保留(1) | 数据长度(uint32)，之后是数据
+  类型 0=接收 1=发送；2=串口名(数据为UTF-8串口名，之后的记录用编号表示该串口)；
+  3=时钟锚点(数据为 time.time_ns() 和 time.monotonic_ns() 各8字节，用于把单调时钟换算成日期时间)
+  每次打开文件都会重新写入锚点和串口名，文件末尾不完整的记录(程序被强制结束)在建索引时忽略。
+
+离线工具:
+    python serial_capture.py stats  logs/capture/capture_2026-10-18.scap
+    python serial_capture.py list   CAPTURE --port COM3 --dir rx --since 10:00:00 --until 10:05:00
+    python serial_capture.py grep   CAPTURE "F4 F5 00 52"
+    python serial_capture.py decode CAPTURE --proto cat1 --port COM3
+    python serial_capture.py decode CAPTURE --proto lora
+第一次查询时生成索引文件 CAPTURE.idx，抓包文件变大后只对新增部分补建索引。
+decode 按串口和方向把数据拼成连续的字节流，CAT1 用 cat1_frame.FrameDecoder 切 F4 F5 帧，
+LoRa 模块按地址 FF 的 Modbus RTU 帧切帧(CRC低字节在前)。
+
+不依赖wx，cat1_iqc_detect.py、cat1_iqc_detect2.py、cat1_stations.py、lora_interference_simulation.py 共用。
+"""
+import argparse
+import bisect
+import collections
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+from crc16_modbus import check_crc
+
+CAPTURE_PATH = os.path.join("logs", "capture")
+MAGIC = b"SCAP"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sB3x8x")
+RECORD_HEADER = struct.Struct("<qHBxI")
+
+DIR_RX = 0
+DIR_TX = 1
+KIND_PORT = 2
+KIND_ANCHOR = 3
+DIR_NAMES = {DIR_RX: "rx", DIR_TX: "tx"}
+
+CAPTURE_FLAG = "--capture"
+CAPTURE_ENV = "SERIAL_CAPTURE"
+RETENTION_DAYS = 7       # 抓包文件(.scap/.idx)保留的天数
+
+FLUSH_INTERVAL = 0.5     # 后台线程写文件的间隔(秒)
+MAX_PENDING = 100000     # 队列中未写入的记录超过该数量时丢弃新记录
+WRITE_BUFFER = 1 << 20
+
+INDEX_MAGIC = b"SCIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sBxxxQI")  # 魔数 | 版本 | 已索引的抓包文件长度 | 串口表JSON长度
+INDEX_ENTRY = struct.Struct("<QqHBxI")     # 数据偏移 | 墙上时间(ns) | 串口编号 | 方向 | 数据长度
+
+
+def capture_enabled(config=None):
+    """命令行参数 --capture、环境变量 SERIAL_CAPTURE=1 或配置中的 "capture" 开启抓包"""
+    if CAPTURE_FLAG in sys.argv[1:] or os.environ.get(CAPTURE_ENV) == "1":
+        return True
+    return bool(config and config.get('capture'))
+
+
+def prune_captures(path=CAPTURE_PATH, days=RETENTION_DAYS, now=None):
+    """删除超过 days 天未修改的抓包文件和索引，返回删除的文件数"""
+    now = time.time() if now is None else now
+    removed = 0
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith("capture_") or not entry.name.endswith((".scap", ".idx")):
+            continue
+        try:
+            if now - entry.stat().st_mtime > days * 86400:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class SerialCapture:
+    """抓包写入器，rx()/tx() 可在任意线程调用；enabled 为False时直接返回，不创建文件和线程"""
+    def __init__(self, path=CAPTURE_PATH, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.dropped = 0
+        self._pending = collections.deque()
+        self._file = None
+        self._file_date = None
+        self._ports = {}  # 当前文件中的 串口名 -> 编号
+        self._running = True
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def rx(self, port, data):
+        self._append(port, DIR_RX, data)
+
+    def tx(self, port, data):
+        self._append(port, DIR_TX, data)
+
+    def _append(self, port, direction, data):
+        if not self.enabled or not data:
+            return
+        if self._thread is None:
+            self._start()
+        if len(self._pending) >= MAX_PENDING:
+            self.dropped += 1
+            return
+        # deque.append 是原子操作，串口线程之间不需要加锁
+        self._pending.append((time.monotonic_ns(), port, direction,
+                              data if isinstance(data, bytes) else bytes(data)))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None and self._running:
+                thread = threading.Thread(target=self._run, name="serial-capture", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def close(self):
+        """写完队列中的记录并关闭文件"""
+        with self._start_lock:
+            self._running = False
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(5)
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _open(self, date):
+        if self._file:
+            self._file.close()
+        os.makedirs(self.path, exist_ok=True)
+        prune_captures(self.path)  # 启动和每天换文件时清理
+        file_path = os.path.join(self.path, f"capture_{date}.scap")
+        new_file = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+        self._file = open(file_path, 'ab', buffering=WRITE_BUFFER)
+        self._file_date = date
+        self._ports = {}
+        if new_file:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        anchor = struct.pack("<qq", time.time_ns(), time.monotonic_ns())
+        self._file.write(RECORD_HEADER.pack(time.monotonic_ns(), 0, KIND_ANCHOR, len(anchor)) + anchor)
+
+    def _write(self, records):
+        date = time.strftime("%Y-%m-%d")
+        if date != self._file_date:
+            self._open(date)
+        write = self._file.write
+        pack = RECORD_HEADER.pack
+        ports = self._ports
+        for timestamp, port, direction, data in records:
+            port_id = ports.get(port)
+            if port_id is None:
+                port_id = ports[port] = len(ports) + 1
+                name = str(port).encode('utf-8')
+                write(pack(timestamp, port_id, KIND_PORT, len(name)) + name)
+            write(pack(timestamp, port_id, direction, len(data)))
+            write(data)
+        self._file.flush()
+
+    def _drain(self):
+        pending = self._pending
+        records = []
+        while pending:
+            records.append(pending.popleft())
+        if records:
+            try:
+                self._write(records)
+            except OSError as e:
+                self.dropped += len(records)
+                if sys.stderr:
+                    sys.stderr.write("serial capture write failed: %s\n" % e)
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._drain()
+        self._drain()
+
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+def get_capture(path=CAPTURE_PATH):
+    """进程内共用的抓包写入器，按 capture_enabled() 决定是否记录(读取配置后可用 enable() 开启)，
+    程序退出时写完剩余记录"""
+    global _capture
+    with _capture_lock:
+        if _capture is None:
+            import atexit
+            _capture = SerialCapture(path, enabled=capture_enabled())
+            atexit.register(_capture.close)
+        return _capture
+
+
+# ---------- 离线读取 ----------
+class CaptureIndex:
+    """抓包文件的索引: 每条收发记录一项，按文件中的顺序(即时间顺序)排列"""
+    def __init__(self, capture_file):
+        self.capture_file = capture_file
+        self.index_file = capture_file + ".idx"
+        self.ports = {}     # 编号 -> 串口名(全文件唯一的编号，与文件中各段的编号不同)
+        self.entries = []   # (数据偏移, 墙上时间ns, 串口编号, 方向, 数据长度)
+        self.indexed_size = 0
+        self._scan_state = None
+
+    def load(self):
+        """读取已有索引并对抓包文件新增部分补建索引，返回新增的记录数"""
+        self._read_index()
+        size = os.path.getsize(self.capture_file)
+        if size <= self.indexed_size:
+            return 0
+        added = self._scan(self.indexed_size)
+        self._write_index()
+        return added
+
+    def _read_index(self):
+        self.ports, self.entries, self.indexed_size, self._scan_state = {}, [], 0, None
+        try:
+            with open(self.index_file, 'rb') as f:
+                data = f.read()
+            magic, version, indexed_size, meta_len = INDEX_HEADER.unpack_from(data)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                return
+            meta = json.loads(data[INDEX_HEADER.size:INDEX_HEADER.size + meta_len].decode('utf-8'))
+            body = memoryview(data)[INDEX_HEADER.size + meta_len:]
+            body = body[:len(body) - len(body) % INDEX_ENTRY.size]
+        except (OSError, ValueError, struct.error):
+            return
+        if indexed_size > os.path.getsize(self.capture_file):
+            return  # 抓包文件被替换，重建
+        self.ports = {int(key): name for key, name in meta['ports'].items()}
+        self._scan_state = meta['state']
+        self.entries = list(INDEX_ENTRY.iter_unpack(body))
+        self.indexed_size = indexed_size
+
+    def _write_index(self):
+        meta = json.dumps({'ports': self.ports, 'state': self._scan_state}, ensure_ascii=False).encode('utf-8')
+        pack = INDEX_ENTRY.pack
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.indexed_size, len(meta)))
+            f.write(meta)
+            f.write(b"".join([pack(*entry) for entry in self.entries]))
+        os.replace(tmp_file, self.index_file)
+
+    def _scan(self, start):
+        """从 start 开始解析记录，start为0时先校验文件头"""
+        with open(self.capture_file, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        view = memoryview(data)
+        offset = 0
+        if start == 0:
+            if len(data) < FILE_HEADER.size:
+                return 0
+            magic, version = FILE_HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"不是抓包文件: {self.capture_file}")
+            offset = FILE_HEADER.size
+        # state: 当前段的 文件内编号 -> 全局编号，以及时钟锚点(墙上时间 - 单调时钟)
+        state = self._scan_state or {'segment': {}, 'offset_ns': 0}
+        segment = {int(key): value for key, value in state['segment'].items()}
+        offset_ns = state['offset_ns']
+        names = {name: key for key, name in self.ports.items()}
+        entries = self.entries
+        append = entries.append
+        unpack = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        count = len(entries)
+        total = len(data)
+        while offset + header_size <= total:
+            timestamp, port_id, kind, length = unpack(data, offset)
+            body = offset + header_size
+            if body + length > total:
+                break  # 不完整的记录，等文件写完后再索引
+            if kind <= DIR_TX:
+                append((start + body, timestamp + offset_ns, segment.get(port_id, 0), kind, length))
+            elif kind == KIND_PORT:
+                name = bytes(view[body:body + length]).decode('utf-8', 'replace')
+                if name not in names:
+                    names[name] = len(names) + 1
+                    self.ports[names[name]] = name
+                segment[port_id] = names[name]
+            elif kind == KIND_ANCHOR:
+                wall, mono = struct.unpack_from("<qq", data, body)
+                offset_ns = wall - mono
+                segment = {}
+            offset = body + length
+        self.indexed_size = start + offset
+        self._scan_state = {'segment': segment, 'offset_ns': offset_ns}
+        return len(entries) - count
+
+    def port_id(self, name):
+        for key, value in self.ports.items():
+            if value == name:
+                return key
+        raise KeyError(name)
+
+    def select(self, port=None, direction=None, since_ns=None, until_ns=None):
+        """按串口、方向、时间范围筛选，返回索引项列表"""
+        port_id = self.port_id(port) if port else None
+        since_ns = since_ns if since_ns is not None else -1 << 63
+        until_ns = until_ns if until_ns is not None else 1 << 63
+        return [entry for entry in self.entries
+                if since_ns <= entry[1] < until_ns
+                and (port_id is None or entry[2] == port_id) and (direction is None or entry[3] == direction)]
+
+
+def read_payloads(capture_file, entries):
+    """按索引项读取数据，返回与 entries 对应的 bytes 列表"""
+    if not entries:
+        return []
+    with open(capture_file, 'rb') as f:
+        first = entries[0][0]
+        f.seek(first)
+        data = f.read(entries[-1][0] + entries[-1][4] - first)
+    return [data[offset - first:offset - first + length] for offset, _, _, _, length in entries]
+
+
+def group_streams(entries):
+    """按 (串口编号, 方向) 分组，保持时间顺序"""
+    streams = collections.OrderedDict()
+    for entry in entries:
+        streams.setdefault((entry[2], entry[3]), []).append(entry)
+    return streams
+
+
+def format_time(timestamp_ns):
+    moment = datetime.fromtimestamp(timestamp_ns / 1e9)
+    return moment.strftime("%Y-%m-%d %H:%M:%S.") + "%03d" % (moment.microsecond // 1000)
+
+
+# ---------- 帧解码 ----------
+class ModbusFrameDecoder:
+    """LoRa 模块地址为 FF 的 Modbus RTU 帧的增量解码器(CRC低字节在前)
+
+    请求和应答的功能码相同但长度不同，按可能的长度逐个校验CRC，校验通过的即为一帧。
+    feed() 返回 [(类型, 数据)]，类型为 "frame" 或 "garbage"(重新同步时跳过的字节)。
+    """
+    ADDRESS = 0xFF
+    MAX_FRAME_LEN = 256
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.dropped = 0
+
+    def _candidates(self, buf, index):
+        """帧头在 index 处时可能的帧长度，数据不够判断时返回None"""
+        if len(buf) - index < 3:
+            return None
+        function = buf[index + 1]
+        if function & 0x80:
+            return [5]  # 异常应答: 地址 功能码 异常码 CRC
+        lengths = [8]   # 读请求 / 写单个寄存器的请求和应答 / 写多个寄存器的应答
+        if function in (0x01, 0x02, 0x03, 0x04):
+            lengths.insert(0, 5 + buf[index + 2])  # 读应答: 地址 功能码 字节数 数据 CRC
+        elif function in (0x0F, 0x10):
+            if len(buf) - index < 7:
+                return None
+            lengths.insert(0, 9 + buf[index + 6])  # 写多个寄存器请求: ... 字节数 数据 CRC
+        return lengths
+
+    def feed(self, data):
+        self.buffer += data
+        results = []
+        buf = self.buffer
+        start = 0
+        while True:
+            index = buf.find(self.ADDRESS, start)
+            if index < 0:
+                index = len(buf)
+            if index > start:
+                self.dropped += index - start
+                results.append(("garbage", bytes(buf[start:index])))
+                start = index
+            if index >= len(buf):
+                break
+            lengths = self._candidates(buf, index)
+            if lengths is None:
+                break
+            waiting = False
+            for length in lengths:
+                if length > self.MAX_FRAME_LEN:
+                    continue
+                if len(buf) - index < length:
+                    waiting = True
+                    continue
+                if check_crc(buf[index:index + length]):
+                    self.frames += 1
+                    results.append(("frame", bytes(buf[index:index + length])))
+                    start = index + length
+                    break
+            else:
+                if waiting and len(buf) - index < self.MAX_FRAME_LEN:
+                    break  # 可能是半帧，等待后续数据
+                self.dropped += 1
+                results.append(("garbage", bytes(buf[index:index + 1])))
+                start = index + 1
+        del buf[:start]
+        return results
+
+
+def describe_cat1(frame):
+    from cat1_frame import parse_query_response
+    try:
+        info = parse_query_response(frame)
+    except Exception as e:
+        return f"解码失败: {e}"
+    if info is None:
+        return ""
+    return f"版本:{info.version} CSQ:{info.csq}dBm IMEI:{info.imei} ICCID:{info.iccid}"
+
+
+def describe_modbus(frame):
+    function = frame[1]
+    if function & 0x80:
+        return f"异常应答 功能码:{function & 0x7F:02X} 异常码:{frame[2]:02X}"
+    if function in (0x03, 0x04) and len(frame) == 5 + frame[2]:
+        values = [int.from_bytes(frame[3 + i:5 + i], 'big') for i in range(0, frame[2] - 1, 2)]
+        return f"读应答 功能码:{function:02X} 数据:{values}"
+    if len(frame) == 8:
+        register = int.from_bytes(frame[2:4], 'big')
+        value = int.from_bytes(frame[4:6], 'big')
+        return f"功能码:{function:02X} 寄存器:0x{register:04X} 值/数量:{value}"
+    return f"功能码:{function:02X}"
+
+
+def decode_stream(proto, chunks):
+    """chunks为 [(时间ns, 数据)]，返回 [(时间ns, 类型, 数据)]，时间为帧最后一个字节所在记录的时间"""
+    if proto == "cat1":
+        from cat1_frame import FrameDecoder
+        decoder = FrameDecoder()
+    else:
+        decoder = ModbusFrameDecoder()
+    results = []
+    for timestamp, data in chunks:
+        for kind, item in decoder.feed(data):
+            results.append((timestamp, kind, item))
+    if proto == "cat1":
+        text = decoder.flush(drop_partial=True)
+        if text:
+            results.append((chunks[-1][0], "text", text))
+    return results
+
+
+def guess_proto(data):
+    """没有指定协议时按数据开头判断"""
+    index = data.find(b'\xF4\xF5')
+    if 0 <= index < 64:
+        return "cat1"
+    return "lora"
+
+
+# ---------- 命令行 ----------
+def parse_time(text, index):
+    """"YYYY-MM-DD HH:MM:SS" 或 "HH:MM:SS"(抓包文件第一条记录的日期) -> 墙上时间ns"""
+    if not text:
+        return None
+    if len(text) <= 8:
+        first = index.entries[0][1] if index.entries else time.time_ns()
+        text = datetime.fromtimestamp(first / 1e9).strftime("%Y-%m-%d ") + text
+    return int(datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp() * 1e9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="串口抓包文件离线查看")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('stats', "各串口收发统计"), ('list', "列出收发记录"),
+                            ('grep', "在收发数据中查找十六进制字节串"), ('decode', "解码CAT1或LoRa帧")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument('capture', help="抓包文件(.scap)")
+        if name == 'grep':
+            command.add_argument('pattern', help='十六进制字节串，如 "F4 F5 00 52"')
+        if name == 'decode':
+            command.add_argument('--proto', choices=['cat1', 'lora', 'auto'], default='auto')
+        command.add_argument('--port', help="只看该串口")
+        command.add_argument('--dir', choices=['rx', 'tx'], help="只看接收或发送")
+        command.add_argument('--since', help="开始时间 HH:MM:SS 或 YYYY-MM-DD HH:MM:SS")
+        command.add_argument('--until', help="结束时间(不含)")
+        command.add_argument('--limit', type=int, default=0, help="最多输出的条数，0为不限")
+    args = parser.parse_args(argv)
+
+    index = CaptureIndex(args.capture)
+    started = time.perf_counter()
+    added = index.load()
+    if added:
+        print(f"索引: 新增 {added} 条记录，用时 {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    try:
+        entries = index.select(args.port, {'rx': DIR_RX, 'tx': DIR_TX}.get(args.dir),
+                               parse_time(args.since, index), parse_time(args.until, index))
+    except KeyError:
+        print(f"抓包文件中没有串口: {args.port}，已有: {', '.join(index.ports.values())}")
+        return 1
+
+    lines = 0
+
+    def output(text):
+        nonlocal lines
+        lines += 1
+        if args.limit and lines > args.limit:
+            return False
+        print(text)
+        return True
+
+    if args.command == 'stats':
+        print(f"{'串口':<16}{'方向':<6}{'记录数':>10}{'字节数':>12}  时间范围")
+        for (port_id, direction), items in group_streams(entries).items():
+            print(f"{index.ports.get(port_id, '?'):<16}{DIR_NAMES[direction]:<6}{len(items):>10}"
+                  f"{sum(item[4] for item in items):>12}  "
+                  f"{format_time(items[0][1])} ~ {format_time(items[-1][1])}")
+    elif args.command == 'list':
+        for start in range(0, len(entries), 10000):
+            batch = entries[start:start + 10000]
+            for entry, data in zip(batch, read_payloads(args.capture, batch)):
+                if not output(f"{format_time(entry[1])} {index.ports.get(entry[2], '?')} "
+                              f"{DIR_NAMES[entry[3]]} [{entry[4]}] {data.hex(' ').upper()}"):
+                    return 0
+    elif args.command == 'grep':
+        pattern = bytes.fromhex(args.pattern)
+        for (port_id, direction), items in group_streams(entries).items():
+            # 拼成连续的字节流查找，跨两次读取的数据也能找到
+            stream = b"".join(read_payloads(args.capture, items))
+            starts = []
+            position = 0
+            for item in items:
+                starts.append(position)
+                position += item[4]
+            found = stream.find(pattern)
+            while found >= 0:
+                item = items[bisect.bisect_right(starts, found) - 1]
+                context = stream[max(0, found - 8):found + len(pattern) + 24]
+                if not output(f"{format_time(item[1])} {index.ports.get(port_id, '?')} {DIR_NAMES[direction]} "
+                              f"@{found} {context.hex(' ').upper()}"):
+                    return 0
+                found = stream.find(pattern, found + 1)
+    else:
+        for (port_id, direction), items in group_streams(entries).items():
+            chunks = [(item[1], data) for item, data in zip(items, read_payloads(args.capture, items))]
+            proto = args.proto if args.proto != 'auto' else guess_proto(b"".join(data for _, data in chunks[:16]))
+            describe = describe_cat1 if proto == "cat1" else describe_modbus
+            for timestamp, kind, data in decode_stream(proto, chunks):
+                if kind == "frame":
+                    text = f"[{len(data)}] {data.hex(' ').upper()}  {describe(data)}"
+                elif kind == "text":
+                    text = "text: " + data.decode('utf-8', 'replace').rstrip()
+                else:
+                    text = f"skip: {data.hex(' ').upper()}"
+                if not output(f"{format_time(timestamp)} {index.ports.get(port_id, '?')} {DIR_NAMES[direction]} "
+                              f"{proto} {text}"):
+                    return 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
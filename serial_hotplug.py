@@ -0,0 +1,268 @@
+"""串口热插拔服务 - 维护一份缓存的串口表，有变化时推送增/删增量
+
+Linux下监听内核netlink uevent(tty子系统)，插拔后几毫秒内即可得到通知，
+只对变化的那一个串口读取sysfs信息；其他平台或netlink不可用时回退为定时轮询。
+所有界面都从 get_ports() 读取缓存的串口表，不再各自枚举。
+"""
+import fnmatch
+import os
+import socket
+import sys
+import threading
+
+import serial.tools.list_ports
+
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+
+# 与 serial.tools.list_ports_linux.comports 枚举的设备名一致
+LINUX_PORT_PATTERNS = ('ttyS*', 'ttyUSB*', 'ttyXRUSB*', 'ttyACM*', 'ttyAMA*', 'rfcomm*', 'ttyAP*', 'ttyGS*')
+
+FIRST_LOAD_TIMEOUT = 5.0  # 查询单个串口时最多等待服务首次枚举完成的时间(秒)
+
+
+def port_to_info(port):
+    """把 ListPortInfo 转成界面使用的串口信息字典"""
+    return {
+        'device': port.device,
+        'description': port.description if port.description else '未知设备',
+        'hwid': port.hwid if port.hwid else '未知ID',
+        'manufacturer': port.manufacturer if port.manufacturer else '未知厂商',
+        'product': port.product if port.product else '未知产品',
+        'vid': port.vid,
+        'pid': port.pid,
+        'serial_number': port.serial_number,
+    }
+
+
+def enumerate_ports():
+    """完整枚举一次所有串口，返回 {设备名: 串口信息}"""
+    return {port.device: port_to_info(port) for port in serial.tools.list_ports.comports()}
+
+
+def parse_uevent(data):
+    """解析内核uevent消息，返回 (动作, 环境变量字典)"""
+    parts = data.split(b'\0')
+    header = parts[0].decode('utf-8', 'replace')
+    env = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition(b'=')
+        if sep:
+            env[key.decode('utf-8', 'replace')] = value.decode('utf-8', 'replace')
+    action = env.get('ACTION') or header.split('@', 1)[0]
+    return action, env
+
+
+def lookup_linux_port(device):
+    """只读取单个串口的sysfs信息，串口不可用时返回None"""
+    from serial.tools.list_ports_linux import SysFS
+    try:
+        info = SysFS(device)
+    except (OSError, ValueError):
+        return None
+    # 与comports相同：没有真实设备的platform串口(ttyS*)不列出
+    if info.subsystem == "platform":
+        return None
+    return port_to_info(info)
+
+
+class SerialHotplugService(threading.Thread):
+    """串口热插拔服务线程
+
+    backend: "auto"(Linux优先netlink，失败回退轮询) / "netlink" / "poll"
+    订阅者回调 callback(added, removed, ports) 在服务线程中调用，
+    added/removed为变化的串口信息列表，ports为按设备名排序的完整串口表。
+    """
+    def __init__(self, backend="auto", poll_interval=2):
+        super().__init__()
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.active_backend = None
+        self._ports = {}
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._stop_event = threading.Event()
+        self._refresh_event = threading.Event()
+        self._loaded = threading.Event()
+        self._sock = None
+        self.daemon = True
+
+    # ---------- 对外接口 ----------
+    def subscribe(self, callback):
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def get_ports(self, wait=1.0):
+        """读取缓存的串口表（按设备名排序），服务刚启动时最多等待首次枚举完成"""
+        if not self._loaded.is_set() and self.is_alive():
+            self._loaded.wait(wait)
+        with self._lock:
+            return [self._ports[device] for device in sorted(self._ports)]
+
+    def get_port(self, device, wait=FIRST_LOAD_TIMEOUT):
+        """读取缓存的单个串口信息，服务刚启动时最多等待首次枚举完成"""
+        if not self._loaded.is_set() and self.is_alive():
+            self._loaded.wait(wait)
+        with self._lock:
+            return self._ports.get(device)
+
+    def refresh(self):
+        """请求服务线程完整重新枚举一次（手动刷新或怀疑丢事件时使用）"""
+        if self.is_alive():
+            self._refresh_event.set()
+        else:
+            self._apply_full(enumerate_ports())
+
+    def stop(self):
+        self._stop_event.set()
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+
+    # ---------- 内部实现 ----------
+    def _notify(self, added, removed):
+        if not added and not removed:
+            return
+        with self._lock:
+            ports = [self._ports[device] for device in sorted(self._ports)]
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(added, removed, ports)
+            except Exception as e:
+                print(f"串口热插拔回调错误: {e}")
+
+    def _apply_full(self, current):
+        """用完整枚举结果更新缓存表，并推送差异"""
+        with self._lock:
+            added = [info for device, info in current.items() if self._ports.get(device) != info]
+            removed = [info for device, info in self._ports.items() if device not in current]
+            self._ports = current
+        self._loaded.set()
+        self._notify(added, removed)
+
+    def _apply_event(self, action, device):
+        if action == "add" or action == "change":
+            info = lookup_linux_port(device)
+            if info is None:
+                return
+            with self._lock:
+                if self._ports.get(device) == info:
+                    return
+                self._ports[device] = info
+            self._notify([info], [])
+        elif action == "remove":
+            with self._lock:
+                info = self._ports.pop(device, None)
+            if info is not None:
+                self._notify([], [info])
+
+    def _open_netlink(self):
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_KOBJECT_UEVENT)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+        sock.bind((0, UEVENT_KERNEL_GROUP))
+        sock.settimeout(0.5)
+        return sock
+
+    def run(self):
+        use_netlink = self.backend == "netlink" or (self.backend == "auto" and sys.platform.startswith("linux"))
+        if use_netlink:
+            try:
+                self._sock = self._open_netlink()
+            except (OSError, AttributeError) as e:
+                print(f"netlink不可用，改用轮询检测串口: {e}")
+                self._sock = None
+
+        # 先订阅事件再做首次枚举，避免中间的插拔事件丢失
+        try:
+            self._apply_full(enumerate_ports())
+        except Exception as e:
+            print(f"获取串口列表失败: {e}")
+            self._loaded.set()
+
+        if self._sock:
+            self.active_backend = "netlink"
+            self._run_netlink()
+        else:
+            self.active_backend = "poll"
+            self._run_poll()
+
+    def _run_netlink(self):
+        while not self._stop_event.is_set():
+            if self._refresh_event.is_set():
+                self._refresh_event.clear()
+                self._apply_full(enumerate_ports())
+
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if self._stop_event.is_set():
+                    break
+                # 接收缓冲区溢出(ENOBUFS)说明丢了事件，完整重新枚举一次
+                print(f"netlink接收错误，重新枚举串口: {e}")
+                self._apply_full(enumerate_ports())
+                continue
+
+            action, env = parse_uevent(data)
+            if env.get('SUBSYSTEM') != 'tty':
+                continue
+            devname = env.get('DEVNAME', '')
+            name = os.path.basename(devname)
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in LINUX_PORT_PATTERNS):
+                continue
+            device = devname if devname.startswith('/dev/') else '/dev/' + devname
+            self._apply_event(action, device)
+
+    def _run_poll(self):
+        while not self._stop_event.is_set():
+            self._refresh_event.wait(self.poll_interval)
+            self._refresh_event.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self._apply_full(enumerate_ports())
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    print(f"串口监控错误: {e}")
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_port_service(backend="auto", poll_interval=2):
+    """获取进程内共享的串口热插拔服务（首次调用时创建并启动）"""
+    global _service
+    with _service_lock:
+        if _service is None or not _service.is_alive():
+            _service = SerialHotplugService(backend=backend, poll_interval=poll_interval)
+            _service.start()
+        return _service
+
+
+def port_identity(device):
+    """串口适配器的稳定标识：有序列号时为 VID:PID:序列号，否则为hwid，都没有时为串口号
+
+    先等待热插拔服务的首次枚举；缓存中仍没有该串口(首次枚举超时或插入事件还没到)时同步枚举一次，
+    保证同一个适配器不论在界面还是命令行、第几次调用都得到相同的标识。
+    """
+    if not device:
+        return device
+    info = get_port_service().get_port(device)
+    if info is None:
+        info = enumerate_ports().get(device)
+    if info and info.get('vid') is not None and info.get('serial_number'):
+        return f"{info['vid']:04X}:{info['pid']:04X}:{info['serial_number']}"
+    if info and info.get('hwid') and info['hwid'] != '未知ID':
+        return info['hwid']
+    return device
@@ -7,6 +7,7 @@ import serial.tools.list_ports
 import threading
 import time
 import queue
+from crc16_modbus import check_crc
 
 
 class SerialCommunication:
@@ -49,24 +50,6 @@ class SerialCommunication:
         print("send: [%d] %s" % ((len(data) + 1) / 3, data))
         ser.write(bytearray.fromhex(data))
 
-    def crc16(self, data: bytes) -> int:
-        # 初始化crc为0xFFFF
-        crc = 0xFFFF
-        # 循环处理每个数据字节
-        for byte in data:
-            # 将每个数据字节与crc进行异或操作
-            crc ^= byte
-            # 对crc的每一位进行处理
-            for _ in range(8):
-                # 如果最低位为1，则右移一位并执行异或0xA001操作(即0x8005按位颠倒后的结果)
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0xA001
-                # 如果最低位为0，则仅将crc右移一位
-                else:
-                    crc = crc >> 1
-        # 返回最终的crc值
-        return crc
-
     def receive_data(self):
         while True:
             time.sleep(0.3)
@@ -84,9 +67,7 @@ class SerialCommunication:
                 print("recv: [%d] %s" % (len(hex_str) / 3, hex_str))
 
                 # crc 校验
-                crc = self.crc16(received_data[0:cnt - 2]).to_bytes(2, 'big')
-                if not (crc[0] == received_data[cnt - 2]
-                        and crc[1] == received_data[cnt - 1]):
+                if not check_crc(received_data, 'big'):
                     print("crc check fail")
 
                 self.recv_queue.put(received_data)
@@ -0,0 +1,27 @@
+# coding=utf-8
+"""测试从仓库根目录导入各工具模块(不依赖wx的部分)"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _make_response(version="V1.0.0", csq=-70, imei="860000000000001", iccid="89860412345678901234"):
+    """构造CAT1查询应答帧: 版本在第8~22字节，信号强度在第24字节，IMEI/ICCID在其后"""
+    from crc16_modbus import append_crc
+    body = bytearray(60)
+    body[0:2] = b'\xF4\xF5'
+    body[4:8] = b'\x02\x03\x09\x00'
+    body[8:8 + len(version)] = version.encode()
+    body[24] = csq + 256
+    body[25:40] = imei.encode()
+    body[40:60] = iccid.encode()
+    body[2:4] = (len(body) + 2 - 4).to_bytes(2, 'big')
+    return append_crc(body, 'big')
+
+
+@pytest.fixture
+def make_response():
+    return _make_response
@@ -0,0 +1,27 @@
+# coding=utf-8
+from bk7236_autoflash import PortMatcher, main, parse_vid_pid
+
+
+def test_port_matcher():
+    matcher = PortMatcher(parse_vid_pid("1A86:7523"), ["SER=A1"])
+    assert not matcher.matches_all
+    assert matcher.matches({'vid': 0x1A86, 'pid': 0x7523, 'hwid': ""})
+    assert matcher.matches({'vid': 0x0403, 'pid': 0x6001, 'hwid': "USB VID:PID=0403:6001 SER=A1"})
+    assert not matcher.matches({'vid': 0x0403, 'pid': 0x6001, 'hwid': ""})
+
+
+def test_empty_matcher_matches_every_usb_port():
+    matcher = PortMatcher([], [""])
+    assert matcher.matches_all
+    assert matcher.matches({'vid': 0x0403, 'pid': 0x6001})
+    assert not matcher.matches({'vid': None})
+
+
+def test_cli_refuses_to_arm_without_filters(tmp_path, monkeypatch, capsys):
+    import bk7236_autoflash
+    monkeypatch.setattr(bk7236_autoflash, "load_profile",
+                        lambda path, name=None: {'serial': {}, 'files': []})
+    monkeypatch.setattr(bk7236_autoflash, "split_files", lambda files: (["app.bin"], []))
+    monkeypatch.setattr(bk7236_autoflash, "AutoFlashQueue", None)
+    assert main([str(tmp_path / "profile.json")]) == 2
+    assert "--any-port" in capsys.readouterr().out
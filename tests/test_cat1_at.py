@@ -0,0 +1,89 @@
+# coding=utf-8
+import threading
+import time
+
+from cat1_at import ATClient, command_prefix
+
+
+class FakeModem:
+    """记录发出的指令，由测试决定何时把应答交给客户端"""
+    def __init__(self):
+        self.sent = []
+
+    def write(self, command):
+        self.sent.append(command)
+
+
+def make_client(**kwargs):
+    modem = FakeModem()
+    return ATClient(modem.write, **kwargs), modem
+
+
+def test_command_prefix():
+    assert command_prefix("AT+GSN=1") == "+GSN"
+    assert command_prefix("AT+CSQ?") == "+CSQ"
+    assert command_prefix("ATI") is None
+
+
+def test_chunked_response_is_joined_into_lines():
+    client, modem = make_client()
+    result = client.submit("AT+ICCID")
+    for chunk in (b"AT+IC", b"CID\r\r\n+ICCID: 8986", b"0412345678901234\r", b"\n\r\nO", b"K\r\n"):
+        client.feed(chunk)
+    assert result.done and result.ok
+    assert result.value() == "89860412345678901234"
+
+
+def test_urcs_are_kept_out_of_responses():
+    urcs = []
+    client, modem = make_client(on_urc=urcs.append)
+    result = client.submit("AT+GSN=1")
+    client.feed(b"\r\nRDY\r\n+CEREG: 1\r\n+GSN: 861234567890123\r\nOK\r\n+QIND: \"csq\"\r\n")
+    assert result.ok and result.lines == ["+GSN: 861234567890123"]
+    assert urcs == ["RDY", "+CEREG: 1", '+QIND: "csq"']
+    assert client.urcs.qsize() == 3
+
+
+def test_cme_error_fails_only_its_command():
+    client, modem = make_client()
+    first = client.submit("AT+ICCID")
+    second = client.submit("AT+CGMR")
+    client.feed(b"+CME ERROR: 10\r\nFIKS-CAT1-CR020\r\nOK\r\n")
+    assert not first.ok and first.error == "+CME ERROR: 10"
+    assert second.ok and second.value() == "FIKS-CAT1-CR020"
+
+
+def test_pipelined_commands_complete_in_order():
+    client, modem = make_client(max_in_flight=2)
+    results = [client.submit(command) for command in ("AT+GSN=1", "AT+ICCID", "AT+CGMR")]
+    assert modem.sent == ["AT+GSN=1", "AT+ICCID"]  # 第三条等前面的完成后再发送
+    client.feed(b"+GSN: 861234567890123\r\nOK\r\n")
+    assert modem.sent == ["AT+GSN=1", "AT+ICCID", "AT+CGMR"]
+    client.feed(b"+ICCID: 89860412345678901234\r\nOK\r\nV1.0\r\nOK\r\n")
+    assert [result.value() for result in results] == ["861234567890123", "89860412345678901234", "V1.0"]
+
+
+def test_timeout_expires_head_and_keeps_order():
+    client, modem = make_client(timeout=0.1)
+    slow = client.submit("AT+GSN=1")
+    fast = client.submit("AT+CGMR", timeout=5)
+    assert client.wait(slow).error == "timeout"
+    assert not fast.done
+    client.feed(b"V2.0\r\nOK\r\n")
+    assert fast.ok and fast.value() == "V2.0"
+    assert client.timeouts == 1
+
+
+def test_execute_all_takes_one_round_trip():
+    client, modem = make_client()
+
+    def reply():
+        while len(modem.sent) < 3:
+            time.sleep(0.005)
+        client.feed(b"+GSN: 861234567890123\r\nOK\r\n+ICCID: 8986041234\r\nOK\r\nV3.0\r\nOK\r\n")
+
+    threading.Thread(target=reply, daemon=True).start()
+    started = time.time()
+    values = client.execute_all([("AT+GSN=1", None), ("AT+ICCID", None), ("AT+CGMR", None)])
+    assert values == ["861234567890123", "8986041234", "V3.0"]
+    assert time.time() - started < 0.5
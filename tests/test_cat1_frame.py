@@ -0,0 +1,75 @@
+# coding=utf-8
+from cat1_frame import FrameDecoder, QUERY_FRAME, parse_query_response
+
+
+def test_query_frame_crc_is_valid():
+    assert FrameDecoder().feed(QUERY_FRAME) == [("frame", QUERY_FRAME)]
+
+
+def test_split_frame_is_joined(make_response):
+    frame = make_response()
+    decoder = FrameDecoder()
+    results = []
+    for i in range(0, len(frame), 5):
+        results += decoder.feed(frame[i:i + 5])
+    assert results == [("frame", frame)]
+    assert decoder.frames == 1 and not decoder.buffer
+
+
+def test_merged_frames_and_text(make_response):
+    frame = make_response()
+    decoder = FrameDecoder()
+    results = decoder.feed(b"boot ok\r\n" + QUERY_FRAME + frame + b"log li")
+    assert results == [("text", b"boot ok\r\n"), ("frame", QUERY_FRAME), ("frame", frame)]
+    assert decoder.feed(b"ne\n") == [("text", b"log line\n")]
+
+
+def test_crc_error_resyncs_to_next_frame(make_response):
+    good = make_response()
+    bad = bytearray(good)
+    bad[30] ^= 0xFF
+    decoder = FrameDecoder()
+    results = decoder.feed(bytes(bad) + good)
+    assert results[-1] == ("frame", good)
+    assert all(kind == "text" for kind, _ in results[:-1])
+    assert decoder.crc_errors == 1
+    assert decoder.dropped >= 1
+    assert decoder.frames == 1
+
+
+def test_bad_length_is_not_a_header():
+    decoder = FrameDecoder()
+    results = decoder.feed(b'\xF4\xF5\x00\x01' + QUERY_FRAME)
+    assert results[-1] == ("frame", QUERY_FRAME)
+    assert decoder.dropped == 1 and decoder.crc_errors == 0
+
+
+def test_flush_returns_text_and_keeps_partial_frame():
+    decoder = FrameDecoder()
+    assert decoder.feed(b"no newline" + QUERY_FRAME[:5]) == [("text", b"no newline")]
+    assert decoder.flush() is None
+    assert bytes(decoder.buffer) == QUERY_FRAME[:5]
+    assert decoder.feed(QUERY_FRAME[5:]) == [("frame", QUERY_FRAME)]
+
+    decoder.feed(b"tail\xF4")
+    assert decoder.flush() == b"tail"
+    assert bytes(decoder.buffer) == b"\xF4"
+
+
+def test_flush_drop_partial():
+    decoder = FrameDecoder()
+    decoder.feed(QUERY_FRAME[:6])
+    assert decoder.flush(drop_partial=True) is None
+    assert not decoder.buffer
+    assert decoder.dropped == 6
+    assert decoder.feed(QUERY_FRAME) == [("frame", QUERY_FRAME)]
+
+
+def test_parse_query_response(make_response):
+    info = parse_query_response(make_response(version="V2.1", csq=-93))
+    assert info.version == "V2.1"
+    assert info.csq == -93
+    assert info.imei == "860000000000001"
+    assert info.iccid == "89860412345678901234"
+    assert parse_query_response(QUERY_FRAME) is None
+    assert parse_query_response("text") is None
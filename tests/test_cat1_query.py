@@ -0,0 +1,89 @@
+# coding=utf-8
+import queue
+
+from cat1_query import EVENT_REMOVED, EVENT_RESPONSE, EVENT_TIMEOUT, QueryEngine, percentile
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 95) == 3.0
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+
+
+class FakeModule:
+    """send() 被调用时把预先设定的应答放入接收队列"""
+    def __init__(self):
+        self.recv_queue = queue.Queue()
+        self.replies = []
+        self.sent = 0
+
+    def send(self):
+        self.sent += 1
+        if self.replies:
+            for item in self.replies.pop(0):
+                self.recv_queue.put(item)
+
+
+def make_engine(**kwargs):
+    module = FakeModule()
+    kwargs.setdefault('response_timeout', 0.05)
+    kwargs.setdefault('hold_interval', 0)
+    return QueryEngine(module.send, module.recv_queue, **kwargs), module
+
+
+def test_response_reports_new_module_once(make_response):
+    engine, module = make_engine()
+    frame = make_response(imei="860000000000001")
+    module.replies = [["boot log\n", frame], [frame], [make_response(imei="860000000000002")]]
+
+    first = engine.query()
+    assert first.event == EVENT_RESPONSE and first.new_module
+    assert first.info.imei == "860000000000001"
+    assert not engine.query().new_module
+    third = engine.query()
+    assert third.new_module and third.info.imei == "860000000000002"
+    assert module.sent == 3
+
+
+def test_stale_items_are_drained_before_sending(make_response):
+    engine, module = make_engine()
+    module.recv_queue.put(make_response(imei="860000000000009"))
+    module.replies = [[make_response(imei="860000000000001")]]
+    assert engine.query().info.imei == "860000000000001"
+    assert engine.stale == 1
+
+
+def test_timeouts_then_removed(make_response):
+    engine, module = make_engine(max_timeouts=2)
+    assert engine.query().event == EVENT_TIMEOUT  # 没有模组时只报告超时
+
+    module.replies = [[make_response()]]
+    assert engine.query().event == EVENT_RESPONSE
+    assert engine.query().event == EVENT_TIMEOUT
+    removed = engine.query()
+    assert removed.event == EVENT_REMOVED and removed.info is None
+    assert engine.imei == "" and not engine.present
+    assert engine.query().event == EVENT_TIMEOUT
+
+
+def test_stop_ends_transaction():
+    engine, module = make_engine(response_timeout=5)
+    assert engine.query(stop=lambda: True) is None
+
+
+def test_stats(make_response):
+    engine, module = make_engine()
+    assert engine.stats()['verdict_median'] is None
+    assert engine.stats_text() == "判定用时: -"
+
+    module.replies = [[make_response()]]
+    engine.query()
+    engine.query()
+    stats = engine.stats()
+    assert stats['modules'] == 1
+    assert stats['transactions'] == 2 and stats['timeouts'] == 1
+    assert stats['verdict_median'] is not None and stats['response_p95'] is not None
+    assert engine.stats_text().startswith("判定用时 中位:")
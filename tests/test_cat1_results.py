@@ -0,0 +1,67 @@
+# coding=utf-8
+import csv
+import time
+from datetime import datetime
+
+import pytest
+
+from cat1_results import NIGHT_SHIFT, parse_date, ResultDB, shift_of, STATUS_NEW, STATUS_RETEST
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = ResultDB(str(tmp_path / "results.db"))
+    yield db
+    db.close()
+
+
+def _stamp(text):
+    return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M"))
+
+
+def test_shift_of():
+    assert shift_of(_stamp("2026-10-18 09:00")) == ("2026-10-18", "白班")
+    assert shift_of(_stamp("2026-10-18 21:00")) == ("2026-10-18", NIGHT_SHIFT)
+    assert shift_of(_stamp("2026-10-19 03:00")) == ("2026-10-18", NIGHT_SHIFT)
+
+
+def test_record_deduplicates_by_imei(db):
+    status, previous = db.record("860000000000001", "8986", "V1", "V1", -70, "COM3", _stamp("2026-10-18 09:00"))
+    assert status == STATUS_NEW and previous is None
+
+    status, previous = db.record("860000000000001", "8986", "V0", "V1", -75, "COM4", _stamp("2026-10-18 10:00"))
+    assert status == STATUS_RETEST
+    assert previous['result'] == "PASS" and previous['station'] == "COM3"
+
+    record = db.lookup("860000000000001")
+    assert record['result'] == "FAIL" and record['test_count'] == 2
+    assert [test['retest'] for test in record['history']] == [0, 1]
+    assert db.lookup("860000000000002") is None
+
+
+def test_shift_summary(db):
+    db.record("860000000000001", "", "V1", "V1", -70, timestamp=_stamp("2026-10-17 09:00"))
+    db.record("860000000000002", "", "V0", "V1", -70, timestamp=_stamp("2026-10-18 09:00"))
+    db.record("860000000000001", "", "V1", "V1", -70, timestamp=_stamp("2026-10-18 10:00"))
+    db.record("860000000000003", "", "V1", "V1", -70, timestamp=_stamp("2026-10-18 23:00"))
+
+    assert db.shift_summary() == [
+        ("2026-10-18", "夜班", 1, 0, 0),
+        ("2026-10-18", "白班", 0, 1, 1),
+        ("2026-10-17", "白班", 1, 0, 0),
+    ]
+    assert len(db.shift_summary("2026-10-18")) == 2
+
+
+def test_export_csv_range(db, tmp_path):
+    db.record("860000000000001", "8986", "V1", "V1", -70, "COM3", _stamp("2026-10-17 09:00"))
+    db.record("860000000000002", "8986", "V1", "V1", -70, "COM3", _stamp("2026-10-18 09:00"))
+    path = tmp_path / "out.csv"
+
+    assert db.export_csv(str(path), since=parse_date("2026-10-18")) == 1
+    with open(str(path), encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:3] == ['time', 'imei', 'iccid']
+    assert rows[1][1] == "860000000000002"
+    assert rows[1][0] == datetime.fromtimestamp(_stamp("2026-10-18 09:00")).strftime("%Y-%m-%d %H:%M:%S")
+    assert db.export_csv(str(path)) == 2
@@ -0,0 +1,72 @@
+# coding=utf-8
+import os
+import select
+import threading
+import time
+
+import pytest
+
+from cat1_frame import QUERY_FRAME
+from cat1_stations import Station, StationHub, STATE_ONLINE
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+
+
+def make_hub(**kwargs):
+    results = []
+    hub = StationHub("V1.0.0", on_result=lambda snapshot, passed: results.append((snapshot, passed)), **kwargs)
+    return hub, results
+
+
+def test_same_imei_is_judged_once(make_response):
+    hub, results = make_hub()
+    station = Station(1, "COM3")
+    hub._handle_frame(station, make_response(imei="860000000000001"), time.time())
+    hub._handle_frame(station, make_response(imei="860000000000001"), time.time())
+    hub._handle_frame(station, make_response(version="V0.9", imei="860000000000002"), time.time())
+
+    assert station.state == STATE_ONLINE
+    assert [passed for _, passed in results] == [True, False]
+    assert hub.counts() == (1, 1)
+    hub.reset_counts()
+    assert hub.counts() == (0, 0)
+
+
+def test_retest_is_not_counted(make_response):
+    hub, results = make_hub(record=lambda port, info, passed: False)
+    station = Station(1, "COM3")
+    hub._handle_frame(station, make_response(), time.time())
+    assert station.retest and station.result == "PASS"
+    assert hub.counts() == (0, 0)
+    assert results[0][0]['retest']
+
+
+def test_hub_queries_serial_port(make_response):
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    done = threading.Event()
+    hub, results = make_hub()
+    hub.on_result = lambda snapshot, passed: (results.append((snapshot, passed)), done.set())
+    port = os.ttyname(slave)
+    hub.add_port(port)
+    hub.start()
+    try:
+        received = b""
+        deadline = time.time() + 3
+        while QUERY_FRAME not in received and time.time() < deadline:
+            if select.select([master], [], [], 0.1)[0]:
+                received += os.read(master, 64)
+        assert QUERY_FRAME in received
+        response = make_response()
+        os.write(master, response[:10])
+        os.write(master, response[10:])
+        assert done.wait(3)
+    finally:
+        hub.stop()
+        os.close(master)
+        os.close(slave)
+
+    snapshot, passed = results[0]
+    assert passed and snapshot['port'] == port
+    assert snapshot['imei'] == "860000000000001" and snapshot['csq'] == -70
@@ -0,0 +1,57 @@
+# coding=utf-8
+from cat1_view import RowsModel, signal_level, SIGNAL_UNKNOWN, SIGNAL_WEAK, ViewModel
+
+
+def test_signal_level_thresholds():
+    assert signal_level(-60) == 1
+    assert signal_level(-85) == 2
+    assert signal_level(-86) == 2
+    assert signal_level("-101") == 5
+    assert signal_level(-110) == SIGNAL_WEAK
+    assert signal_level(-120) == SIGNAL_WEAK
+    assert signal_level(None) == SIGNAL_UNKNOWN
+    assert signal_level("") == SIGNAL_UNKNOWN
+
+
+def test_view_model_returns_only_changes():
+    model = ViewModel(version="", result="")
+    assert model.take_changes() == {'version': "", 'result': ""}
+    assert model.take_changes() == {}
+
+    model.update(version="V1", result="PASS")
+    model.update(result="FAIL")
+    assert model.take_changes() == {'version': "V1", 'result': "FAIL"}
+
+    model.update(version="V1")
+    assert model.take_changes() == {}
+
+
+def test_view_model_clear_keeps_extra_values():
+    model = ViewModel(version="")
+    model.update(version="V1", passed=3)
+    model.take_changes()
+    model.clear()
+    assert model.take_changes() == {'version': ""}
+    assert model.get('passed') == 3
+
+
+def test_view_model_invalidate_returns_everything():
+    model = ViewModel(version="V1")
+    model.take_changes()
+    model.invalidate()
+    assert model.take_changes() == {'version': "V1"}
+
+
+def test_rows_model_keeps_latest_snapshot():
+    rows = RowsModel()
+    rows.update("COM3", {'state': "a"})
+    rows.update("COM3", {'state': "b"})
+    rows.update("COM4", {'state': "a"})
+    assert rows.take_changes() == {"COM3": {'state': "b"}, "COM4": {'state': "a"}}
+
+    rows.update("COM3", {'state': "b"})
+    assert rows.take_changes() == {}
+
+    rows.reset()
+    rows.update("COM3", {'state': "b"})
+    assert rows.take_changes() == {"COM3": {'state': "b"}}
@@ -0,0 +1,55 @@
+# coding=utf-8
+import crc16_modbus
+from crc16_modbus import Crc16, append_crc, check_crc, crc16, crc_bytes, WORD_MIN_LEN
+
+
+def _bitwise(data):
+    """原来逐位计算的实现，作为对照"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def test_known_vector():
+    assert crc16(b"123456789") == 0x4B37
+    assert crc16(b"") == 0xFFFF
+
+
+def test_word_table_matches_bitwise_for_all_lengths():
+    data = bytes(range(256)) * 2
+    for length in (WORD_MIN_LEN - 1, WORD_MIN_LEN, WORD_MIN_LEN + 1, 255, 512):
+        chunk = data[:length]
+        assert crc16(chunk) == _bitwise(chunk)
+        assert crc16(bytearray(chunk)) == crc16(memoryview(chunk)) == _bitwise(chunk)
+
+
+def test_non_contiguous_view_falls_back_to_bytes():
+    data = bytes(range(200))
+    view = memoryview(data)[::2]
+    assert crc16(view) == _bitwise(data[::2])
+
+
+def test_incremental_matches_one_shot():
+    data = bytes(range(100))
+    assert crc16(data[40:], crc16(data[:40])) == crc16(data)
+    crc = Crc16(data[:7]).update(data[7:60]).update(data[60:])
+    assert crc.value == crc16(data)
+    assert crc.digest('big') == crc_bytes(data, 'big')
+    crc.reset()
+    assert crc.value == crc16_modbus.INIT
+
+
+def test_append_and_check_crc_byte_order():
+    payload = bytes.fromhex("01 03 00 00 00 0A")
+    little = append_crc(payload)
+    assert little == payload + bytes.fromhex("C5 CD")
+    assert check_crc(little)
+    assert not check_crc(little, 'big')
+
+    big = append_crc(payload, 'big')
+    assert check_crc(big, 'big')
+    assert not check_crc(big[:-1] + bytes([big[-1] ^ 1]), 'big')
+    assert not check_crc(b"\x01\x02")
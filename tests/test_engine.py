@@ -0,0 +1,34 @@
+# coding=utf-8
+import os
+
+from bk7236_engine import LoaderProcess
+
+
+def read_chunks(chunks):
+    """把每块数据写入管道后读取一次，最后关闭管道读取到结束"""
+    read_fd, write_fd = os.pipe()
+    launcher = LoaderProcess(["true"])
+    launcher._fd = read_fd
+    launcher._start = 0
+    result = []
+    try:
+        for chunk in chunks:
+            os.write(write_fd, chunk)
+            result.append(launcher.read_lines(0.5))
+        os.close(write_fd)
+        result.append(launcher.read_lines(0.5))
+    finally:
+        os.close(read_fd)
+    return result
+
+
+def test_cr_terminated_line_is_emitted_immediately():
+    assert read_chunks([b"Writing 10%\r", b"Writing 20%\r"]) == [["Writing 10%"], ["Writing 20%"], None]
+
+
+def test_crlf_split_across_chunks_gives_one_line():
+    assert read_chunks([b"connect ok\r", b"\nerase\r\n"]) == [["connect ok"], ["erase"], None]
+
+
+def test_partial_line_waits_for_line_end():
+    assert read_chunks([b"down", b"load\n", b"tail"]) == [[], ["download"], [], ["tail"]]
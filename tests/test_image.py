@@ -0,0 +1,78 @@
+# coding=utf-8
+import os
+import time
+
+import bk7236_image
+from bk7236_image import (BLOCK_SIZE, ImageInfo, merge_group, prepare_files, prune_dir, RETENTION_DAYS,
+                          PRUNE_INTERVAL, SECTOR_SIZE)
+
+
+def _age(path, days):
+    stamp = time.time() - days * 86400
+    os.utime(path, (stamp, stamp))
+
+
+def test_prune_dir_removes_only_stale_files(tmp_path):
+    old = tmp_path / "merged_old.bin"
+    new = tmp_path / "merged_new.bin"
+    old.write_bytes(b"\xff")
+    new.write_bytes(b"\xff")
+    _age(old, RETENTION_DAYS + 1)
+
+    assert prune_dir(str(tmp_path)) == 1
+    assert not old.exists() and new.exists()
+
+
+def test_prune_dir_runs_once_per_interval(tmp_path):
+    now = time.time()
+    assert prune_dir(str(tmp_path), now=now) == 0
+    stale = tmp_path / "diff_stale.bin"
+    stale.write_bytes(b"\x00")
+    _age(stale, RETENTION_DAYS + 1)
+    assert prune_dir(str(tmp_path), now=now + 1) == 0
+    assert prune_dir(str(tmp_path), now=now + PRUNE_INTERVAL + 1) == 1
+
+
+def test_reused_merge_is_kept(tmp_path, monkeypatch):
+    image = tmp_path / "app.bin"
+    image.write_bytes(b"\x01" * 100)
+    info = ImageInfo(str(image), 0, 100, 100, 0, {'path': str(image), 'address': "0x0"})
+    out_dir = str(tmp_path / "merged")
+    path = merge_group([info], out_dir=out_dir)
+    _age(path, RETENTION_DAYS + 1)
+
+    # 再次合并相同内容时复用并更新修改时间，随后的清理不会删除
+    monkeypatch.setattr(bk7236_image, '_prune_times', {})
+    assert merge_group([info], out_dir=out_dir) == path
+    monkeypatch.setattr(bk7236_image, '_prune_times', {})
+    assert prune_dir(out_dir) == 0
+    assert os.path.isfile(path)
+
+
+def _two_images(tmp_path):
+    app = tmp_path / "app.bin"
+    res = tmp_path / "res.bin"
+    app.write_bytes(b"\x01" * 0x1800)
+    res.write_bytes(b"\x02" * 0x100)
+    return [{'path': str(app), 'address': "0x0"}, {'path': str(res), 'address': "0x2000"}]
+
+
+def test_merge_pads_only_own_sectors_by_default(tmp_path):
+    files = _two_images(tmp_path)
+    result, errors, warnings = prepare_files(files, merge=True, align=BLOCK_SIZE, cache=bk7236_image.ChecksumCache(None),
+                                             out_dir=str(tmp_path / "merged"))
+    assert not errors and len(result) == 1
+    assert os.path.getsize(result[0]['path']) == 0x2000 + SECTOR_SIZE
+    assert any("4K扇区" in message for message in warnings)
+
+
+def test_merge_pad_to_block_is_opt_in_and_warned(tmp_path):
+    files = _two_images(tmp_path)
+    result, errors, warnings = prepare_files(files, merge=True, align=BLOCK_SIZE, cache=bk7236_image.ChecksumCache(None),
+                                             out_dir=str(tmp_path / "merged"), pad=True)
+    assert not errors
+    with open(result[0]['path'], 'rb') as f:
+        data = f.read()
+    assert len(data) == BLOCK_SIZE
+    assert data[0x2100:] == b"\xff" * (BLOCK_SIZE - 0x2100)
+    assert any("0x3000-0x10000" in message for message in warnings)
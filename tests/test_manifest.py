@@ -0,0 +1,68 @@
+# coding=utf-8
+import time
+import types
+
+import pytest
+import serial.tools.list_ports
+
+import serial_hotplug
+from bk7236_manifest import device_key
+
+PORT = types.SimpleNamespace(device='/dev/ttyUSB9', description='USB-SERIAL CH340', hwid='USB VID:PID=1A86:7523 SER=ABC',
+                             manufacturer='wch.cn', product='CH340', vid=0x1A86, pid=0x7523, serial_number='ABC')
+
+
+@pytest.fixture
+def slow_ports(monkeypatch):
+    """首次枚举需要一段时间的串口环境，每个测试使用新的热插拔服务"""
+    def comports():
+        time.sleep(0.2)
+        return [PORT]
+    monkeypatch.setattr(serial.tools.list_ports, 'comports', comports)
+    monkeypatch.setattr(serial_hotplug, '_service', None)
+    yield
+    if serial_hotplug._service:
+        serial_hotplug._service.stop()
+
+
+def test_cli_first_call_uses_adapter_identity(slow_ports):
+    # 命令行: 进程内第一次调用时服务刚启动，还没有完成首次枚举
+    assert device_key({'port': '/dev/ttyUSB9'}) == "1A86:7523:ABC"
+
+
+def test_cli_and_gui_get_same_key(slow_ports):
+    cli_key = device_key({'port': '/dev/ttyUSB9'})
+    # 界面: 串口监控已经启动并完成枚举后再查询
+    service = serial_hotplug.get_port_service(backend="poll")
+    service.get_ports(wait=5)
+    assert device_key({'port': '/dev/ttyUSB9'}) == cli_key
+
+
+def test_unknown_port_falls_back_to_name(slow_ports):
+    assert device_key({'port': '/dev/ttyUSB7'}) == '/dev/ttyUSB7'
+
+
+def test_device_id_overrides_port(slow_ports):
+    assert device_key({'port': '/dev/ttyUSB9', 'device_id': 'board-01'}) == 'board-01'
+
+
+def test_write_slice_reuses_and_prunes(tmp_path, monkeypatch):
+    import os
+    import bk7236_image
+    from bk7236_image import RETENTION_DAYS
+    from bk7236_manifest import write_slice
+
+    image = tmp_path / "app.bin"
+    image.write_bytes(bytes(range(256)) * 16)
+    out_dir = tmp_path / "diff"
+    stale = out_dir / "diff_00000000_stale.bin"
+    out_dir.mkdir()
+    stale.write_bytes(b"\xff")
+    stamp = time.time() - (RETENTION_DAYS + 1) * 86400
+    os.utime(stale, (stamp, stamp))
+    monkeypatch.setattr(bk7236_image, '_prune_times', {})
+
+    path = write_slice(str(image), 0, 0x100, 0x200, str(out_dir))
+    assert open(path, 'rb').read() == bytes(range(256))
+    assert not stale.exists()
+    assert write_slice(str(image), 0, 0x100, 0x200, str(out_dir)) == path
@@ -0,0 +1,44 @@
+# coding=utf-8
+import os
+import time
+
+from serial_capture import SerialCapture, CaptureIndex, prune_captures, read_payloads, RETENTION_DAYS, DIR_RX, DIR_TX
+
+
+def test_disabled_capture_starts_nothing(tmp_path):
+    capture = SerialCapture(str(tmp_path / "capture"), enabled=False)
+    capture.rx("COM3", b"\xf4\xf5")
+    capture.close()
+    assert capture._thread is None
+    assert not (tmp_path / "capture").exists()
+
+
+def test_capture_round_trip(tmp_path):
+    path = str(tmp_path)
+    capture = SerialCapture(path)
+    assert capture._thread is None  # 第一次收发时才启动
+    capture.tx("COM3", b"\x01\x02")
+    capture.rx("COM3", b"\x03")
+    capture.close()
+
+    capture_file = os.path.join(path, time.strftime("capture_%Y-%m-%d.scap"))
+    index = CaptureIndex(capture_file)
+    assert index.load() == 2
+    entries = index.select("COM3")
+    assert [entry[3] for entry in entries] == [DIR_TX, DIR_RX]
+    assert read_payloads(capture_file, entries) == [b"\x01\x02", b"\x03"]
+
+
+def test_prune_captures_keeps_recent_files(tmp_path):
+    old = tmp_path / "capture_2020-01-01.scap"
+    old_index = tmp_path / "capture_2020-01-01.scap.idx"
+    recent = tmp_path / "capture_2020-01-02.scap"
+    other = tmp_path / "notes.txt"
+    stamp = time.time() - (RETENTION_DAYS + 1) * 86400
+    for item in (old, old_index, recent, other):
+        item.write_bytes(b"")
+        if item is not recent:
+            os.utime(item, (stamp, stamp))
+
+    assert prune_captures(str(tmp_path)) == 2
+    assert sorted(os.listdir(tmp_path)) == ["capture_2020-01-02.scap", "notes.txt"]